@@ -1,5 +1,5 @@
 """AI package: wrappers around IA integration."""
 
-from .ia_client import IAClient
+from .ia_client import AsyncIAClient, IAClient
 
-__all__ = ["IAClient"]
+__all__ = ["AsyncIAClient", "IAClient"]
@@ -1,21 +1,197 @@
+import asyncio
+import contextvars
 import logging
-from typing import Optional, Tuple
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 from ai.ia_prompt_integration import IAIntegration
+from ai.response_cache import ResponseCache
+from ai.streaming import DeltaCallback, ReasoningLimitExceeded
 
 logger = logging.getLogger(__name__)
 
+ERROR_REASONING_PREFIX = "No reasoning due to error: "
+ERROR_RESPONSE_PREFIX = "No response due to error: "
 
-class IAClient:
-    """Wrapper around IAIntegration to centralize error handling."""
 
-    def __init__(self, ia_instance: IAIntegration):
+def is_error_response(response: Optional[str]) -> bool:
+    """True when `response` is missing or is the placeholder returned by a failed call."""
+    return response is None or response.startswith(ERROR_RESPONSE_PREFIX)
+
+
+class _CallMetrics:
+    """Description of the most recent call (shared by both clients).
+
+    Subclasses decide where it lives (`_metrics`/`_update_metrics`): per
+    thread for the sync client, per asyncio task for the async one.
+    """
+
+    def _metrics(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _update_metrics(self, **values: Any) -> None:
+        raise NotImplementedError
+
+    def last_usage(self) -> Optional[dict]:
+        return self._metrics().get("usage")
+
+    def last_was_cached(self) -> bool:
+        return self._metrics().get("cached", False)
+
+    def last_finish_reason(self) -> Optional[str]:
+        return self._metrics().get("finish_reason")
+
+    def last_retries(self) -> int:
+        return self._metrics().get("retries", 0)
+
+    def _reset_call(self) -> None:
+        self._update_metrics(usage=None, cached=False, finish_reason=None, retries=0)
+
+    def _remember_call(self, body: Optional[dict], retries: int) -> None:
+        body = body or {}
+        try:
+            finish_reason = body["choices"][0].get("finish_reason")
+        except (KeyError, IndexError, TypeError):
+            finish_reason = None
+        self._update_metrics(usage=body.get("usage"), finish_reason=finish_reason, retries=retries)
+
+
+class IAClient(_CallMetrics):
+    """Wrapper around IAIntegration to centralize error handling.
+
+    When `max_concurrent_requests` is set, every `call` made through this
+    client (from any file or function thread) shares a single semaphore, so
+    the number of in-flight LLM requests never exceeds that global budget.
+
+    With a `cache`, identical prompts (same model + payload) are answered from
+    disk without touching the network; only successful responses are stored.
+
+    `last_usage()`, `last_was_cached()`, `last_finish_reason()` and
+    `last_retries()` describe the most recent `call` made by the current thread.
+    """
+
+    def __init__(
+        self,
+        ia_instance: IAIntegration,
+        max_concurrent_requests: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self._ia = ia_instance
+        self.cache = cache
+        self.max_concurrent_requests = max_concurrent_requests
+        self._slots = (
+            threading.BoundedSemaphore(max_concurrent_requests)
+            if max_concurrent_requests and max_concurrent_requests > 0
+            else None
+        )
+        self._local = threading.local()
+
+    def _metrics(self) -> Dict[str, Any]:
+        return vars(self._local)
+
+    def _update_metrics(self, **values: Any) -> None:
+        vars(self._local).update(values)
+
+    @property
+    def streaming(self) -> bool:
+        return getattr(self._ia, "stream", False)
+
+    def call(self, prompt: str, on_delta: Optional[DeltaCallback] = None) -> Tuple[Optional[str], Optional[str]]:
+        """`on_delta` receives streamed pieces when the integration runs in streaming mode."""
+        self._reset_call()
+        try:
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResponseCache.make_key(self._ia.get_payload(prompt))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Cache hit: %s", cache_key)
+                    self._update_metrics(cached=True)
+                    return cached
+            kwargs = {"on_delta": on_delta} if on_delta is not None else {}
+            if self._slots is None:
+                reasoning, response = self._ia.fetch_response(prompt, **kwargs)
+            else:
+                with self._slots:
+                    reasoning, response = self._ia.fetch_response(prompt, **kwargs)
+            self._remember_call(getattr(self._ia, "response", None), getattr(self._ia, "last_retries", 0))
+            if cache_key is not None and response is not None:
+                self.cache.put(cache_key, reasoning, response)
+            return reasoning, response
+        except ReasoningLimitExceeded as e:
+            logger.warning("IA call abandoned: %s", e)
+            self._update_metrics(retries=getattr(self._ia, "last_retries", 0))
+            return (ERROR_REASONING_PREFIX + str(e), ERROR_RESPONSE_PREFIX + str(e))
+        except Exception as e:
+            logger.exception("IA call failed: %s", e)
+            self._update_metrics(retries=getattr(self._ia, "last_retries", 0))
+            return (ERROR_REASONING_PREFIX + str(e), ERROR_RESPONSE_PREFIX + str(e))
+
+
+class AsyncIAClient(_CallMetrics):
+    """asyncio counterpart of IAClient: `await call(prompt)` honours the same contract.
+
+    Errors are logged and turned into the same ("No reasoning due to error",
+    "No response due to error") tuple, `max_concurrent_requests` bounds
+    the number of requests in flight on the event loop, an optional
+    `cache` is consulted exactly as in IAClient, and the `last_*()` accessors
+    describe the call that the current asyncio task awaited most recently
+    (concurrent tasks on the same loop do not see each other's calls).
+    """
+
+    def __init__(
+        self,
+        ia_instance: IAIntegration,
+        max_concurrent_requests: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self._ia = ia_instance
+        self.cache = cache
+        self.max_concurrent_requests = max_concurrent_requests
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._metrics_var: "contextvars.ContextVar[Dict[str, Any]]" = contextvars.ContextVar(
+            f"ia_client_metrics_{id(self)}", default={}
+        )
+
+    def _metrics(self) -> Dict[str, Any]:
+        return self._metrics_var.get()
+
+    def _update_metrics(self, **values: Any) -> None:
+        self._metrics_var.set({**self._metrics_var.get(), **values})
+
+    def _get_slots(self) -> Optional[asyncio.Semaphore]:
+        # Criado sob demanda para ficar associado ao event loop em execução.
+        if self._slots is None and self.max_concurrent_requests and self.max_concurrent_requests > 0:
+            self._slots = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._slots
 
-    def call(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+    async def call(self, prompt: str, on_delta: Optional[DeltaCallback] = None) -> Tuple[Optional[str], Optional[str]]:
+        self._reset_call()
         try:
-            reasoning, response = self._ia.fetch_response(prompt)
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResponseCache.make_key(self._ia.get_payload(prompt))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Cache hit: %s", cache_key)
+                    self._update_metrics(cached=True)
+                    return cached
+            kwargs = {"on_delta": on_delta} if on_delta is not None else {}
+            slots = self._get_slots()
+            if slots is None:
+                reasoning, response = await self._ia.fetch_response_async(prompt, **kwargs)
+            else:
+                async with slots:
+                    reasoning, response = await self._ia.fetch_response_async(prompt, **kwargs)
+            self._remember_call(getattr(self._ia, "async_response", None), getattr(self._ia, "async_retries", 0))
+            if cache_key is not None and response is not None:
+                self.cache.put(cache_key, reasoning, response)
             return reasoning, response
+        except ReasoningLimitExceeded as e:
+            logger.warning("IA call abandoned: %s", e)
+            self._update_metrics(retries=getattr(self._ia, "async_retries", 0))
+            return (ERROR_REASONING_PREFIX + str(e), ERROR_RESPONSE_PREFIX + str(e))
         except Exception as e:
             logger.exception("IA call failed: %s", e)
-            return ("No reasoning due to error: " + str(e), "No response due to error: " + str(e))
+            self._update_metrics(retries=getattr(self._ia, "async_retries", 0))
+            return (ERROR_REASONING_PREFIX + str(e), ERROR_RESPONSE_PREFIX + str(e))
@@ -1,9 +1,32 @@
+import asyncio
+import contextvars
 import json
-import requests
+import threading
 import logging
+import time
+from typing import Optional
+
+from ai.rate_limiter import RateLimiter
+from ai.retry import RequestFailed, RetryPolicy, classify_error, parse_retry_after, RATE_LIMITED
+from ai.streaming import RESET, StreamAccumulator, iter_sse_data
+from ai.transport import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    AsyncHttpTransport,
+    HttpTransport,
+    aiohttp,
+)
+from utils.token_estimator import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Body and retries of the last async request, per asyncio task: coroutines on
+# one event loop share a thread, so the thread-local state cannot hold them.
+_ASYNC_RESPONSE: "contextvars.ContextVar[Optional[dict]]" = contextvars.ContextVar("ia_async_response", default=None)
+_ASYNC_RETRIES: "contextvars.ContextVar[int]" = contextvars.ContextVar("ia_async_retries", default=0)
+
+DEFAULT_API_URL = 'https://llm.ic.unicamp.br/api/chat/completions'
+
 
 def extrair_reasoning(resposta):
     """
@@ -45,10 +68,65 @@ def extrair_reasoning(resposta):
 
 class IAIntegration:
     
-    def __init__(self):
-        self.API_KEY = json.load(open('resources/config.json'))['API_KEY']
-        self.API_URL = 'https://llm.ic.unicamp.br/api/chat/completions'
-        self.response = None
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        stream: bool = False,
+        max_reasoning_tokens: Optional[int] = None,
+        max_reasoning_seconds: Optional[float] = None,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        # api_url/api_key permitem apontar para outro endpoint compatível (ex.: o
+        # servidor simulado de bench/); sem eles, vale resources/config.json.
+        self.API_KEY = api_key if api_key is not None else json.load(open('resources/config.json'))['API_KEY']
+        self.API_URL = api_url or DEFAULT_API_URL
+        # Sessão HTTP persistente (keep-alive) compartilhada por todas as chamadas.
+        self.transport = HttpTransport(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)
+        self.async_transport = (
+            AsyncHttpTransport(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)
+            if aiohttp is not None
+            else None
+        )
+        # A última resposta é guardada por thread: chamadas concorrentes
+        # (ver CodeProcessor.max_workers) não podem sobrescrever umas às outras.
+        self._local = threading.local()
+        # Falhas transitórias (5xx, 429, timeouts, conexão) são repetidas com
+        # backoff exponencial; o limitador é compartilhado por todas as threads.
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        # No modo streaming a resposta é consumida por eventos (SSE) e a chamada
+        # é abandonada quando o reasoning passa do limite de tokens ou de tempo.
+        self.stream = stream
+        self.max_reasoning_tokens = max_reasoning_tokens
+        self.max_reasoning_seconds = max_reasoning_seconds
+
+    @property
+    def response(self):
+        return getattr(self._local, "response", None)
+
+    @response.setter
+    def response(self, value):
+        self._local.response = value
+
+    @property
+    def last_retries(self):
+        """Retries spent by the last request made from the current thread."""
+        return getattr(self._local, "retries", 0)
+
+    @property
+    def async_response(self):
+        """Body of the last `fetch_response_async` awaited by the current asyncio task."""
+        return _ASYNC_RESPONSE.get()
+
+    @property
+    def async_retries(self):
+        """Retries spent by the last `fetch_response_async` awaited by the current asyncio task."""
+        return _ASYNC_RETRIES.get()
 
     def get_headers(self):
         return {
@@ -71,38 +149,166 @@ class IAIntegration:
     def get_motivation_stop(self):
         return self.response["choices"][0]["finish_reason"]
 
-    def execute_prompt(self, prompt):
+    def _extract_message(self, body):
+        self.response = body
+        return self._message(body)
+
+    @staticmethod
+    def _message(body):
+        extract_reasoning = body['choices'][0]['message'].get('reasoning_content')
+        resposta = body['choices'][0]['message'].get('content')
+        logger.debug("Extracted reasoning: %s", extract_reasoning)
+        logger.debug("Full response content: %s", resposta)
+        return extract_reasoning, resposta
+
+    def _retry_delay(self, exc, attempt):
+        """Backoff before the next attempt, or None when `exc` should be raised."""
+        if self.rate_limiter is not None and classify_error(exc) == RATE_LIMITED:
+            self.rate_limiter.on_rate_limited(getattr(exc, "retry_after", None))
+        delay = self.retry_policy.next_delay(exc, attempt)
+        if delay is not None:
+            logger.warning(
+                "Request attempt %d failed (%s: %s); retrying in %.1fs",
+                attempt + 1, classify_error(exc), exc, delay,
+            )
+        return delay
+
+    def _on_success(self, body, tokens):
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success(tokens, (body.get("usage") or {}).get("total_tokens"))
+
+    @staticmethod
+    def _check_status(response):
+        if response.status_code != 200:
+            raise RequestFailed(
+                response.status_code, response.text, parse_retry_after(response.headers.get("Retry-After"))
+            )
+
+    def _send(self, headers, payload):
+        response = self.transport.post(self.API_URL, headers, payload)
+        self._check_status(response)
+        return response.json()
+
+    def _send_streaming(self, headers, payload, on_delta):
+        """One streamed attempt: feeds each event to a StreamAccumulator and returns the equivalent body."""
+        started = time.monotonic()
+        with self.transport.post_stream(self.API_URL, headers, payload) as response:
+            self._check_status(response)
+            response.encoding = response.encoding or "utf-8"
+            accumulator = StreamAccumulator(
+                on_delta,
+                max_reasoning_tokens=self.max_reasoning_tokens,
+                max_reasoning_seconds=self.max_reasoning_seconds,
+                started=started,
+            )
+            for event in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                accumulator.feed(event)
+            accumulator.finish()
+        return accumulator.as_body()
+
+    def _post(self, prompt, on_delta=None):
+        """POST with rate limiting and classified retries; returns the decoded 200 body."""
         headers = self.get_headers()
         payload = self.get_payload(prompt)
-        response = requests.post(self.API_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            self.response = response.json()
-        else:
-            raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+        if self.stream:
+            payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        tokens = estimate_tokens(prompt) if self.rate_limiter is not None else 0
+        attempt = 0
+        while True:
+            self._local.retries = attempt
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(tokens)
+            try:
+                if self.stream:
+                    if attempt and on_delta is not None:
+                        on_delta(RESET, "")
+                    body = self._send_streaming(headers, payload, on_delta)
+                else:
+                    body = self._send(headers, payload)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success(body, tokens)
+            return body
+
+    def execute_prompt(self, prompt):
+        self.response = self._post(prompt)
         
-    def fetch_response(self, prompt):
+    def fetch_response(self, prompt, on_delta=None):
+        """Returns (reasoning, content).
+
+        In streaming mode `on_delta(kind, text)` receives reasoning and content
+        pieces as they arrive (see ai.streaming), and `<think>` blocks inlined
+        in the content are returned as reasoning.
+        """
+        return self._extract_message(self._post(prompt, on_delta))
+
+    async def fetch_response_async(self, prompt, on_delta=None):
+        """Async counterpart of `fetch_response` (same retries and return value).
+
+        Uses aiohttp when installed; otherwise (and in streaming mode) runs the
+        pooled synchronous transport in a worker thread. Either way the body
+        and retries are exposed as `async_response` and `async_retries` to the
+        calling task only.
+        """
+        _ASYNC_RESPONSE.set(None)
+        body = await self._post_async(prompt, on_delta)
+        _ASYNC_RESPONSE.set(body)
+        return self._message(body)
+
+    async def _post_async(self, prompt, on_delta=None):
+        if self.async_transport is None or self.stream:
+            retries = [0]
+
+            def post():
+                try:
+                    return self._post(prompt, on_delta)
+                finally:
+                    retries[0] = self.last_retries
+
+            try:
+                return await asyncio.to_thread(post)
+            finally:
+                _ASYNC_RETRIES.set(retries[0])
+
         headers = self.get_headers()
         payload = self.get_payload(prompt)
-        response = requests.post(self.API_URL, headers=headers, json=payload)
-        max_retries = 3
-        if response.status_code == 200:
-            self.response = response.json()
-            extract_reasoning = self.response['choices'][0]['message'].get('reasoning_content')
-            resposta = self.response['choices'][0]['message'].get('content')
-            logger.debug("Extracted reasoning: %s", extract_reasoning)
-            logger.debug("Full response content: %s", resposta)
-            return extract_reasoning, resposta
-        else:
-            for retry in range(max_retries):
-                response = requests.post(self.API_URL, headers=headers, json=payload)
-                if response.status_code == 200:
-                    self.response = response.json()
-                    extract_reasoning = self.response['choices'][0]['message'].get('reasoning_content')
-                    resposta = self.response['choices'][0]['message'].get('content')
-                    logger.debug("Extracted reasoning: %s", extract_reasoning)
-                    logger.debug("Full response content: %s", resposta)
-                    return extract_reasoning, resposta
-            raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+        tokens = estimate_tokens(prompt) if self.rate_limiter is not None else 0
+        attempt = 0
+        while True:
+            _ASYNC_RETRIES.set(attempt)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(tokens)
+            try:
+                status, text, response_headers = await self.async_transport.post(self.API_URL, headers, payload)
+                if status != 200:
+                    raise RequestFailed(status, text, parse_retry_after(response_headers.get("Retry-After")))
+                body = json.loads(text)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success(body, tokens)
+            return body
+
+    async def aclose(self):
+        """Closes both transports; await it from the event loop that made the async calls."""
+        self.transport.close()
+        if self.async_transport is not None:
+            await self.async_transport.close()
+
+    def close(self):
+        """Closes both transports; the aiohttp session is closed on the loop that created it."""
+        self.transport.close()
+        if self.async_transport is not None:
+            self.async_transport.close_sync()
         
 if __name__ == "__main__":
     # Script de teste rápido da integração com a API do LLM
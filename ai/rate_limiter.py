@@ -0,0 +1,146 @@
+"""Client-side throttle for LLM requests: token buckets on requests/min and tokens/min, adapted on 429s."""
+
+import asyncio
+import collections
+import logging
+import threading
+import time
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Token bucket refilled at `per_minute / 60` units per second, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.per_minute = float(per_minute)
+        self.level = self.per_minute
+        self.updated = now
+
+    def refill(self, now: float, scale: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute * scale / 60.0)
+        self.updated = now
+
+    def wait(self, amount: float, scale: float) -> float:
+        # Pedidos maiores que a capacidade passam com o balde cheio e o deixam negativo.
+        needed = min(amount, self.per_minute)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60.0 / (self.per_minute * scale)
+
+
+class RateLimiter:
+    """Shared throttle for every request made through one IAIntegration.
+
+    `acquire(tokens)` blocks until both buckets (requests/min and, when set,
+    tokens/min) can pay for the request. The effective rate is
+    `scale * configured rate` and adapts AIMD-style: each 429 halves `scale`
+    (at most once per `cooldown` seconds, so a burst of concurrent 429s counts
+    once) and pauses everyone for the server's `Retry-After`; each success
+    adds `increase` back, up to the configured rate.
+
+    Without a configured requests/min the limiter is idle until the first 429;
+    it then starts throttling at the request rate observed over the last minute.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        min_scale: float = 0.05,
+        increase: float = 0.02,
+        cooldown: float = 5.0,
+    ):
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self._requests = _Bucket(requests_per_minute, now) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute, now) if tokens_per_minute else None
+        self.scale = 1.0
+        self.min_scale = min_scale
+        self.increase = increase
+        self.cooldown = cooldown
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._recent: Deque[float] = collections.deque()
+        self._first_request: Optional[float] = None
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Consumes capacity and returns 0, or returns (and counts in `waited`) how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now, self.scale)
+                    wait = max(wait, bucket.wait(amount, self.scale))
+            if wait > 0:
+                self.waited += wait
+                return wait
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+            self._recent.append(now)
+            if self._first_request is None:
+                self._first_request = now
+            while self._recent and self._recent[0] < now - 60.0:
+                self._recent.popleft()
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        """Additive increase; charges the tokens/min bucket the difference between usage and estimate."""
+        with self._lock:
+            self.scale = min(1.0, self.scale + self.increase)
+            if self._tokens is not None and actual_tokens is not None:
+                self._tokens.level -= actual_tokens - estimated_tokens
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease and a global pause after a 429."""
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if self._requests is None:
+                # taxa observada na janela disponível (até 60 s), extrapolada para 1 minuto
+                window = min(60.0, max(1.0, now - (self._first_request or now)))
+                recent = sum(1 for t in self._recent if t >= now - window)
+                observed = max(1, round(recent * 60.0 / window))
+                self._requests = _Bucket(observed, now)
+                self._requests.level = 0.0
+                logger.warning("429 without a configured limit; throttling to %d requests/min", observed)
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.scale = max(self.min_scale, self.scale / 2)
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket.level = min(bucket.level, 0.0)
+            logger.warning("429 received; request rate reduced to %.0f%% of the limit", self.scale * 100)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "scale": round(self.scale, 3),
+                "requests_per_minute": self._requests.per_minute * self.scale if self._requests else None,
+                "tokens_per_minute": self._tokens.per_minute * self.scale if self._tokens else None,
+                "rate_limited": self.rate_limited,
+                "waited_seconds": round(self.waited, 1),
+            }
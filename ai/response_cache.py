@@ -0,0 +1,189 @@
+"""Content-addressed on-disk cache of LLM responses."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Persistent cache keyed by a hash of the model name + request payload.
+
+    Each entry is a small JSON file (`<dir>/<ab>/<hash>.json`) holding the
+    reasoning and the response. Modes:
+
+    - ``readwrite``: look up before calling, store new responses (default);
+    - ``readonly``: look up only, never write (e.g. to replay a previous run);
+    - ``bypass``: never look up, but store fresh responses (forces a refresh).
+
+    Entries whose ``created`` timestamp is older than `max_age_seconds` are
+    treated as misses and removed; when the cache grows beyond `max_bytes`,
+    the least recently used entries (by file mtime, refreshed on every hit)
+    are evicted.
+    """
+
+    MODES = ("readwrite", "readonly", "bypass")
+
+    def __init__(
+        self,
+        cache_dir: str = ".cache/llm",
+        mode: str = "readwrite",
+        max_bytes: Optional[int] = 1024 * 1024 * 1024,
+        max_age_seconds: Optional[float] = None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid cache mode {mode!r}; expected one of {self.MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        model = str(payload.get("model", ""))
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256((model + "\n" + body).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _expired(self, created: float, now: Optional[float] = None) -> bool:
+        if self.max_age_seconds is None:
+            return False
+        return (time.time() if now is None else now) - created > self.max_age_seconds
+
+    @staticmethod
+    def _created(path: str) -> Optional[float]:
+        """The entry's ``created`` field (0 if unreadable), or None if the file is gone."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return float(json.load(f).get("created", 0))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return 0.0
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Returns (reasoning, response) for `key`, or None on a miss."""
+        if self.mode == "bypass":
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:
+            logger.warning("Entrada de cache ilegível %s: %s", path, e)
+            entry = None
+
+        if entry is not None and self._expired(entry.get("created", 0)):
+            logger.debug("Entrada de cache expirada: %s", key)
+            if self.mode != "readonly":
+                self._remove(path)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        if self.mode != "readonly":
+            try:
+                os.utime(path)  # marca como usado recentemente (ordem de eviction)
+            except OSError:
+                pass
+        return entry.get("reasoning"), entry.get("response")
+
+    def put(self, key: str, reasoning: Optional[str], response: Optional[str]) -> None:
+        if self.mode == "readonly":
+            return
+        path = self._path(key)
+        data = json.dumps(
+            {"created": time.time(), "reasoning": reasoning, "response": response},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)  # sobrescrita: a entrada antiga sai da conta
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.exception("Erro ao gravar entrada de cache %s: %s", path, e)
+            return
+        with self._lock:
+            self.writes += 1
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - replaced
+        self._enforce_size()
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _enforce_size(self) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+        self.prune()
+
+    def prune(self) -> None:
+        """Removes entries created more than `max_age_seconds` ago, then the
+        least recently used ones until the cache fits in `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        for path, size, _ in entries:
+            over = self.max_bytes is not None and total > self.max_bytes
+            if not over:
+                if self.max_age_seconds is None:
+                    break
+                created = self._created(path)
+                if created is None or not self._expired(created, now):
+                    continue
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
@@ -0,0 +1,101 @@
+"""Retry policy for LLM requests: error classification, exponential backoff with jitter, Retry-After."""
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+from ai.transport import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = "rate_limited"  # 429: retry after the server-requested pause, and slow down
+TRANSIENT = "transient"  # 5xx, timeouts, dropped connections, truncated bodies: retry with backoff
+FATAL = "fatal"  # other 4xx (bad key, bad payload) and unexpected errors: retrying won't help
+
+RETRYABLE_STATUS = frozenset({408, 409, 425, 500, 502, 503, 504})
+
+
+class RequestFailed(Exception):
+    """Non-200 answer from the endpoint."""
+
+    def __init__(self, status: int, text: str, retry_after: Optional[float] = None):
+        super().__init__(f"Request failed with status code {status}: {text}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a `Retry-After` header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def classify_status(status: int) -> str:
+    if status == 429:
+        return RATE_LIMITED
+    if status in RETRYABLE_STATUS or status >= 500:
+        return TRANSIENT
+    return FATAL
+
+
+def classify_error(exc: BaseException) -> str:
+    if isinstance(exc, RequestFailed):
+        return classify_status(exc.status)
+    transient = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        asyncio.TimeoutError,
+        ValueError,  # corpo 200 truncado / JSON inválido
+    )
+    if aiohttp is not None:
+        transient += (aiohttp.ClientError,)
+    if isinstance(exc, transient):
+        return TRANSIENT
+    return FATAL
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring `Retry-After` when the server sends it.
+
+    Attempt `n` (0-based) waits a random time in [0, min(max_delay, base_delay * 2**n)];
+    a `Retry-After` value replaces that wait (capped at `max_retry_after`).
+    """
+
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    max_retry_after: float = 300.0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def next_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after `exc` on `attempt`, or None to give up."""
+        kind = classify_error(exc)
+        if kind == FATAL or attempt >= self.max_retries:
+            return None
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            # um pequeno jitter evita que todas as threads voltem no mesmo instante
+            return min(retry_after, self.max_retry_after) + random.uniform(0, self.base_delay)
+        return self.backoff(attempt)
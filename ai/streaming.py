@@ -0,0 +1,190 @@
+"""Incremental consumption of chat-completions event streams (SSE)."""
+
+import json
+import logging
+import time
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from utils.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+REASONING = "reasoning"
+CONTENT = "content"
+RESET = "reset"  # a tentativa anterior foi descartada (retry): o texto já entregue deve ser apagado
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+# on_delta(kind, text): kind is REASONING, CONTENT or RESET
+DeltaCallback = Callable[[str, str], None]
+
+
+class ReasoningLimitExceeded(Exception):
+    """The model's reasoning went past the configured token or time budget; the stream was abandoned."""
+
+    def __init__(self, reason: str, reasoning_tokens: int, elapsed: float):
+        super().__init__(
+            f"Reasoning aborted ({reason}) after ~{reasoning_tokens} tokens and {elapsed:.1f}s"
+        )
+        self.reason = reason
+        self.reasoning_tokens = reasoning_tokens
+        self.elapsed = elapsed
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[dict]:
+    """Decoded JSON of each `data:` event; stops at `data: [DONE]`."""
+    buffer: List[str] = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            # linha em branco fecha o evento
+            if buffer:
+                data = "\n".join(buffer)
+                buffer = []
+                if data.strip() == "[DONE]":
+                    return
+                yield json.loads(data)
+            continue
+        if line.startswith(":"):
+            continue  # comentário / keep-alive
+        if line.startswith("data:"):
+            buffer.append(line[5:].lstrip(" "))
+    if buffer:
+        data = "\n".join(buffer)
+        if data.strip() != "[DONE]":
+            yield json.loads(data)
+
+
+def _partial_tag_suffix(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is a proper prefix of `tag`."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class StreamAccumulator:
+    """Splits streamed deltas into reasoning and answer as they arrive.
+
+    Reasoning comes either in `delta.reasoning_content` or inline in
+    `delta.content` between `<think>` and `</think>` (tags split across
+    chunks are handled). Every piece is forwarded to `on_delta`, and the
+    reasoning budget (`max_reasoning_tokens` / `max_reasoning_seconds`,
+    measured from the start of the request) is checked after each one.
+    """
+
+    def __init__(
+        self,
+        on_delta: Optional[DeltaCallback] = None,
+        max_reasoning_tokens: Optional[int] = None,
+        max_reasoning_seconds: Optional[float] = None,
+        started: Optional[float] = None,
+    ):
+        self.on_delta = on_delta
+        self.max_reasoning_tokens = max_reasoning_tokens
+        self.max_reasoning_seconds = max_reasoning_seconds
+        self.started = time.monotonic() if started is None else started
+        self.reasoning_parts: List[str] = []
+        self.content_parts: List[str] = []
+        self.reasoning_tokens = 0
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[dict] = None
+        self._in_think = False
+        self._pending = ""
+        self._strip_newline = False
+        self._answer_started = False
+
+    def _emit(self, kind: str, text: str) -> None:
+        if not text:
+            return
+        if kind == REASONING:
+            self.reasoning_parts.append(text)
+            self.reasoning_tokens += estimate_tokens(text)
+        else:
+            self.content_parts.append(text)
+            self._answer_started = self._answer_started or not text.isspace()
+        if self.on_delta is not None:
+            self.on_delta(kind, text)
+
+    def _feed_content(self, text: str) -> None:
+        text = self._pending + text
+        self._pending = ""
+        while text:
+            if self._strip_newline:
+                # como em extrair_reasoning: só uma quebra de linha logo após </think>
+                if text == "\r":
+                    self._pending = text  # pode ser o início de um \r\n
+                    return
+                if text.startswith("\r\n"):
+                    text = text[2:]
+                elif text[0] in "\r\n":
+                    text = text[1:]
+                self._strip_newline = False
+                continue
+            tag = THINK_CLOSE if self._in_think else THINK_OPEN
+            kind = REASONING if self._in_think else CONTENT
+            idx = text.find(tag)
+            if idx == -1:
+                keep = _partial_tag_suffix(text, tag)
+                self._emit(kind, text[:len(text) - keep])
+                self._pending = text[len(text) - keep:]
+                return
+            self._emit(kind, text[:idx])
+            text = text[idx + len(tag):]
+            self._strip_newline = self._in_think
+            self._in_think = not self._in_think
+
+    def feed(self, event: dict) -> None:
+        if event.get("usage"):
+            self.usage = event["usage"]
+        for choice in event.get("choices") or []:
+            delta = choice.get("delta") or {}
+            reasoning = delta.get("reasoning_content") or delta.get("reasoning")
+            if reasoning:
+                self._emit(REASONING, reasoning)
+            if delta.get("content"):
+                self._feed_content(delta["content"])
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+        self.check_limits()
+
+    def check_limits(self) -> None:
+        if self.max_reasoning_tokens is not None and self.reasoning_tokens > self.max_reasoning_tokens:
+            raise ReasoningLimitExceeded("token limit", self.reasoning_tokens, time.monotonic() - self.started)
+        # o limite de tempo só vale enquanto a resposta propriamente dita não começou
+        if (
+            self.max_reasoning_seconds is not None
+            and not self._answer_started
+            and time.monotonic() - self.started > self.max_reasoning_seconds
+        ):
+            raise ReasoningLimitExceeded("time limit", self.reasoning_tokens, time.monotonic() - self.started)
+
+    def finish(self) -> None:
+        """Flushes a dangling partial tag at end of stream."""
+        if self._pending:
+            pending, self._pending = self._pending, ""
+            self._emit(REASONING if self._in_think else CONTENT, pending)
+
+    @property
+    def reasoning(self) -> Optional[str]:
+        text = "".join(self.reasoning_parts)
+        if not text:
+            return None
+        # mesma normalização de extrair_reasoning
+        return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+    @property
+    def content(self) -> str:
+        return "".join(self.content_parts)
+
+    def as_body(self) -> dict:
+        """Non-streaming-shaped body, so `get_tokens_used` & co. keep working."""
+        return {
+            "choices": [{
+                "message": {"reasoning_content": self.reasoning, "content": self.content},
+                "finish_reason": self.finish_reason,
+            }],
+            "usage": self.usage or {},
+        }
@@ -0,0 +1,123 @@
+"""HTTP transports used by IAIntegration: pooled keep-alive session and async client."""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:  # aiohttp é opcional: sem ele o cliente assíncrono usa threads sobre HttpTransport
+    import aiohttp
+except ImportError:  # pragma: no cover - depende do ambiente
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 600.0
+
+
+class HttpTransport:
+    """Persistent `requests.Session` with a connection pool sized to the pipeline concurrency.
+
+    Connections are kept alive between prompts, so only the first request to
+    the endpoint pays the TCP+TLS handshake. Every request carries a
+    (connect, read) timeout, so a hung call fails instead of stalling the run.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+    ):
+        self.pool_size = max(1, int(pool_size))
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        # pool_block=True: excess threads wait for a free connection instead of opening throwaway ones.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def timeout(self) -> Tuple[float, Optional[float]]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+        return self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+
+    def post_stream(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+        """Like `post`, but the body is left unread; use as a context manager to release the connection.
+
+        The read timeout applies between received chunks, not to the whole stream.
+        """
+        return self.session.post(url, headers=headers, json=payload, timeout=self.timeout, stream=True)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    """aiohttp-based transport with the same pooling and timeout settings as HttpTransport.
+
+    The aiohttp session is bound to the event loop that first uses it and is
+    created lazily; await `close()` from that loop when done, or call
+    `close_sync()` from synchronous code to close it on that same loop.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+    ):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for AsyncHttpTransport (pip install aiohttp)")
+        self.pool_size = max(1, int(pool_size))
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._loop = asyncio.get_running_loop()
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def post(
+        self, url: str, headers: Dict[str, str], payload: Dict[str, Any]
+    ) -> Tuple[int, str, Dict[str, str]]:
+        """Returns (status_code, body text, response headers)."""
+        async with self._get_session().post(url, headers=headers, json=payload) as response:
+            return response.status, await response.text(), dict(response.headers)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def close_sync(self) -> None:
+        """Closes the session on the loop that created it (scheduled if that loop is running)."""
+        session, loop = self._session, self._loop
+        if session is None or session.closed or loop is None:
+            return
+        if loop.is_closed():
+            # its connections went away with the loop; nothing left to await on
+            logger.debug("aiohttp session outlived its event loop; dropping it")
+            self._session = None
+            return
+        if loop.is_running():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                loop.create_task(session.close())
+            else:
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        loop.run_until_complete(session.close())
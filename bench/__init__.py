@@ -0,0 +1 @@
+"""Ferramentas de benchmark offline: servidor LLM simulado e corpora sintéticos."""
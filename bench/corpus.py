@@ -0,0 +1,66 @@
+"""Corpora para benchmark: cópia ou ampliação sintética dos códigos de `codes/`."""
+
+import logging
+import os
+import re
+import shutil
+from typing import List, Optional
+
+from utils.c_functions import find_functions
+
+logger = logging.getLogger(__name__)
+
+
+def _renamed(code: str, suffix: str) -> str:
+    """Acrescenta `suffix` ao nome de todas as funções definidas em `code` (e às chamadas a elas)."""
+    names = sorted({fn.name for fn in find_functions(code)}, key=len, reverse=True)
+    if not names:
+        return code
+    pattern = re.compile(r"\b(" + "|".join(re.escape(n) for n in names) + r")\b")
+    return pattern.sub(lambda m: m.group(1) + suffix, code)
+
+
+def build_corpus(
+    source_dir: str,
+    dest_dir: str,
+    scale: int = 1,
+    grow: int = 1,
+    limit: Optional[int] = None,
+) -> List[str]:
+    """
+    Monta em `dest_dir` um corpus derivado de `source_dir`:
+
+    - `scale`: cada arquivo aparece `scale` vezes (`nome_k.c`), ampliando o
+      número de arquivos;
+    - `grow`: cada arquivo é concatenado `grow` vezes com as funções
+      renomeadas, ampliando o número de funções e o tamanho de cada arquivo;
+    - `limit`: usa só os `limit` primeiros arquivos (em ordem alfabética).
+
+    Retorna os nomes dos arquivos criados.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    sources = sorted(e for e in os.listdir(source_dir) if os.path.isfile(os.path.join(source_dir, e)))
+    if limit is not None:
+        sources = sources[:limit]
+
+    created: List[str] = []
+    for fname in sources:
+        path = os.path.join(source_dir, fname)
+        base, ext = os.path.splitext(fname)
+        if grow > 1:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                code = f.read()
+            body = code + "".join("\n" + _renamed(code, f"_g{k}") for k in range(1, grow))
+        else:
+            body = None
+        for copy in range(1, max(1, scale) + 1):
+            target = fname if scale <= 1 else f"{base}_{copy}{ext}"
+            target_path = os.path.join(dest_dir, target)
+            if body is None:
+                shutil.copyfile(path, target_path)
+            else:
+                with open(target_path, "w", encoding="utf-8") as f:
+                    f.write(body)
+            created.append(target)
+    logger.info("Corpus de benchmark: %d arquivos em %s (scale=%d, grow=%d)", len(created), dest_dir, scale, grow)
+    return created
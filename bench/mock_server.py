@@ -0,0 +1,359 @@
+"""
+Servidor HTTP local que imita o endpoint de chat-completions, para medir o
+pipeline sem gastar cota da API real.
+
+Uso avulso (o benchmark.py também o inicia em processo):
+
+    python -m bench.mock_server --port 8000 --latency lognormal:2,0.5 --error-rate 0.02
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from utils.c_functions import find_functions
+from utils.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+Distribution = Callable[[random.Random], float]
+
+_FILLER = "The path constraints on this branch were checked against the data flow of the function. "
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """
+    Converte uma especificação em um sorteador de valores >= 0:
+    "0.5" ou "const:0.5", "uniform:a,b", "normal:media,desvio",
+    "lognormal:mediana,sigma" e "exp:media".
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "const", kind
+    try:
+        values = [float(v) for v in args.split(",")]
+    except ValueError:
+        raise ValueError(f"Distribuição inválida: {spec!r}")
+    kind = kind.strip().lower()
+    if kind == "const" and len(values) == 1:
+        return lambda rng: max(0.0, values[0])
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: max(0.0, rng.uniform(values[0], values[1]))
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Distribuição inválida: {spec!r}")
+
+
+@dataclass
+class MockConfig:
+    """Comportamento do servidor simulado."""
+
+    latency: str = "const:0.05"  # tempo até o primeiro token (s)
+    tokens_per_second: float = 0.0  # velocidade de geração; 0 = instantânea
+    completion_tokens: str = "const:200"  # tamanho da resposta
+    reasoning_tokens: str = "const:400"  # tamanho do reasoning
+    error_rate: float = 0.0  # fração de respostas com `error_status`
+    error_status: int = 503
+    burst_every: float = 0.0  # a cada N segundos...
+    burst_duration: float = 0.0  # ...responde 429 durante os últimos `burst_duration` segundos
+    retry_after: float = 1.0  # valor do cabeçalho Retry-After nos 429
+    slots: int = 0  # requisições atendidas em paralelo; 0 = sem limite (as demais esperam)
+    seed: Optional[int] = None
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.status: Dict[int, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.busy_seconds = 0.0  # soma das durações das requisições
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def enter(self) -> None:
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self, status: int, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.status[status] = self.status.get(status, 0) + 1
+            self.busy_seconds += seconds
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "requests": self.requests,
+                "status": {str(k): v for k, v in sorted(self.status.items())},
+                "peak_in_flight": self.peak_in_flight,
+                "mean_in_flight": round(self.busy_seconds / elapsed, 3) if elapsed > 0 else 0.0,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+_FILLER_TOKENS = estimate_tokens(_FILLER)
+
+
+def _text_of_size(tokens: int, seed_text: str = "") -> str:
+    missing = max(0, tokens - estimate_tokens(seed_text))
+    return seed_text + _FILLER * math.ceil(missing / _FILLER_TOKENS)
+
+
+def _answer_for(prompt: str, completion_tokens: int) -> str:
+    """Resposta plausível para cada template do pipeline."""
+    if "extract **only the names**" in prompt:
+        code = prompt.split("\n---\n", 1)[0]
+        return "\n".join(dict.fromkeys(fn.name for fn in find_functions(code)))
+    if "Graphviz DOT format for a specific function" in prompt:
+        match = re.search(r"for a specific function ([A-Za-z_][A-Za-z0-9_]*)", prompt)
+        return _digraph(match.group(1) if match else "f", completion_tokens)
+    # prompts em lote (core.batching): uma seção delimitada por função
+    if "Graphviz DOT format for EACH of the following functions" in prompt:
+        names = re.findall(r"^- `([A-Za-z_][A-Za-z0-9_]*)`$", prompt.split("\n---\n", 1)[-1], re.M)
+        return _sections(names, lambda name: _digraph(name, completion_tokens // max(1, len(names))))
+    if "identify infeasible paths in EACH function" in prompt:
+        names = list(dict.fromkeys(re.findall(r"^\[function ([A-Za-z_][A-Za-z0-9_]*)\]$", prompt, re.M)))
+        size = completion_tokens // max(1, len(names))
+        return _sections(names, lambda name: _text_of_size(size, "Infeasible path analysis.\n"))
+    return _text_of_size(completion_tokens, "Infeasible path analysis.\n")
+
+
+def _digraph(name: str, completion_tokens: int) -> str:
+    nodes = max(2, completion_tokens // 25)
+    lines = [f"digraph {name} {{"]
+    for k in range(1, nodes + 1):
+        lines.append(f'  {k} [label="{k}", xlabel="Def: v{k}; P-Use: v{k - 1}"];')
+    for k in range(1, nodes):
+        lines.append(f'  {k} -> {k + 1} [label="True\\n(v{k} > {k})"];')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def _sections(names: List[str], body: Callable[[str], str]) -> str:
+    return "\n".join(
+        f"=== BEGIN FUNCTION {name} ===\n{body(name)}\n=== END FUNCTION {name} ===" for name in names
+    )
+
+
+class MockLLMServer:
+    """ThreadingHTTPServer com o comportamento de `MockConfig`; use como context manager."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._latency = parse_distribution(self.config.latency)
+        self._completion = parse_distribution(self.config.completion_tokens)
+        self._reasoning = parse_distribution(self.config.reasoning_tokens)
+        self._slots = threading.Semaphore(self.config.slots) if self.config.slots > 0 else None
+        self.stats = _Stats()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api/chat/completions"
+
+    def start(self) -> "MockLLMServer":
+        self.stats = _Stats()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _draw(self) -> dict:
+        cfg = self.config
+        with self._rng_lock:
+            rng = self._rng
+            elapsed = time.monotonic() - self.stats.started
+            # a rajada ocupa o fim de cada janela de `burst_every` segundos
+            in_burst = cfg.burst_every > 0 and elapsed % cfg.burst_every >= cfg.burst_every - cfg.burst_duration
+            return {
+                "rate_limited": in_burst,
+                "error": not in_burst and rng.random() < cfg.error_rate,
+                "latency": self._latency(rng),
+                "completion_tokens": max(1, int(self._completion(rng))),
+                "reasoning_tokens": max(0, int(self._reasoning(rng))),
+            }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                logger.debug("mock: " + fmt, *args)
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                started = time.monotonic()
+                server.stats.enter()
+                status, prompt_tokens, completion_tokens = 200, 0, 0
+                try:
+                    draw = server._draw()
+                    if draw["rate_limited"]:
+                        status = 429
+                        self._send(429, b"rate limited", {"Retry-After": f"{server.config.retry_after:g}"})
+                        return
+                    if draw["error"]:
+                        status = server.config.error_status
+                        self._send(status, b"simulated failure")
+                        return
+                    if server._slots is not None:
+                        server._slots.acquire()
+                    try:
+                        prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+                        prompt_tokens = estimate_tokens(prompt)
+                        content = _answer_for(prompt, draw["completion_tokens"])
+                        reasoning = _text_of_size(draw["reasoning_tokens"]) if draw["reasoning_tokens"] else ""
+                        completion_tokens = estimate_tokens(content) + estimate_tokens(reasoning)
+                        time.sleep(draw["latency"])
+                        generation = completion_tokens / server.config.tokens_per_second if server.config.tokens_per_second > 0 else 0.0
+                        usage = {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens,
+                        }
+                        if payload.get("stream"):
+                            self._stream(reasoning, content, usage, generation)
+                        else:
+                            time.sleep(generation)
+                            body = {
+                                "choices": [{
+                                    "message": {"role": "assistant", "reasoning_content": reasoning, "content": content},
+                                    "finish_reason": "stop",
+                                }],
+                                "usage": dict(usage, approximate_total=f"0h0m{int(time.monotonic() - started)}s"),
+                            }
+                            self._send(200, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"})
+                    finally:
+                        if server._slots is not None:
+                            server._slots.release()
+                except (BrokenPipeError, ConnectionResetError):
+                    status = 499  # cliente desistiu (ex.: reasoning abortado)
+                finally:
+                    server.stats.leave(status, time.monotonic() - started, prompt_tokens, completion_tokens)
+
+            def _stream(self, reasoning: str, content: str, usage: dict, generation: float) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [("reasoning_content", reasoning[i:i + 200]) for i in range(0, len(reasoning), 200)]
+                pieces += [("content", content[i:i + 200]) for i in range(0, len(content), 200)]
+                pause = generation / len(pieces) if pieces else 0.0
+                for field_name, text in pieces:
+                    time.sleep(pause)
+                    event = {"choices": [{"delta": {field_name: text}, "finish_reason": None}]}
+                    self._chunk(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                self._chunk(b"data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": "stop"}]}).encode("utf-8") + b"\n\n")
+                self._chunk(b"data: " + json.dumps({"choices": [], "usage": usage}).encode("utf-8") + b"\n\n")
+                self._chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opções de `MockConfig`, compartilhadas com benchmark.py."""
+    defaults = MockConfig()
+    group = parser.add_argument_group("servidor simulado")
+    group.add_argument("--latency", default=defaults.latency, help="Distribuição do tempo até o primeiro token (ex.: const:0.05, uniform:0.5,2, lognormal:1.5,0.6, exp:1).")
+    group.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second, help="Velocidade de geração simulada (0 = instantânea).")
+    group.add_argument("--completion-tokens", default=defaults.completion_tokens, help="Distribuição do tamanho da resposta em tokens.")
+    group.add_argument("--reasoning-tokens", default=defaults.reasoning_tokens, help="Distribuição do tamanho do reasoning em tokens.")
+    group.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Fração de respostas com erro (--error-status).")
+    group.add_argument("--error-status", type=int, default=defaults.error_status, help="Status HTTP das falhas simuladas.")
+    group.add_argument("--burst-every", type=float, default=defaults.burst_every, help="Intervalo (s) entre rajadas de 429 (0 = sem rajadas).")
+    group.add_argument("--burst-duration", type=float, default=defaults.burst_duration, help="Duração (s) de cada rajada de 429.")
+    group.add_argument("--retry-after", type=float, default=defaults.retry_after, help="Retry-After (s) enviado nos 429.")
+    group.add_argument("--slots", type=int, default=defaults.slots, help="Requisições atendidas em paralelo pelo servidor (0 = sem limite).")
+    group.add_argument("--seed", type=int, default=defaults.seed, help="Semente dos sorteios, para execuções reproduzíveis.")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        reasoning_tokens=args.reasoning_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        burst_every=args.burst_every,
+        burst_duration=args.burst_duration,
+        retry_after=args.retry_after,
+        slots=args.slots,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Endpoint de chat-completions simulado para benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = MockLLMServer(config_from_args(args), host=args.host, port=args.port).start()
+    logger.info("Servidor simulado em %s (Ctrl+C para encerrar)", server.url)
+    try:
+        while True:
+            time.sleep(10)
+            logger.info("Estatísticas: %s", server.stats.snapshot())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
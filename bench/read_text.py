@@ -0,0 +1,128 @@
+"""
+Micro-benchmark da leitura de fontes (`FileUtils.read_text`).
+
+Compara a implementação anterior (encodings tentados em ordem fixa) com a
+atual (encoding farejado uma vez pelo BOM e pela amostra, mais a cache por
+caminho + mtime) sobre os arquivos de `codes/` e sobre entradas sintéticas
+grandes em vários encodings. A normalização continua sendo o
+split/rstrip/join de antes: sem cache, os tempos ficam praticamente iguais
+aos da versão anterior; o ganho vem das leituras repetidas, servidas pela
+cache.
+
+    python -m bench.read_text --repeat 20 --synthetic-mb 8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from utils.file_utils import FileUtils, _read_cache
+
+
+def legacy_read_text(path: str) -> str:
+    """`safe_read_text` como era antes da detecção de encoding e da cache (referência do benchmark)."""
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    text = None
+    for enc in ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "latin-1"]:
+        try:
+            text = raw.decode(enc)
+            break
+        except Exception:
+            continue
+    if text is None:
+        text = raw.decode("utf-8", errors="replace")
+    if "\x00" in text:
+        text = text.replace("\x00", "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(ln.rstrip() for ln in text.split("\n"))
+    return text.strip("\n") + ("\n" if text.endswith("\n") else "")
+
+
+def _synthetic_inputs(codes_dir: str, dest: str, megabytes: int) -> List[str]:
+    """Concatena os fontes de `codes_dir` até ~`megabytes` MB e grava em UTF-8, UTF-8 com BOM/CRLF, cp1252 e UTF-16."""
+    sources = sorted(e for e in os.listdir(codes_dir) if os.path.isfile(os.path.join(codes_dir, e)))
+    seed = "".join(FileUtils.read_text(os.path.join(codes_dir, e), max_chars=None).text for e in sources)
+    seed = seed or "int main(void) { return 0; }\n"
+    text = (seed * (megabytes * 1024 * 1024 // len(seed) + 1))[: megabytes * 1024 * 1024]
+    # comentário acentuado e espaços no fim de linha, comuns nos fontes reais
+    text = text.replace("\n", "  /* ação */   \n", 1000)
+    variants = {
+        "utf8.c": text.encode("utf-8"),
+        "utf8_bom_crlf.c": b"\xef\xbb\xbf" + text.replace("\n", "\r\n").encode("utf-8"),
+        "cp1252.c": text.encode("cp1252", errors="replace"),
+        "utf16.c": text.encode("utf-16"),
+    }
+    paths = []
+    for name, raw in variants.items():
+        path = os.path.join(dest, name)
+        with open(path, "wb") as f:
+            f.write(raw)
+        paths.append(path)
+    return paths
+
+
+def _measure(fn: Callable[[str], object], paths: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            fn(path)
+    return time.perf_counter() - start
+
+
+def run(codes_dir: str = "codes", repeat: int = 20, synthetic_mb: int = 8) -> Dict[str, dict]:
+    workdir = tempfile.mkdtemp(prefix="bench_read_")
+    try:
+        codes = sorted(
+            os.path.join(codes_dir, e) for e in os.listdir(codes_dir) if os.path.isfile(os.path.join(codes_dir, e))
+        ) if os.path.isdir(codes_dir) else []
+        synthetic = _synthetic_inputs(codes_dir, workdir, synthetic_mb) if codes else []
+        report = {}
+        for label, paths, n in (("codes", codes, repeat), ("synthetic", synthetic, max(1, repeat // 10))):
+            if not paths:
+                continue
+            for path in paths:
+                decoded = FileUtils.read_text(path, max_chars=None)
+                if decoded.encoding.startswith("utf-8"):
+                    # a versão anterior mantinha o BOM UTF-8 no texto; fora isso, o resultado é o mesmo
+                    assert legacy_read_text(path).lstrip("\ufeff") == decoded.text, path
+            legacy = _measure(legacy_read_text, paths, n)
+            _read_cache.clear()
+            cold = _measure(lambda p: (_read_cache.clear(), FileUtils.read_text(p, max_chars=None)), paths, n)
+            warm = _measure(lambda p: FileUtils.read_text(p, max_chars=None), paths, n)
+            size = sum(os.path.getsize(p) for p in paths)
+            report[label] = {
+                "files": len(paths),
+                "megabytes": round(size / 1e6, 2),
+                "repeat": n,
+                "legacy_seconds": round(legacy, 4),
+                "cold_seconds": round(cold, 4),
+                "cached_seconds": round(warm, 4),
+                "cold_speedup": round(legacy / cold, 2) if cold else None,
+                "cached_speedup": round(legacy / warm, 2) if warm else None,
+                "encodings": sorted({FileUtils.read_text(p, max_chars=None).encoding for p in paths}),
+            }
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark de FileUtils.read_text.")
+    parser.add_argument("--codes", default="codes", help="Diretório com os códigos (padrão: codes).")
+    parser.add_argument("--repeat", type=int, default=20, help="Leituras de cada arquivo de codes/ (as sintéticas usam repeat/10).")
+    parser.add_argument("--synthetic-mb", type=int, default=8, help="Tamanho de cada entrada sintética em MB.")
+    args = parser.parse_args()
+    for label, r in run(args.codes, args.repeat, args.synthetic_mb).items():
+        print(
+            f"{label:10s} arquivos={r['files']:<3d} {r['megabytes']:>7.2f} MB x{r['repeat']:<3d} "
+            f"anterior={r['legacy_seconds']:.3f}s sem_cache={r['cold_seconds']:.3f}s ({r['cold_speedup']}x) "
+            f"com_cache={r['cached_seconds']:.3f}s ({r['cached_speedup']}x) encodings={','.join(r['encodings'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Benchmark offline do pipeline contra um endpoint de chat-completions simulado.
+
+Sobe `bench.mock_server.MockLLMServer` no próprio processo, roda `Pipeline`
+sobre `codes/` (ou um corpus ampliado) com cache e resume desligados e
+reporta tempo de parede, requisições/s, utilização da concorrência e memória.
+
+Exemplo:
+
+    python benchmark.py --max-files 4 --max-workers 4 --max-requests 8 \
+        --latency lognormal:1,0.5 --tokens-per-second 400 --error-rate 0.02 \
+        --burst-every 30 --burst-duration 3 --scale 2 --report bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+from bench.corpus import build_corpus
+from bench.mock_server import MockLLMServer, add_mock_arguments, config_from_args
+from core.batching import DEFAULT_BATCH_MAX_CCN, DEFAULT_BATCH_MAX_LINES
+from core.pipeline_main import Pipeline
+from utils.cdfg_paths import PATH_MODES
+from utils.file_utils import COMPRESSIONS
+
+try:  # resource só existe em sistemas Unix
+    import resource
+except ImportError:  # pragma: no cover - depende do sistema
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline com um LLM simulado.")
+    parser.add_argument("--codes", default="codes", help="Diretório com os códigos de origem (padrão: codes).")
+    parser.add_argument("--limit", type=int, default=None, help="Usa só os N primeiros arquivos.")
+    parser.add_argument("--scale", type=int, default=1, help="Copia cada arquivo N vezes (mais arquivos).")
+    parser.add_argument("--grow", type=int, default=1, help="Concatena cada arquivo N vezes com funções renomeadas (arquivos maiores).")
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--max-files", type=int, default=1)
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--requests-per-minute", type=float, default=None)
+    parser.add_argument("--tokens-per-minute", type=float, default=None)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--slice-prompts", action="store_true")
+    parser.add_argument("--path-mode", choices=PATH_MODES, default=None, help="Enumeração local de caminhos (ver pipeline.py).")
+    parser.add_argument("--prefilter", action="store_true", help="Pré-filtro local dos caminhos candidatos (ver pipeline.py).")
+    parser.add_argument("--store", action="store_true", help="Grava os artefatos num banco SQLite em vez de arquivos texto.")
+    parser.add_argument("--sync-writes", action="store_true", help="Grava os artefatos na thread de trabalho (ver pipeline.py).")
+    parser.add_argument("--compress-artifacts", choices=COMPRESSIONS, default=None, help="Comprime prompts e reasonings grandes.")
+    parser.add_argument("--dedup-prompts", action="store_true", help="Prompts como manifestos de blobs (ver pipeline.py).")
+    parser.add_argument("--batch-functions", type=int, default=0, help="Funções pequenas por requisição em lote (ver pipeline.py).")
+    parser.add_argument("--batch-max-lines", type=int, default=DEFAULT_BATCH_MAX_LINES)
+    parser.add_argument("--batch-max-ccn", type=int, default=DEFAULT_BATCH_MAX_CCN)
+    parser.add_argument("--trace-memory", action="store_true", help="Mede o pico de memória Python com tracemalloc (mais lento).")
+    parser.add_argument("--keep-output", default=None, help="Copia a saída do pipeline para este diretório.")
+    parser.add_argument("--report", default=None, help="Grava o relatório JSON neste arquivo.")
+    parser.add_argument("--log-level", default="WARNING", help="Nível de log do pipeline durante a medição.")
+    add_mock_arguments(parser)
+    return parser.parse_args()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss é em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        corpus_dir = os.path.join(workdir, "codes")
+        files = build_corpus(args.codes, corpus_dir, scale=args.scale, grow=args.grow, limit=args.limit)
+        output_dir = os.path.join(workdir, "output")
+
+        with MockLLMServer(config_from_args(args)) as server:
+            pipeline = Pipeline(
+                codes_dir=corpus_dir,
+                output_base=output_dir,
+                max_workers=args.max_workers,
+                max_files=args.max_files,
+                max_concurrent_requests=args.max_requests,
+                cache=None,
+                slice_prompts=args.slice_prompts,
+                max_retries=args.max_retries,
+                requests_per_minute=args.requests_per_minute,
+                tokens_per_minute=args.tokens_per_minute,
+                stream=args.stream,
+                api_url=server.url,
+                api_key="benchmark",
+                path_mode=args.path_mode,
+                prefilter=args.prefilter,
+                result_store=os.path.join(output_dir, "results.sqlite") if args.store else None,
+                async_writes=not args.sync_writes,
+                compress_artifacts=args.compress_artifacts,
+                dedup_prompts=args.dedup_prompts,
+                batch_functions=args.batch_functions,
+                batch_max_lines=args.batch_max_lines,
+                batch_max_ccn=args.batch_max_ccn,
+            )
+            if args.trace_memory:
+                tracemalloc.start()
+            cpu0 = time.process_time()
+            t0 = time.perf_counter()
+            pipeline.run()
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - cpu0
+            traced_peak = None
+            if args.trace_memory:
+                traced_peak = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+                tracemalloc.stop()
+            served = server.stats.snapshot()
+
+        concurrency = args.max_requests or args.max_files * args.max_workers
+        mean_in_flight = served["busy_seconds"] / wall if wall > 0 else 0.0
+        with open(os.path.join(output_dir, "metrics.json"), encoding="utf-8") as f:
+            metrics = json.load(f)
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k not in ("report", "keep_output", "log_level")},
+            "files": len(files),
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "requests": served["requests"],
+            "requests_per_second": round(served["requests"] / wall, 3) if wall > 0 else 0.0,
+            "status": served["status"],
+            "peak_in_flight": served["peak_in_flight"],
+            "mean_in_flight": round(mean_in_flight, 3),
+            # fração da concorrência configurada efetivamente ocupada com requisições
+            "concurrency_utilization": round(mean_in_flight / concurrency, 3) if concurrency else None,
+            "completion_tokens_per_second": round(served["completion_tokens"] / wall, 1) if wall > 0 else 0.0,
+            "peak_rss_mb": _peak_rss_mb(),
+            "traced_peak_mb": traced_peak,
+            "rate_limiter": pipeline.rate_limiter.stats(),
+            "pipeline": metrics,
+        }
+        if args.keep_output:
+            shutil.copytree(output_dir, args.keep_output, dirs_exist_ok=True)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = run_benchmark(args)
+    stages = report["pipeline"]["stages"]
+    print(f"arquivos: {report['files']}  tempo: {report['wall_seconds']:.2f}s  cpu: {report['cpu_seconds']:.2f}s")
+    print(
+        f"requisições: {report['requests']} ({report['requests_per_second']:.2f}/s)  status: {report['status']}"
+    )
+    print(
+        f"concorrência: pico {report['peak_in_flight']}, média {report['mean_in_flight']:.2f}, "
+        f"utilização {report['concurrency_utilization']}"
+    )
+    print(f"memória: pico RSS {report['peak_rss_mb']} MB, tracemalloc {report['traced_peak_mb']} MB")
+    kinds = (
+        "llm_call", "generate_cdfg", "generate_cdfg_batch", "prefilter", "detecting_infeasible_paths_in_function",
+        "detecting_infeasible_paths_batch", "detecting_all_infeasible_paths", "file",
+    )
+    for kind in kinds:
+        if kind in stages:
+            s = stages[kind]
+            print(f"  {kind:40s} n={s['count']:<5d} p50={s['p50_seconds']:.3f}s p95={s['p95_seconds']:.3f}s")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Agrupamento de funções pequenas em uma única requisição à LLM.
+
+Funções curtas (`my_abs`, `putbyte`, os invólucros de 4 linhas do des.c)
+pagam, cada uma, o prefixo com o arquivo inteiro e o custo fixo de
+raciocínio do modelo em duas chamadas (CDFG e caminhos inviáveis). Com o
+agrupamento, até N funções selecionadas por tamanho (linhas) e CCN vão num
+mesmo prompt. A resposta traz uma seção por função, delimitada por
+
+    === BEGIN FUNCTION nome ===
+    ...
+    === END FUNCTION nome ===
+
+e é separada de volta por função; as funções sem seção válida voltam para
+a chamada individual.
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from utils.c_functions import find_functions, function_source, mask_source
+from utils.cdfg import CDFG
+from utils.cdfg_paths import PathSet
+from utils.models import FunctionMetrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_MAX_LINES = 15
+DEFAULT_BATCH_MAX_CCN = 3
+
+BEGIN_MARK = "=== BEGIN FUNCTION {name} ==="
+END_MARK = "=== END FUNCTION {name} ==="
+_SECTION = re.compile(
+    r"^[ \t>*`]*===\s*BEGIN FUNCTION\s+`?(?P<name>[A-Za-z_][A-Za-z0-9_]*)`?\s*===[ \t*`]*\n"
+    r"(?P<body>.*?)"
+    r"^[ \t>*`]*===\s*END FUNCTION\s+`?(?P=name)`?\s*===",
+    re.M | re.S,
+)
+# Pontos de decisão contados na estimativa local de CCN (1 + decisões).
+_DECISION = re.compile(r"\b(?:if|for|while|case)\b|&&|\|\||\?")
+
+
+class FunctionSize(NamedTuple):
+    name: str
+    lines: int
+    ccn: int
+
+
+class BatchItem(NamedTuple):
+    """Função de um lote de análise de caminhos inviáveis, com o CDFG já obtido."""
+    function: str
+    cdfg: str
+    graph: Optional[CDFG] = None
+    # caminhos ainda indecisos (todos, sem o pré-filtro) a julgar pela LLM
+    paths: Optional[PathSet] = None
+    # relatório do pré-filtro local, gravado junto com a seção da função
+    local_report: Optional[str] = None
+
+
+def function_sizes(code: str, metrics: Optional[Sequence[FunctionMetrics]] = None) -> Dict[str, FunctionSize]:
+    """
+    Linhas e CCN de cada função de `code`: do relatório do lizard quando a
+    função está nele, senão estimados localmente (linhas da definição e
+    1 + pontos de decisão no corpo sem comentários e strings).
+    """
+    sizes: Dict[str, FunctionSize] = {}
+    for m in metrics or ():
+        sizes.setdefault(m.name, FunctionSize(m.name, m.nloc, m.ccn))
+    masked = None
+    for fn in find_functions(code):
+        if fn.name in sizes:
+            continue
+        if masked is None:
+            masked = mask_source(code)  # mesmo tamanho do original: offsets continuam válidos
+        body = function_source(masked, fn)
+        sizes[fn.name] = FunctionSize(fn.name, fn.end_line - fn.start_line + 1, 1 + len(_DECISION.findall(body)))
+    return sizes
+
+
+def plan_batches(
+    functions: Sequence[str],
+    sizes: Dict[str, FunctionSize],
+    batch_size: int,
+    max_lines: int = DEFAULT_BATCH_MAX_LINES,
+    max_ccn: int = DEFAULT_BATCH_MAX_CCN,
+) -> List[List[str]]:
+    """
+    Unidades de trabalho na ordem de `functions`: listas de uma função
+    (chamada individual) ou lotes de até `batch_size` funções pequenas. Uma
+    função fora de `sizes` (não localizada) nunca entra em lote.
+    """
+    small = [
+        f for f in functions
+        if f in sizes and sizes[f].lines <= max_lines and sizes[f].ccn <= max_ccn
+    ]
+    if batch_size < 2 or len(small) < 2:
+        return [[f] for f in functions]
+    # uma sobra isolada no fim não forma lote: segue como chamada individual
+    batches = [b for b in (small[i:i + batch_size] for i in range(0, len(small), batch_size)) if len(b) > 1]
+    first = {batch[0]: batch for batch in batches}
+    batched = {f for batch in batches for f in batch}
+    units: List[List[str]] = []
+    for f in functions:
+        if f in first:
+            units.append(first[f])
+        elif f not in batched:
+            units.append([f])
+    return units
+
+
+def format_function_list(functions: Iterable[str]) -> str:
+    return "\n".join(f"- `{f}`" for f in functions)
+
+
+def split_sections(reply: Optional[str], functions: Sequence[str]) -> Dict[str, str]:
+    """Seções não vazias da resposta, por função pedida (funções ausentes ou repetidas ficam de fora)."""
+    wanted = set(functions)
+    sections: Dict[str, str] = {}
+    repeated = set()
+    for m in _SECTION.finditer(reply or ""):
+        name, body = m.group("name"), m.group("body").strip()
+        if name not in wanted or not body:
+            continue
+        if name in sections:
+            repeated.add(name)
+        sections[name] = body
+    for name in repeated:
+        # duas seções para a mesma função: ambíguo, a função volta para a chamada individual
+        logger.warning("Resposta em lote com mais de uma seção para %s; ignorando", name)
+        del sections[name]
+    missing = [f for f in functions if f not in sections]
+    if missing:
+        logger.warning("Resposta em lote sem seção válida para: %s", ", ".join(missing))
+    return sections
+
+
+def batch_label(functions: Sequence[str]) -> str:
+    """Rótulo do lote nos nomes de arquivo e etapas: primeira função e tamanho (`my_abs_x3`)."""
+    return f"{functions[0]}_x{len(functions)}"
+
+
+def combined_code(functions: Sequence[str], code: str, contexts: Dict[str, str]) -> str:
+    """Código do prompt do lote: o arquivo inteiro ou, com recortes por função, a junção dos recortes distintos."""
+    sliced = [contexts[f] for f in functions if f in contexts]
+    if len(sliced) < len(functions):
+        return code
+    return "\n".join(dict.fromkeys(sliced))
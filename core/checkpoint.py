@@ -0,0 +1,82 @@
+"""Manifesto de checkpoint por arquivo: registra as etapas concluídas para retomar execuções."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def hash_input(*parts: str) -> str:
+    """Hash sha256 das entradas de uma etapa (prompt, nome da função etc.)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class RunManifest:
+    """
+    Manifesto JSON (`<output_dir>/manifest.json`) com uma entrada por etapa:
+    `fetch_all_functions`, `generate_cdfg:<func>`, `infeasible_paths:<func>` e
+    `infeasible_paths_all_functions`. Cada entrada guarda o hash das entradas
+    da etapa e o arquivo de saída; uma etapa só é considerada concluída se o
+    hash for o mesmo e o arquivo ainda existir.
+
+    O manifesto é regravado (de forma atômica) a cada etapa concluída, então
+    uma interrupção no meio da execução preserva o progresso já feito.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning("Manifesto ilegível, ignorando %s: %s", self.path, e)
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            logger.warning("Versão de manifesto incompatível em %s, ignorando", self.path)
+            return
+        self.stages = data.get("stages", {})
+
+    def _save(self) -> None:
+        data = {"version": MANIFEST_VERSION, "stages": self.stages}
+        tmp_path = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def completed_output(self, stage: str, input_hash: str) -> Optional[str]:
+        """Caminho da saída da etapa se ela já foi concluída com as mesmas entradas."""
+        with self._lock:
+            entry = self.stages.get(stage)
+        if not entry or entry.get("input_hash") != input_hash:
+            return None
+        output = entry.get("output")
+        if not output or not os.path.isfile(output):
+            return None
+        return output
+
+    def mark_done(self, stage: str, input_hash: str, output: str) -> None:
+        with self._lock:
+            self.stages[stage] = {"input_hash": input_hash, "output": output, "completed_at": time.time()}
+            try:
+                self._save()
+            except Exception as e:
+                logger.exception("Erro ao salvar manifesto %s: %s", self.path, e)
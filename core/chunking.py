@@ -0,0 +1,31 @@
+"""Divisão de entradas grandes em lotes que cabem no contexto do modelo."""
+
+import logging
+from typing import List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de um prompt, em caracteres (~30k tokens).
+DEFAULT_CONTEXT_CHARS = 120_000
+
+
+def pack_in_order(sizes: Sequence[int], budget: int) -> List[List[int]]:
+    """
+    Agrupa os índices de `sizes` em lotes consecutivos cuja soma não passa de
+    `budget`, preservando a ordem. Um item maior que o orçamento fica sozinho
+    em seu lote (não há como dividi-lo mais).
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for idx, size in enumerate(sizes):
+        if current and used + size > budget:
+            batches.append(current)
+            current, used = [], 0
+        if size > budget:
+            logger.warning("Item %d (%d caracteres) excede sozinho o orçamento de %d", idx, size, budget)
+        current.append(idx)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
@@ -1,11 +1,27 @@
 import logging
 import os
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from utils.file_utils import FileUtils
+from utils.c_functions import find_functions, function_source, source_skeleton
+from utils.cdfg import CDFG, parse_cdfg
+from utils.cdfg_paths import PathEnumerator, PathSet
+from utils.path_constraints import (
+    FEASIBLE, INFEASIBLE, PathPrefilter, PathVerdict, format_local_report, undecided_paths,
+)
+from utils.c_slicer import CodeSlicer
+from utils.file_utils import BackgroundWriter, FileUtils
 from ai.ia_client import IAClient
-from utils.models import FunctionResult
+from utils.models import FunctionMetrics, FunctionResult
+from core.batching import (
+    DEFAULT_BATCH_MAX_CCN, DEFAULT_BATCH_MAX_LINES, BatchItem, combined_code, function_sizes, plan_batches,
+)
+from core.checkpoint import RunManifest
+from core.metrics import MetricsRecorder
+from core.result_store import ResultStore
+from core.chunking import DEFAULT_CONTEXT_CHARS
 from core.prompt_builder import PromptBuilder
+from core.token_budget import PromptTooLargeError, TokenBudget, TokenReport
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +29,86 @@ logger = logging.getLogger(__name__)
 class CodeProcessor:
     """Processa um arquivo de código: leitura, geração de CDFGs e detecção de caminhos inviáveis."""
 
-    def __init__(self, ia_client: IAClient, output_base: str = "output"):
-        self.file_utils = FileUtils()
+    def __init__(
+        self,
+        ia_client: IAClient,
+        output_base: str = "output",
+        max_workers: int = 1,
+        resume: bool = False,
+        incremental: bool = False,
+        function_extractor: str = "local",
+        slice_prompts: bool = False,
+        context_chars: int = DEFAULT_CONTEXT_CHARS,
+        token_budget: Optional[TokenBudget] = None,
+        token_report: Optional[TokenReport] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        codes_dir: str = "codes",
+        path_enumerator: Optional[PathEnumerator] = None,
+        prefilter: bool = False,
+        store: Optional[ResultStore] = None,
+        write_files: bool = True,
+        file_writer: Optional[BackgroundWriter] = None,
+        dedup_prompts: bool = False,
+        batch_functions: int = 0,
+        batch_max_lines: int = DEFAULT_BATCH_MAX_LINES,
+        batch_max_ccn: int = DEFAULT_BATCH_MAX_CCN,
+        function_metrics: Optional[Dict[str, List[FunctionMetrics]]] = None,
+    ):
+        # Com `file_writer`, os artefatos são gravados numa thread à parte.
+        self.file_utils = FileUtils(file_writer)
+        self.codes_dir = codes_dir
         self.ia_client = ia_client
         self.output_base = output_base
+        # Número máximo de funções analisadas em paralelo (1 = modo serial).
+        self.max_workers = max(1, int(max_workers))
+        # Com resume=True, etapas registradas em output/<code>/manifest.json com as
+        # mesmas entradas são reaproveitadas em vez de refeitas.
+        # O modo incremental implica resume: só funções cujo código mudou são reanalisadas.
+        self.incremental = incremental
+        self.resume = resume or incremental
+        self.function_extractor = function_extractor
+        # Envia a cada prompt por função só o recorte de código de que ela depende.
+        self.slice_prompts = slice_prompts
+        # Orçamento de um prompt: arquivos maiores são recortados por função e
+        # a análise agregada passa a ser feita em lotes (map-reduce).
+        self.context_chars = context_chars
+        # Dimensionamento dos prompts em tokens; o relatório de tokens estimados x
+        # reais de cada arquivo é gravado em output/<code>/token_report.csv.
+        self.token_budget = token_budget or TokenBudget()
+        self.token_report = token_report if token_report is not None else TokenReport()
+        # Tempos por etapa, tokens e retries (ver core.metrics); compartilhado pela execução.
+        self.metrics = metrics or MetricsRecorder()
+        # Enumeração local de caminhos candidatos sobre o CDFG de cada função;
+        # None mantém a LLM enumerando os caminhos sozinha.
+        self.path_enumerator = path_enumerator
+        # Pré-filtro local (utils.path_constraints): caminhos candidatos provados
+        # inviáveis ou viáveis por propagação de intervalos não vão para a LLM.
+        self.prefilter = prefilter
+        # Armazenamento estruturado dos artefatos (core.result_store); com
+        # write_files=False a árvore de arquivos texto por função não é gravada.
+        self.store = store
+        self.write_files = write_files or store is None
+        # Prompts gravados como manifestos de blobs compartilhados (core.prompt_store).
+        self.dedup_prompts = dedup_prompts
+        # Agrupamento (core.batching): até `batch_functions` funções com no máximo
+        # `batch_max_lines` linhas e CCN `batch_max_ccn` dividem as chamadas de CDFG
+        # e de caminhos inviáveis (0 ou 1 = uma chamada por função). Linhas e CCN
+        # vêm do relatório do lizard (`function_metrics`, por arquivo) ou de uma
+        # estimativa local.
+        self.batch_functions = max(0, int(batch_functions))
+        self.batch_max_lines = batch_max_lines
+        self.batch_max_ccn = batch_max_ccn
+        self.function_metrics = function_metrics or {}
 
     def process_code(self, path: str) -> str:
         logger.info("Iniciando: process_code -> %s", path)
         try:
-            text = self.file_utils.safe_read_text(path)
+            # Sem truncamento: arquivos grandes são tratados por recorte e map-reduce.
+            text, encoding = self.file_utils.read_text(path, max_chars=None)
+            if encoding != "utf-8":
+                logger.info("Encoding detectado em %s: %s", path, encoding)
+            if len(text) > FileUtils.MAX_CHARS:
+                logger.warning("Arquivo grande (%d caracteres): %s", len(text), path)
             logger.info("Finalizado: process_code -> %s", path)
             return text
         except Exception as e:
@@ -32,44 +119,332 @@ class CodeProcessor:
     def process_code_file(self, code: str) -> None:
         logger.info("Iniciando: process_code_file -> %s", code)
 
-        path = os.path.join("codes", code)
+        path = os.path.join(self.codes_dir, code)
         code_name = os.path.splitext(os.path.basename(path))[0]
 
         output_dir = os.path.join(self.output_base, code_name)
-        prompt_builder = PromptBuilder(self.ia_client, output_dir, self.file_utils)
+        with self.metrics.timer("io_read", code_name, path):
+            code_text = self.process_code(path)
+
+        # sem arquivos texto, o checkpoint do resume vem do armazenamento de resultados
+        manifest = RunManifest(os.path.join(output_dir, "manifest.json")) if self.write_files else None
+        prompt_builder = PromptBuilder(
+            self.ia_client,
+            output_dir,
+            self.file_utils,
+            manifest=manifest,
+            resume=self.resume,
+            function_scopes=self._function_scopes(code_text) if self.incremental else None,
+            function_extractor=self.function_extractor,
+            context_chars=self.context_chars,
+            token_budget=self.token_budget,
+            token_report=self.token_report,
+            metrics=self.metrics,
+            store=self.store,
+            write_files=self.write_files,
+            dedup_prompts=self.dedup_prompts,
+        )
         prompt_builder._ensure_dirs()
 
-        code_text = self.process_code(path)
         try:
-            self.file_utils.write_text_file(os.path.join(output_dir, "original_code.txt"), code_text)
+            prompt_builder._write_artifact(os.path.join(output_dir, "original_code.txt"), code_text, "source", "source")
         except Exception as e:
             logger.exception("Failed to save original_code.txt: %s", e)
 
-        result_per_function: Dict[str, FunctionResult] = {}
-
         try:
             functions = prompt_builder.fetch_all_functions(code_text)
         except Exception as e:
-            logger.exception("Failed to fetch functions (serial): %s", e)
+            logger.exception("Failed to fetch functions: %s", e)
             functions = []
 
         if functions is None:
             functions = []
         logger.info("Functions found: %s", functions)
-        for func in functions:
-            logger.info("Processing function: %s", func)
-            try:
-                cdfg = prompt_builder.generate_cdfg(func, code_text)
-                infeasible_paths = prompt_builder.detecting_infeasible_paths_in_function(cdfg, func, code_text)
-                result_per_function[func] = FunctionResult(cdfg=cdfg, infeasible_paths=infeasible_paths)
-            except Exception as e:
-                logger.exception("CDFG generation failed for function %s (serial): %s", func, e)
-                result_per_function[func] = FunctionResult(cdfg=None, infeasible_paths=None)
+        slice_prompts = self.slice_prompts
+        if not slice_prompts and len(prompt_builder.build_cdfg_prompt("", code_text)) > self.context_chars:
+            logger.info("Arquivo %s excede o orçamento de contexto; recortando os prompts por função", code_name)
+            slice_prompts = True
+        function_contexts = self._slice_functions(code_text, functions) if slice_prompts else {}
+        result_per_function = self._process_functions(
+            prompt_builder, functions, code_text, function_contexts, self.function_metrics.get(code)
+        )
 
         logger.debug("Result per function: %s", result_per_function)
         try:
             _ = prompt_builder.detecting_all_infeasible_paths(result_per_function, code_text)
+        except PromptTooLargeError as e:
+            logger.warning("Análise agregada não realizada: %s", e)
         except Exception as e:
             logger.exception("Infeasible path detection failed: %s", e)
 
+        self._write_token_report(output_dir, code_name)
         logger.info("Finalizado: process_code_file -> %s", code_name)
+
+    def _write_token_report(self, output_dir: str, code_name: str) -> None:
+        try:
+            if self.store is not None:
+                self.store.add_token_rows(self.token_report.rows(code_name))
+            if self.write_files:
+                self.token_report.write_csv(os.path.join(output_dir, "token_report.csv"), file=code_name)
+        except Exception as e:
+            logger.exception("Failed to save token_report.csv: %s", e)
+            return
+        summary = self.token_report.summary(code_name)
+        logger.info(
+            "Tokens %s: %d etapas, ~%d tokens de prompt estimados; %d etapas medidas (%d estimados x %d reais)",
+            code_name, summary["stages"], summary["projected_prompt_tokens"],
+            summary["measured_stages"], summary["measured_projected_tokens"], summary["prompt_tokens"],
+        )
+
+    def _function_scopes(self, code_text: str) -> Optional[Dict[str, str]]:
+        """
+        Para cada função encontrada localmente, o trecho que determina sua análise:
+        o esqueleto do arquivo (globais, macros, tipos, protótipos) mais o corpo
+        da função. Uma edição em outra função não altera esse trecho.
+        """
+        try:
+            functions = find_functions(code_text)
+        except Exception as e:
+            logger.exception("Falha ao localizar funções para o modo incremental: %s", e)
+            return None
+        skeleton = source_skeleton(code_text, functions)
+        scopes = {fn.name: skeleton + "\n" + function_source(code_text, fn) for fn in functions}
+        logger.info("Modo incremental: %d funções localizadas", len(scopes))
+        return scopes
+
+    def _process_function(self, prompt_builder: PromptBuilder, func: str, code_text: str) -> FunctionResult:
+        """Executa a cadeia CDFG -> caminhos inviáveis de uma única função."""
+        logger.info("Processing function: %s", func)
+        try:
+            cdfg = prompt_builder.generate_cdfg(func, code_text)
+            graph = self._parse_graph(cdfg, func)
+            paths = self._enumerate_paths(graph, func)
+            verdicts, local_report = self._prefilter_paths(prompt_builder, graph, paths, cdfg, func, code_text)
+            llm_paths = paths if verdicts is None else undecided_paths(paths, verdicts)
+            infeasible_paths = prompt_builder.detecting_infeasible_paths_in_function(
+                cdfg, func, code_text, graph=graph, paths=llm_paths, local_report=local_report
+            )
+            return FunctionResult(
+                cdfg=cdfg, infeasible_paths=infeasible_paths, graph=graph, paths=paths, verdicts=verdicts
+            )
+        except PromptTooLargeError as e:
+            logger.warning("Função %s não analisada: %s", func, e)
+            return FunctionResult(cdfg=None, infeasible_paths=None)
+        except Exception as e:
+            logger.exception("CDFG generation failed for function %s: %s", func, e)
+            return FunctionResult(cdfg=None, infeasible_paths=None)
+
+    def _process_batch(
+        self,
+        prompt_builder: PromptBuilder,
+        functions: Sequence[str],
+        code_text: str,
+        function_contexts: Dict[str, str],
+    ) -> Dict[str, FunctionResult]:
+        """
+        Executa a cadeia de um lote de funções pequenas com uma chamada para os
+        CDFGs e outra para os caminhos inviáveis. Funções sem seção válida na
+        resposta (ou todas, se o lote falhar) voltam para `_process_function`.
+        """
+        logger.info("Processing batch: %s", ", ".join(functions))
+        results: Dict[str, FunctionResult] = {}
+        try:
+            cdfgs = prompt_builder.generate_cdfg_batch(functions, combined_code(functions, code_text, function_contexts))
+            pending: List[BatchItem] = []
+            for func in functions:
+                cdfg = cdfgs.get(func)
+                if cdfg is None:
+                    continue
+                func_code = function_contexts.get(func, code_text)
+                graph = self._parse_graph(cdfg, func)
+                paths = self._enumerate_paths(graph, func)
+                verdicts, local_report = self._prefilter_paths(prompt_builder, graph, paths, cdfg, func, func_code)
+                llm_paths = paths if verdicts is None else undecided_paths(paths, verdicts)
+                results[func] = FunctionResult(cdfg=cdfg, infeasible_paths=None, graph=graph, paths=paths, verdicts=verdicts)
+                if local_report is not None and llm_paths is not None and not llm_paths.paths and not llm_paths.truncated:
+                    # tudo decidido pelo pré-filtro: a LLM nem é consultada
+                    results[func].infeasible_paths = prompt_builder.detecting_infeasible_paths_in_function(
+                        cdfg, func, func_code, graph=graph, paths=llm_paths, local_report=local_report
+                    )
+                else:
+                    pending.append(BatchItem(func, cdfg, graph, llm_paths, local_report))
+
+            analyses: Dict[str, str] = {}
+            if len(pending) > 1:
+                pending_functions = [item.function for item in pending]
+                analyses = prompt_builder.detecting_infeasible_paths_batch(
+                    pending, combined_code(pending_functions, code_text, function_contexts)
+                )
+            for item in pending:
+                if item.function not in analyses:
+                    # fora da resposta do lote: análise individual com o CDFG já obtido
+                    analyses[item.function] = prompt_builder.detecting_infeasible_paths_in_function(
+                        item.cdfg, item.function, function_contexts.get(item.function, code_text),
+                        graph=item.graph, paths=item.paths, local_report=item.local_report,
+                    )
+                results[item.function].infeasible_paths = analyses[item.function]
+        except PromptTooLargeError as e:
+            logger.warning("Lote %s não analisado em conjunto: %s", ", ".join(functions), e)
+        except Exception as e:
+            logger.exception("Batch processing failed for %s: %s", ", ".join(functions), e)
+
+        for func in functions:
+            result = results.get(func)
+            if result is None or result.infeasible_paths is None:
+                results[func] = self._process_function(prompt_builder, func, function_contexts.get(func, code_text))
+        return {func: results[func] for func in functions}
+
+    def _process_unit(
+        self,
+        prompt_builder: PromptBuilder,
+        unit: List[str],
+        code_text: str,
+        function_contexts: Dict[str, str],
+    ) -> Dict[str, FunctionResult]:
+        if len(unit) == 1:
+            return {unit[0]: self._process_function(prompt_builder, unit[0], function_contexts.get(unit[0], code_text))}
+        return self._process_batch(prompt_builder, unit, code_text, function_contexts)
+
+    def _plan_units(
+        self, functions: List[str], code_text: str, metrics: Optional[List[FunctionMetrics]]
+    ) -> List[List[str]]:
+        """Unidades de trabalho: uma função por chamada ou, com o agrupamento ativo, lotes de funções pequenas."""
+        if self.batch_functions < 2 or len(functions) < 2:
+            return [[func] for func in functions]
+        try:
+            sizes = function_sizes(code_text, metrics)
+        except Exception as e:
+            logger.exception("Falha ao medir as funções para o agrupamento; sem lotes: %s", e)
+            return [[func] for func in functions]
+        units = plan_batches(functions, sizes, self.batch_functions, self.batch_max_lines, self.batch_max_ccn)
+        batches = [unit for unit in units if len(unit) > 1]
+        if batches:
+            logger.info(
+                "Agrupamento: %d funções em %d lotes, %d chamadas individuais",
+                sum(len(unit) for unit in batches), len(batches), len(units) - len(batches),
+            )
+        return units
+
+    @staticmethod
+    def _parse_graph(cdfg: Optional[str], func: str) -> Optional[CDFG]:
+        """Interpreta o DOT devolvido pela LLM; falhas só geram aviso (o texto segue para o prompt)."""
+        if not cdfg:
+            return None
+        try:
+            graph = parse_cdfg(cdfg, func)
+        except Exception as e:
+            logger.exception("Falha ao interpretar o CDFG de %s: %s", func, e)
+            return None
+        if graph is None:
+            logger.warning("Nenhum digraph válido no CDFG de %s", func)
+        else:
+            logger.debug("CDFG %s: %d nós, %d arestas", func, len(graph), graph.num_edges)
+        return graph
+
+    def _enumerate_paths(self, graph: Optional[CDFG], func: str) -> Optional[PathSet]:
+        if self.path_enumerator is None or graph is None:
+            return None
+        try:
+            paths = self.path_enumerator.enumerate(graph)
+        except Exception as e:
+            logger.exception("Falha ao enumerar os caminhos de %s: %s", func, e)
+            return None
+        logger.info(
+            "Caminhos candidatos %s: %d (modo %s%s)",
+            func, len(paths.paths), paths.mode, ", truncado" if paths.truncated else "",
+        )
+        return paths
+
+    def _prefilter_paths(
+        self,
+        prompt_builder: PromptBuilder,
+        graph: Optional[CDFG],
+        paths: Optional[PathSet],
+        cdfg: str,
+        func: str,
+        code_text: str,
+    ) -> Tuple[Optional[List[PathVerdict]], Optional[str]]:
+        """
+        (vereditos locais dos caminhos candidatos, relatório dos caminhos
+        decididos), ou (None, None) com o pré-filtro desligado ou sem caminhos.
+        """
+        if not self.prefilter or graph is None or paths is None or not paths.paths:
+            return None, None
+        try:
+            with self.metrics.timer("prefilter", prompt_builder.report_name, func):
+                checker = PathPrefilter(graph, cdfg, code_text, func)
+                verdicts = [checker.check(path) for path in paths.paths]
+                report = format_local_report(func, graph, paths, verdicts, checker.code_text)
+        except Exception as e:
+            logger.exception("Falha no pré-filtro de caminhos de %s: %s", func, e)
+            return None, None
+        infeasible = sum(1 for v in verdicts if v.status == INFEASIBLE)
+        feasible = sum(1 for v in verdicts if v.status == FEASIBLE)
+        logger.info(
+            "Pré-filtro %s: %d inviáveis, %d viáveis, %d indecisos",
+            func, infeasible, feasible, len(verdicts) - infeasible - feasible,
+        )
+        return verdicts, report
+
+    def _slice_functions(self, code_text: str, functions: List[str]) -> Dict[str, str]:
+        """Recorte de código por função; funções não localizadas usam o arquivo inteiro."""
+        try:
+            slicer = CodeSlicer(code_text)
+        except Exception as e:
+            logger.exception("Falha ao recortar o código; usando o arquivo inteiro: %s", e)
+            return {}
+
+        contexts: Dict[str, str] = {}
+        for func in functions:
+            context = slicer.slice(func)
+            if context is None:
+                logger.warning("Função %s não localizada para recorte; usando o arquivo inteiro", func)
+                continue
+            logger.debug("Recorte %s: %d -> %d caracteres", func, len(code_text), len(context))
+            contexts[func] = context
+
+        if contexts:
+            full = len(code_text) * len(contexts)
+            sliced = sum(len(c) for c in contexts.values())
+            logger.info(
+                "Recorte de prompts: %d -> %d caracteres de código em %d funções (%.1fx menor)",
+                full, sliced, len(contexts), full / max(sliced, 1),
+            )
+        return contexts
+
+    def _process_functions(
+        self,
+        prompt_builder: PromptBuilder,
+        functions: List[str],
+        code_text: str,
+        function_contexts: Optional[Dict[str, str]] = None,
+        function_metrics: Optional[List[FunctionMetrics]] = None,
+    ) -> Dict[str, FunctionResult]:
+        """Processa todas as funções, em paralelo quando `max_workers > 1`.
+
+        `function_contexts` substitui, por função, o código enviado nos prompts
+        (ver `slice_prompts`). Com o agrupamento ativo, funções pequenas segundo
+        `function_metrics` (ou a estimativa local) são processadas em lotes. O
+        dicionário retornado segue sempre a ordem de `functions`,
+        independentemente da ordem em que as chamadas terminam.
+        """
+        function_contexts = function_contexts or {}
+        functions = list(dict.fromkeys(functions))
+        units = self._plan_units(functions, code_text, function_metrics)
+        results: Dict[str, FunctionResult] = {}
+
+        workers = min(self.max_workers, len(units))
+        if workers <= 1:
+            for unit in units:
+                results.update(self._process_unit(prompt_builder, unit, code_text, function_contexts))
+            return {func: results[func] for func in functions}
+
+        logger.info("Processando %d funções com até %d em paralelo", len(functions), workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="func") as executor:
+            futures = [
+                executor.submit(self._process_unit, prompt_builder, unit, code_text, function_contexts)
+                for unit in units
+            ]
+            for future in futures:
+                results.update(future.result())
+        return {func: results[func] for func in functions}
@@ -0,0 +1,204 @@
+"""Métricas de execução do pipeline: tempo por etapa, tokens, motivos de parada e retries."""
+
+import contextlib
+import csv
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = (
+    "kind",
+    "file",
+    "name",
+    "started",
+    "seconds",
+    "status",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "finish_reason",
+    "retries",
+)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil `q` (0-100) com interpolação linear; 0.0 para uma lista vazia."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    low = math.floor(pos)
+    high = math.ceil(pos)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+@dataclass
+class Event:
+    """Uma medição: etapa do pipeline, chamada à LLM ou operação de arquivo."""
+
+    kind: str
+    file: str
+    name: str
+    started: float
+    seconds: float
+    status: str = "ok"
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
+    retries: int = 0
+
+
+@dataclass
+class _Span:
+    status: str = "ok"
+    extra: Dict[str, object] = field(default_factory=dict)
+
+
+class MetricsRecorder:
+    """
+    Coleta eventos de várias threads e gera o resumo da execução.
+
+    Tipos de evento usados pelo pipeline:
+    - "file": processamento completo de um arquivo de `codes/`;
+    - "fetch_all_functions", "generate_cdfg", "detecting_infeasible_paths_in_function",
+      "detecting_all_infeasible_paths": etapas do PromptBuilder (inclui checkpoints);
+    - "llm_call": cada chamada à LLM, com tokens de `usage`, motivo de parada e retries;
+    - "io_read" / "io_write": leitura do código e gravação dos artefatos.
+    """
+
+    def __init__(self):
+        self._events: List[Event] = []
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.finished: Optional[float] = None
+
+    def record(self, event: Event) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    @contextlib.contextmanager
+    def timer(self, kind: str, file: str = "", name: str = "") -> Iterator[_Span]:
+        """Mede o bloco; `span.status`/`span.extra` podem ser ajustados dentro dele."""
+        span = _Span()
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            self.record(Event(
+                kind=kind, file=file, name=name, started=started,
+                seconds=time.perf_counter() - t0, status=span.status, **span.extra,
+            ))
+
+    def events(self, kind: Optional[str] = None) -> List[Event]:
+        with self._lock:
+            return [e for e in self._events if kind is None or e.kind == kind]
+
+    def start(self) -> None:
+        self.started = time.time()
+        self.finished = None
+
+    def finish(self) -> None:
+        self.finished = time.time()
+
+    def summary(self) -> dict:
+        events = self.events()
+        wall = (self.finished or time.time()) - self.started
+
+        stages: Dict[str, dict] = {}
+        for kind in dict.fromkeys(e.kind for e in events):
+            secs = [e.seconds for e in events if e.kind == kind]
+            stages[kind] = {
+                "count": len(secs),
+                "total_seconds": round(sum(secs), 3),
+                "mean_seconds": round(sum(secs) / len(secs), 3),
+                "p50_seconds": round(percentile(secs, 50), 3),
+                "p95_seconds": round(percentile(secs, 95), 3),
+                "max_seconds": round(max(secs), 3),
+            }
+
+        calls = [e for e in events if e.kind == "llm_call"]
+        sent = [e for e in calls if e.status != "cached"]
+        prompt_tokens = sum(e.prompt_tokens or 0 for e in sent)
+        completion_tokens = sum(e.completion_tokens or 0 for e in sent)
+        call_seconds = sum(e.seconds for e in sent)
+        finish_reasons: Dict[str, int] = {}
+        for e in sent:
+            key = e.finish_reason or e.status
+            finish_reasons[key] = finish_reasons.get(key, 0) + 1
+
+        files: Dict[str, dict] = {}
+        for e in events:
+            if not e.file:
+                continue
+            entry = files.setdefault(e.file, {"seconds": 0.0, "llm_calls": 0, "total_tokens": 0})
+            if e.kind == "file":
+                entry["seconds"] = round(e.seconds, 3)
+            elif e.kind == "llm_call" and e.status != "cached":
+                entry["llm_calls"] += 1
+                entry["total_tokens"] += e.total_tokens or 0
+
+        return {
+            "run": {
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "wall_seconds": round(wall, 3),
+                "files": len(self.events("file")),
+                "llm_calls": len(sent),
+                "cached_calls": sum(1 for e in calls if e.status == "cached"),
+                "failed_calls": sum(1 for e in sent if e.status == "error"),
+                "retries": sum(e.retries for e in calls),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                # vazão de geração por chamada (tokens de saída / tempo em chamadas)
+                "completion_tokens_per_call_second": round(completion_tokens / call_seconds, 2) if call_seconds else 0.0,
+                # vazão da execução inteira (todos os tokens / tempo de parede)
+                "tokens_per_second": round((prompt_tokens + completion_tokens) / wall, 2) if wall > 0 else 0.0,
+                "requests_per_second": round(len(sent) / wall, 3) if wall > 0 else 0.0,
+            },
+            "stages": stages,
+            "finish_reasons": finish_reasons,
+            "files": files,
+        }
+
+    def write(self, output_dir: str) -> dict:
+        """Grava `metrics.json` (resumo) e `metrics.csv` (um evento por linha) em `output_dir`."""
+        os.makedirs(output_dir, exist_ok=True)
+        summary = self.summary()
+        with open(os.path.join(output_dir, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(output_dir, "metrics.csv"), "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=EVENT_FIELDS)
+            writer.writeheader()
+            for event in self.events():
+                row = asdict(event)
+                row["seconds"] = round(event.seconds, 4)
+                writer.writerow({k: ("" if v is None else v) for k, v in row.items()})
+        return summary
+
+    def log_summary(self, summary: Optional[dict] = None) -> None:
+        summary = summary or self.summary()
+        run = summary["run"]
+        logger.info(
+            "Execução: %.1fs, %d arquivos, %d chamadas (%d do cache, %d com erro, %d retries), "
+            "%d tokens de prompt, %d de saída, %.1f tokens/s",
+            run["wall_seconds"], run["files"], run["llm_calls"], run["cached_calls"], run["failed_calls"],
+            run["retries"], run["prompt_tokens"], run["completion_tokens"], run["tokens_per_second"],
+        )
+        for kind, stats in summary["stages"].items():
+            logger.info(
+                "  %-40s n=%-5d total=%.1fs p50=%.2fs p95=%.2fs max=%.2fs",
+                kind, stats["count"], stats["total_seconds"], stats["p50_seconds"],
+                stats["p95_seconds"], stats["max_seconds"],
+            )
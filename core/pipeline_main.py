@@ -2,23 +2,175 @@
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from ai.ia_client import IAClient
+from core.batching import DEFAULT_BATCH_MAX_CCN, DEFAULT_BATCH_MAX_LINES
+from core.chunking import DEFAULT_CONTEXT_CHARS
 from core.code_processor import CodeProcessor
+from core.metrics import MetricsRecorder
+from core.result_store import ResultStore
+from core.scheduler import FileScheduler
+from core.token_budget import TokenBudget, TokenReport
+from utils.file_utils import BackgroundWriter
+from utils.cdfg_paths import DEFAULT_LOOP_BOUND, DEFAULT_MAX_PATHS, PathEnumerator
 from ai.ia_prompt_integration import IAIntegration
+from ai.rate_limiter import RateLimiter
+from ai.retry import RetryPolicy
+from ai.response_cache import ResponseCache
+from ai.transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
 
 class Pipeline:
-    def __init__(self, codes_dir: str = "codes", output_base: str = "output"):
+    def __init__(
+        self,
+        codes_dir: str = "codes",
+        output_base: str = "output",
+        max_workers: int = 1,
+        max_files: int = 1,
+        max_concurrent_requests: Optional[int] = None,
+        metrics_path: Optional[str] = "annotations/metricas.txt",
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+        cache: Optional[ResponseCache] = None,
+        resume: bool = False,
+        incremental: bool = False,
+        function_extractor: str = "local",
+        slice_prompts: bool = False,
+        context_chars: int = DEFAULT_CONTEXT_CHARS,
+        token_budget: Optional[int] = None,
+        token_policy: str = "warn",
+        max_retries: int = RetryPolicy.max_retries,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        stream: bool = False,
+        max_reasoning_tokens: Optional[int] = None,
+        max_reasoning_seconds: Optional[float] = None,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        path_mode: Optional[str] = None,
+        loop_bound: int = DEFAULT_LOOP_BOUND,
+        max_paths: int = DEFAULT_MAX_PATHS,
+        prefilter: bool = False,
+        result_store: Optional[str] = None,
+        store_files: bool = False,
+        async_writes: bool = True,
+        compress_artifacts: Optional[str] = None,
+        dedup_prompts: bool = False,
+        batch_functions: int = 0,
+        batch_max_lines: int = DEFAULT_BATCH_MAX_LINES,
+        batch_max_ccn: int = DEFAULT_BATCH_MAX_CCN,
+    ):
+        if prefilter and not path_mode:
+            # o pré-filtro julga caminhos candidatos: precisa da enumeração local
+            logger.info("Pré-filtro ativo: enumerando caminhos no modo paths")
+            path_mode = "paths"
         self.codes_dir = codes_dir
         self.output_base = output_base
-        self.ia_client = IAClient(IAIntegration())
-        self.processor = CodeProcessor(self.ia_client, output_base=self.output_base)
+        # Arquivos processados simultaneamente; o limite global de requisições
+        # à LLM é compartilhado por todos os arquivos e funções via IAClient.
+        self.max_files = max(1, int(max_files))
+        # Sem limite explícito, vale a concorrência máxima possível de
+        # requisições (arquivos x funções); o pool de conexões a acompanha.
+        if not max_concurrent_requests or max_concurrent_requests < 1:
+            max_concurrent_requests = self.max_files * max(1, int(max_workers))
+        pool_size = max_concurrent_requests
+        # O limitador é adaptativo: mesmo sem limites configurados, passa a
+        # segurar as requisições ao primeiro 429 recebido.
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.ia = IAIntegration(
+            pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retry_policy=RetryPolicy(max_retries=max_retries),
+            rate_limiter=self.rate_limiter,
+            stream=stream,
+            max_reasoning_tokens=max_reasoning_tokens,
+            max_reasoning_seconds=max_reasoning_seconds,
+            api_url=api_url,
+            api_key=api_key,
+        )
+        self.ia_client = IAClient(self.ia, max_concurrent_requests=max_concurrent_requests, cache=cache)
+        self.token_report = TokenReport()
+        self.metrics = MetricsRecorder()
+        # Banco SQLite com os artefatos da execução; sem `store_files`, substitui
+        # os arquivos texto por função (regeneráveis com `python results.py export`).
+        self.store = ResultStore(result_store) if result_store else None
+        # Gravação dos artefatos em segundo plano (atômica, com fila limitada);
+        # a compressão vale para prompts e reasonings grandes.
+        self.file_writer = BackgroundWriter(compression=compress_artifacts) if async_writes else None
+        if compress_artifacts and not async_writes:
+            logger.warning("Compressão de artefatos requer a gravação em segundo plano; ignorando")
+        self._store_config = {
+            "codes_dir": codes_dir, "output_base": output_base, "resume": resume, "incremental": incremental,
+            "slice_prompts": slice_prompts, "stream": stream, "path_mode": path_mode, "prefilter": prefilter,
+            "batch_functions": batch_functions,
+        }
+        # as métricas do lizard ordenam os arquivos e selecionam as funções agrupáveis
+        self.scheduler = FileScheduler(self.codes_dir, metrics_path)
+        self.processor = CodeProcessor(
+            self.ia_client,
+            output_base=self.output_base,
+            max_workers=max_workers,
+            resume=resume,
+            incremental=incremental,
+            function_extractor=function_extractor,
+            slice_prompts=slice_prompts,
+            context_chars=context_chars,
+            token_budget=TokenBudget(token_budget, token_policy),
+            token_report=self.token_report,
+            metrics=self.metrics,
+            codes_dir=self.codes_dir,
+            path_enumerator=PathEnumerator(path_mode, loop_bound, max_paths) if path_mode else None,
+            prefilter=prefilter,
+            store=self.store,
+            write_files=store_files,
+            file_writer=self.file_writer,
+            dedup_prompts=dedup_prompts,
+            batch_functions=batch_functions,
+            batch_max_lines=batch_max_lines,
+            batch_max_ccn=batch_max_ccn,
+            function_metrics=self.scheduler.metrics,
+        )
+
+    def _process_file(self, fname: str) -> None:
+        logger.info("==== Iniciando processamento do arquivo: %s ====", fname)
+        with self.metrics.timer("file", os.path.splitext(fname)[0], fname) as span:
+            try:
+                self.processor.process_code_file(fname)
+            except Exception as e:
+                span.status = "error"
+                logger.exception("Erro ao processar %s: %s", fname, e)
+        logger.info("==== Finalizado processamento do arquivo: %s ====", fname)
 
     def run(self) -> None:
+        if self.store is not None:
+            self.store.begin_run(self._store_config)
+        try:
+            self._run()
+        finally:
+            if self.file_writer is not None:
+                # a execução só termina com todos os artefatos em disco
+                self.file_writer.flush()
+                logger.info("Gravação de artefatos: %s", self.file_writer.stats())
+                self.file_writer.close()
+            if self.store is not None:
+                try:
+                    self.store.add_events(self.metrics.events())
+                    self.store.finish_run()
+                except Exception as e:
+                    logger.exception("Falha ao gravar o armazenamento de resultados: %s", e)
+                finally:
+                    self.store.close()
+            # sessões HTTP (pool de keep-alive e, se usada, a do aiohttp)
+            self.ia.close()
+
+    def _run(self) -> None:
         logger.info("Iniciando: main - scanning 'codes' directory")
+        self.metrics.start()
         if not os.path.isdir(self.codes_dir):
             logger.error("Diretório não encontrado: %s", self.codes_dir)
             return
@@ -30,12 +182,28 @@ class Pipeline:
             logger.warning("Nenhum arquivo encontrado em 'codes/'.")
             return
 
-        for fname in files:
-            logger.info("==== Iniciando processamento do arquivo: %s ====", fname)
-            try:
-                self.processor.process_code_file(fname)
-            except Exception as e:
-                logger.exception("Erro ao processar %s: %s", fname, e)
-            logger.info("==== Finalizado processamento do arquivo: %s ====", fname)
+        if self.max_files <= 1:
+            for fname in files:
+                self._process_file(fname)
+        else:
+            # Os mais pesados são despachados primeiro para não virarem a cauda da execução.
+            ordered = self.scheduler.order(files)
+            logger.info("Processando %d arquivos, até %d em paralelo (mais pesados primeiro)", len(ordered), self.max_files)
+            with ThreadPoolExecutor(max_workers=self.max_files, thread_name_prefix="file") as executor:
+                for future in [executor.submit(self._process_file, fname) for fname in ordered]:
+                    future.result()
 
+        if self.ia_client.cache is not None:
+            logger.info("Cache de respostas da LLM: %s", self.ia_client.cache.stats())
+        logger.info("Limitador de requisições: %s", self.rate_limiter.stats())
+        self.metrics.finish()
+        try:
+            self.metrics.log_summary(self.metrics.write(self.output_base))
+        except Exception as e:
+            logger.exception("Falha ao gravar as métricas da execução: %s", e)
+        try:
+            self.token_report.write_csv(os.path.join(self.output_base, "token_report.csv"))
+            logger.info("Tokens da execução: %s", self.token_report.summary())
+        except Exception as e:
+            logger.exception("Falha ao gravar o relatório de tokens: %s", e)
         logger.info("Finalizado: main - todos os códigos processados")
@@ -1,120 +1,742 @@
+import functools
 import logging
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
-from utils.file_utils import FileUtils
-from ai.ia_client import IAClient
+from utils.file_utils import FileUtils, ProgressiveWriter
+from ai.ia_client import IAClient, is_error_response
+from ai.streaming import CONTENT, REASONING, RESET
+from core.batching import BatchItem, batch_label, format_function_list, split_sections
+from core.checkpoint import RunManifest, hash_input
+from core.chunking import DEFAULT_CONTEXT_CHARS, pack_in_order
+from core.metrics import MetricsRecorder
+from core.prompt_store import BLOBS_DIR, PromptStore
+from core.prompt_templates import Template, load_template
+from core.result_store import ResultStore
+from core.token_budget import PromptTooLargeError, TokenBudget, TokenReport
+from utils.c_functions import find_functions
+from utils.c_slicer import CodeSlicer
+from utils.cdfg import CDFG, parse_cdfg
+from utils.cdfg_paths import PathSet, describe_paths, format_paths
 from utils.models import FunctionResult
 
 logger = logging.getLogger(__name__)
 
 
+def _timed(kind: str):
+    """Registra a duração do método como um evento `kind` em `self.metrics`."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(kind, self.report_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
 class PromptBuilder:
-    """Constrói prompts e orquestra chamadas à IA, gravando arquivos de saída."""
+    """Constrói prompts e orquestra chamadas à IA, gravando arquivos de saída.
+
+    Com um `manifest`, cada etapa concluída é registrada com o hash do seu
+    prompt; com `resume=True`, etapas já concluídas com o mesmo prompt são
+    lidas do disco em vez de chamar a IA novamente.
+
+    No modo incremental, `function_scopes` mapeia cada função para o trecho de
+    código que a determina (seu corpo + globais/macros/tipos do arquivo). As
+    etapas por função passam a ser identificadas pelo hash desse trecho, e não
+    do arquivo inteiro: editar uma função só invalida as etapas dela.
+
+    Quando o prompt agregado passa de `context_chars`, as funções são
+    analisadas em lotes (map) e os relatórios parciais são consolidados em
+    níveis (reduce), em vez de enviar um prompt maior que o contexto do modelo.
+
+    Todo prompt é dimensionado em tokens antes do envio (`token_budget`); os
+    valores estimados e os informados pelo endpoint vão para `token_report`.
+    Com um limite de tokens, o map-reduce passa a ser medido em tokens e os
+    prompts que ainda o excedem seguem a política do orçamento (avisar,
+    recusar ou recortar o código da função).
+
+    Com um CDFG interpretado e os caminhos enumerados localmente
+    (`utils.cdfg_paths`), a análise por função recebe a lista de caminhos
+    candidatos e a LLM só julga a viabilidade de cada um.
+
+    Com um `store` (`core.result_store`), prompts, reasonings, respostas e os
+    caminhos inviáveis extraídos delas vão para o banco, e o checkpoint do
+    resume é lido dele; `write_files=False` deixa de gravar os arquivos
+    texto (a árvore pode ser regenerada com `python results.py export`).
+
+    Com `dedup_prompts=True`, os prompts são gravados como manifestos de
+    referências a blobs (`core.prompt_store`): código, templates e CDFGs
+    repetidos em vários prompts vão para o disco uma vez só.
+
+    As etapas em lote (`generate_cdfg_batch`, `detecting_infeasible_paths_batch`)
+    levam várias funções pequenas num único prompt (`core.batching`) e gravam
+    cada seção da resposta nos mesmos arquivos da etapa por função.
+    """
 
-    def __init__(self, ia_client: IAClient, output_dir: str, file_utils: FileUtils):
+    def __init__(
+        self,
+        ia_client: IAClient,
+        output_dir: str,
+        file_utils: FileUtils,
+        manifest: Optional[RunManifest] = None,
+        resume: bool = False,
+        function_scopes: Optional[Dict[str, str]] = None,
+        function_extractor: str = "local",
+        context_chars: int = DEFAULT_CONTEXT_CHARS,
+        token_budget: Optional[TokenBudget] = None,
+        token_report: Optional[TokenReport] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        store: Optional[ResultStore] = None,
+        write_files: bool = True,
+        dedup_prompts: bool = False,
+    ):
         self.ia = ia_client
         self.output_dir = output_dir
         self.file_utils = file_utils
+        self.manifest = manifest
+        self.resume = resume
+        self.function_scopes = function_scopes
+        # "local": extrator C sem LLM, com a LLM como fallback; "llm": sempre pergunta à LLM.
+        self.function_extractor = function_extractor
+        # Tamanho máximo de um prompt; acima disso a análise agregada é feita em map-reduce.
+        self.context_chars = context_chars
+        self.token_budget = token_budget or TokenBudget()
+        self.token_report = token_report
+        self.report_name = os.path.basename(os.path.normpath(output_dir))
+        self.metrics = metrics or MetricsRecorder()
+        self.store = store
+        self.write_files = write_files or store is None
+        self.prompt_store = (
+            PromptStore(os.path.join(os.path.dirname(os.path.normpath(output_dir)), BLOBS_DIR), file_utils)
+            if dedup_prompts else None
+        )
+        self._slicers: Dict[str, CodeSlicer] = {}
+        self._slicers_lock = threading.Lock()
 
     def _ensure_dirs(self) -> None:
+        if not self.write_files:
+            return
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(os.path.join(self.output_dir, "prompts"), exist_ok=True)
         os.makedirs(os.path.join(self.output_dir, "reasonings"), exist_ok=True)
         os.makedirs(os.path.join(self.output_dir, "cdfgs"), exist_ok=True)
         os.makedirs(os.path.join(self.output_dir, "output_llm"), exist_ok=True)
 
+    def _load_checkpoint(self, stage: str, input_hash: str) -> Optional[str]:
+        """Conteúdo salvo da etapa, se ela já foi concluída com as mesmas entradas."""
+        if not self.resume:
+            return None
+        if self.store is not None:
+            saved = self.store.checkpoint(self.report_name, stage, input_hash)
+            if saved is not None:
+                logger.info("Retomando: etapa %s já concluída, lendo do armazenamento de resultados", stage)
+                return saved
+        if self.manifest is None:
+            return None
+        output = self.manifest.completed_output(stage, input_hash)
+        if output is None:
+            return None
+        logger.info("Retomando: etapa %s já concluída, lendo %s", stage, output)
+        with open(output, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _mark_done(self, stage: str, input_hash: str, output: str, response: Optional[str]) -> None:
+        # Respostas de erro não são checkpoints válidos: a etapa será refeita.
+        if self.manifest is None or is_error_response(response):
+            return
+        # só depois que a saída estiver em disco (a gravação pode estar na fila)
+        manifest = self.manifest
+        self.file_utils.when_written(output, lambda: manifest.mark_done(stage, input_hash, output))
+
+    def _write_artifact(
+        self,
+        path: str,
+        text: str,
+        stage: str,
+        kind: str,
+        input_hash: Optional[str] = None,
+        ok: bool = True,
+    ) -> None:
+        """Grava um artefato no armazenamento de resultados e/ou em `path`."""
+        if self.store is not None:
+            relative = os.path.join(self.report_name, os.path.relpath(path, self.output_dir)).replace(os.sep, "/")
+            function = stage.split(":", 1)[1] if ":" in stage and not stage.startswith("infeasible_paths_all") else ""
+            self.store.add_artifact(self.report_name, function, stage, kind, relative, text, input_hash, ok)
+        if not self.write_files:
+            return
+        if kind == "prompt" and self.prompt_store is not None:
+            self.prompt_store.save(path, text)
+        else:
+            self.file_utils.write_text_file(path, text)
+
+    def _segment(self, text: Optional[str]) -> str:
+        """Marca `text` como segmento compartilhado dos prompts (ver `dedup_prompts`)."""
+        if self.prompt_store is None:
+            return text or ""
+        return self.prompt_store.segment(text)
+
+    def _join(self, parts: List[str]) -> str:
+        """Junta as partes do prompt; com dedup, associa a ele os segmentos marcados na montagem."""
+        if self.prompt_store is None:
+            return "".join(parts)
+        return self.prompt_store.join(parts)
+
+    def _load_template(self, path: str) -> Template:
+        template = load_template(path)
+        if self.prompt_store is not None:
+            self.prompt_store.template(template)
+        return template
+
+    def _function_scope(self, function: str) -> Optional[str]:
+        if self.function_scopes is None:
+            return None
+        return self.function_scopes.get(function)
+
+    def _sliced_code(self, function: str, code: str) -> Optional[str]:
+        """Recorte de `code` para `function` (o CodeSlicer de cada código é reaproveitado)."""
+        with self._slicers_lock:
+            slicer = self._slicers.get(code)
+            if slicer is None:
+                slicer = self._slicers[code] = CodeSlicer(code)
+        return slicer.slice(function)
+
+    def _prompt_size(self, text: str) -> int:
+        """Tamanho usado no orçamento: tokens estimados com limite de tokens, senão caracteres."""
+        if self.token_budget.max_tokens is not None:
+            return self.token_budget.estimate(text)
+        return len(text)
+
+    def _prompt_limit(self) -> int:
+        if self.token_budget.max_tokens is not None:
+            return self.token_budget.max_tokens
+        return self.context_chars
+
+    def _preflight(self, stage: str, prompt: str, rebuild: Optional[Callable[[], Optional[str]]]) -> Tuple[str, int]:
+        """
+        Aplica o orçamento de tokens a um prompt ainda não enviado e retorna o
+        prompt a enviar com seus tokens estimados. Com a política "slice",
+        `rebuild` monta o prompt com o código recortado.
+        """
+        tokens = self.token_budget.estimate(prompt)
+        if not self.token_budget.exceeds(tokens):
+            return prompt, tokens
+        budget = self.token_budget.max_tokens
+        if self.token_budget.policy == "refuse":
+            self._record(stage, "refused", tokens)
+            raise PromptTooLargeError(stage, tokens, budget)
+        if self.token_budget.policy == "slice" and rebuild is not None:
+            sliced = rebuild()
+            if sliced is not None:
+                sliced_tokens = self.token_budget.estimate(sliced)
+                logger.info("Etapa %s: prompt recortado de ~%d para ~%d tokens", stage, tokens, sliced_tokens)
+                prompt, tokens = sliced, sliced_tokens
+                if not self.token_budget.exceeds(tokens):
+                    return prompt, tokens
+        logger.warning("Etapa %s: prompt com ~%d tokens excede o orçamento de %d", stage, tokens, budget)
+        return prompt, tokens
+
+    def _record(self, stage: str, status: str, projected: int, usage: Optional[dict] = None) -> None:
+        if self.token_report is not None:
+            self.token_report.record(self.report_name, stage, status, projected, usage)
+
+    def build_fetch_all_functions_prompt(self, code: str) -> str:
+        template = self._load_template("prompts/fetch_all_functions.md")
+        return self._join(["[code]\n", self._segment(code), "\n---\n", *template.parts()])
+
+    def build_cdfg_prompt(self, function: str, code: str) -> str:
+        template = self._load_template("prompts/generate_cdfg.md")
+        return self._join(["[code]\n", self._segment(code), "\n---\n", *template.parts({"function_name": function})])
+
+    def build_infeasible_paths_prompt(
+        self,
+        cdfg: Optional[str],
+        function: str,
+        code_cleaned: str,
+        candidates: Optional[Tuple[str, str]] = None,
+    ) -> str:
+        """Prompt da análise por função; com `candidates` (critério, lista), a LLM só julga os caminhos dados."""
+        values = {"function": function, "cdfg": self._segment(cdfg)}
+        if candidates is None:
+            template = self._load_template("prompts/detecting_all_infeasible_paths_in_function.md")
+        else:
+            template = self._load_template("prompts/detecting_infeasible_paths_from_candidates.md")
+            values["path_criterion"], values["paths"] = candidates
+        return self._join(["[code]\n", self._segment(code_cleaned), "\n---\n", *template.parts(values)])
+
+    def build_cdfg_batch_prompt(self, functions: Sequence[str], code: str) -> str:
+        template = self._load_template("prompts/generate_cdfg_batch.md")
+        values = {"functions": format_function_list(functions)}
+        return self._join(["[code]\n", self._segment(code), "\n---\n", *template.parts(values)])
+
+    def build_infeasible_paths_batch_prompt(
+        self,
+        items: Sequence[BatchItem],
+        code_cleaned: str,
+        candidates: Dict[str, Optional[Tuple[str, str]]],
+    ) -> str:
+        """Prompt da análise em lote: CDFG e, quando houver, caminhos candidatos de cada função."""
+        template = self._load_template("prompts/detecting_infeasible_paths_batch.md")
+        blocks: List[str] = []
+        for item in items:
+            blocks += ["\n---\n[function ", item.function, "]\n[cdfg ", item.function, "]\n", self._segment(item.cdfg), "\n"]
+            if candidates.get(item.function) is not None:
+                criterion, listing = candidates[item.function]
+                blocks += ["[candidate paths ", item.function, "] (", criterion, ")\n", listing, "\n"]
+        blocks.append("---\n")
+        values = {"functions": "".join(blocks)}
+        return self._join(["[code]\n", self._segment(code_cleaned), "\n---\n", *template.parts(values)])
+
+    def build_all_infeasible_paths_prompt(self, result_per_function: Dict[str, FunctionResult], code_cleaned: str) -> str:
+        template = self._load_template("prompts/detecting_all_infeasible_paths.md")
+
+        parts = ["[code]\n", self._segment(code_cleaned), "\n---\n"]
+        for func, entry in result_per_function.items():
+            parts += ["\n---\n[cdfg ", func, "]\n", self._segment(entry.cdfg), "\n---\n"]
+            parts += ["\n---\n[analise infeasible_paths ", func, "]\n", self._segment(entry.infeasible_paths), "\n---\n"]
+        parts += ["\n---\n", *template.parts(), "\n---\n"]
+        return self._join(parts)
+
+    def build_merge_reports_prompt(self, reports: List[str]) -> str:
+        template = self._load_template("prompts/merge_infeasible_paths_reports.md")
+        parts: List[str] = []
+        for number, report in enumerate(reports, start=1):
+            parts += ["\n---\n[relatorio parcial ", str(number), "]\n", self._segment(report), "\n---\n"]
+        parts += ["\n---\n", *template.parts(), "\n---\n"]
+        return self._join(parts)
+
+    @_timed("fetch_all_functions")
     def fetch_all_functions(self, code: str) -> List[str]:
-        caminho_prompt = "prompts/fetch_all_functions.md"
+        if self.function_extractor == "local":
+            functions = self.extract_functions_locally(code)
+            if functions:
+                return functions
+            logger.warning("Extrator local não encontrou funções; usando a LLM como fallback")
+        return self.fetch_all_functions_llm(code)
+
+    def extract_functions_locally(self, code: str) -> List[str]:
+        logger.info("Iniciando: extract_functions_locally")
+        try:
+            found = find_functions(code)
+        except Exception as e:
+            logger.exception("Erro no extrator local de funções: %s", e)
+            logger.info("Finalizado (com erro): extract_functions_locally")
+            return []
+
+        for fn in found:
+            logger.debug("Função %s: linhas %d-%d", fn.name, fn.start_line, fn.end_line)
+        functions = list(dict.fromkeys(fn.name for fn in found))
+
+        path_save = os.path.join(self.output_dir, "output_llm", "functions_list.txt")
+        self._write_artifact(path_save, "\n".join(functions) + ("\n" if functions else ""), "fetch_all_functions", "output")
+
+        logger.info("Finalizado: extract_functions_locally -> %d funções encontradas", len(functions))
+        return functions
+
+    def fetch_all_functions_llm(self, code: str) -> List[str]:
         logger.info("Iniciando: prompt_fetch_all_functions")
-        template = self.file_utils.load_markdown_file(caminho_prompt)
 
-        prompt = "[code]\n" + code + "\n---\n" + template
+        prompt = self.build_fetch_all_functions_prompt(code)
 
         path_save = os.path.join(self.output_dir, "output_llm", "functions_list.txt")
         path_reasoning = os.path.join(self.output_dir, "reasonings", "reasoning_fetch_all_functions.txt")
         path_prompt = os.path.join(self.output_dir, "prompts", "prompt_fetch_all_functions.txt")
 
-        reasoning, response = self.ia.call(prompt)
-        response = response or ""
-
-        try:
-            functions = [func.strip() for func in response.split("\n") if func.strip()]
-        except Exception as e:
-            logger.exception("Erro ao parsear lista de funções: %s", e)
-            logger.info("Finalizado (com erro): prompt_fetch_all_functions")
-            raise
+        def parse(response: Optional[str]) -> List[str]:
+            return [func.strip() for func in (response or "").split("\n") if func.strip()]
 
-        self.file_utils.write_text_file(path_prompt, prompt)
-        self.file_utils.write_text_file(path_save, "\n".join(functions) + ("\n" if functions else ""))
-        self.file_utils.write_text_file(path_reasoning, reasoning if reasoning else "No reasoning provided")
+        # No modo incremental, a lista só é refeita se o conjunto de funções mudar.
+        basis = None if self.function_scopes is None else self.build_fetch_all_functions_prompt("\n".join(self.function_scopes))
+        output = self._run_stage(
+            "fetch_all_functions", prompt, path_save, path_reasoning, path_prompt,
+            hash_basis=basis,
+            postprocess=lambda response: "\n".join(parse(response)) + ("\n" if parse(response) else ""),
+        )
+        functions = parse(output)
 
         logger.info("Finalizado: prompt_fetch_all_functions -> %d funções encontradas", len(functions))
         return functions
 
+    @_timed("generate_cdfg")
     def generate_cdfg(self, function: str, code: str) -> Optional[str]:
-        caminho_prompt = "prompts/generate_cdfg.md"
         logger.info("Iniciando: prompt_generate_cdfg -> %s", function)
-        template = self.file_utils.load_markdown_file(caminho_prompt)
 
-        prompt = "[code]\n" + code + "\n---\n" + template.replace("{replace with function name here}", function)
+        prompt = self.build_cdfg_prompt(function, code)
 
         path_save = os.path.join(self.output_dir, "cdfgs", f"cdfg_{function}.txt")
         path_reasoning = os.path.join(self.output_dir, "reasonings", f"reasoning_cdfg_{function}.txt")
         path_prompt = os.path.join(self.output_dir, "prompts", f"prompt_cdfg_{function}.txt")
 
-        reasoning, response = self.ia.call(prompt)
-        self.file_utils.write_text_file(path_save, response or "")
-        self.file_utils.write_text_file(path_prompt, prompt)
-        self.file_utils.write_text_file(path_reasoning, reasoning if reasoning else "No reasoning provided")
+        scope = self._function_scope(function)
+        response = self._run_stage(
+            f"generate_cdfg:{function}", prompt, path_save, path_reasoning, path_prompt,
+            hash_basis=None if scope is None else self.build_cdfg_prompt(function, scope),
+            rebuild=lambda: self._rebuild_with_slice(function, code, lambda sliced: self.build_cdfg_prompt(function, sliced)),
+        )
 
         logger.info("Finalizado: prompt_generate_cdfg -> %s", function)
         return response
 
-    def detecting_infeasible_paths_in_function(self, cdfg: Optional[str], function: str, code_cleaned: str) -> str:
-        caminho_prompt = "prompts/detecting_all_infeasible_paths_in_function.md"
+    @_timed("generate_cdfg_batch")
+    def generate_cdfg_batch(self, functions: Sequence[str], code: str) -> Dict[str, str]:
+        """
+        CDFGs de várias funções numa única chamada. Retorna só as seções da
+        resposta com um digraph válido, já gravadas em cdfgs/cdfg_<função>.txt;
+        as funções que ficarem de fora devem seguir pela chamada individual.
+        """
+        label = batch_label(functions)
+        logger.info("Iniciando: prompt_generate_cdfg_batch -> %s", ", ".join(functions))
+
+        prompt = self.build_cdfg_batch_prompt(functions, code)
+
+        path_save = os.path.join(self.output_dir, "output_llm", f"cdfg_batch_{label}.txt")
+        path_reasoning = os.path.join(self.output_dir, "reasonings", f"reasoning_cdfg_batch_{label}.txt")
+        path_prompt = os.path.join(self.output_dir, "prompts", f"prompt_cdfg_batch_{label}.txt")
+
+        scope = self._batch_scope(functions)
+        response = self._run_stage(
+            f"generate_cdfg_batch:{label}", prompt, path_save, path_reasoning, path_prompt,
+            hash_basis=None if scope is None else self.build_cdfg_batch_prompt(functions, scope),
+            rebuild=lambda: self._rebuild_batch_with_slice(
+                functions, code, lambda sliced: self.build_cdfg_batch_prompt(functions, sliced)
+            ),
+        )
+
+        cdfgs: Dict[str, str] = {}
+        for function, section in split_sections(response, functions).items():
+            if parse_cdfg(section, function) is None:
+                logger.warning("Seção do lote %s sem digraph válido para %s", label, function)
+                continue
+            path_cdfg = os.path.join(self.output_dir, "cdfgs", f"cdfg_{function}.txt")
+            self._write_artifact(path_cdfg, section, f"generate_cdfg:{function}", "output")
+            cdfgs[function] = section
+
+        logger.info("Finalizado: prompt_generate_cdfg_batch -> %d de %d funções", len(cdfgs), len(functions))
+        return cdfgs
+
+    @staticmethod
+    def _candidates(function: str, graph: Optional[CDFG], paths: Optional[PathSet]) -> Optional[Tuple[str, str]]:
+        """(critério, lista) dos caminhos enumerados localmente, ou None para a LLM enumerar sozinha."""
+        if graph is None or paths is None:
+            return None
+        if not paths.paths:
+            if paths.truncated:
+                logger.warning(
+                    "Caminhos listados de %s decididos localmente, mas a lista foi truncada em %d; "
+                    "a LLM vai enumerar os caminhos", function, paths.total,
+                )
+            else:
+                logger.warning("Nenhum caminho candidato para %s; a LLM vai enumerar os caminhos", function)
+            return None
+        if paths.truncated:
+            logger.warning("Lista de caminhos de %s truncada em %d (modo %s)", function, paths.total, paths.mode)
+        return describe_paths(paths), format_paths(graph, paths)
+
+    @_timed("detecting_infeasible_paths_in_function")
+    def detecting_infeasible_paths_in_function(
+        self,
+        cdfg: Optional[str],
+        function: str,
+        code_cleaned: str,
+        graph: Optional[CDFG] = None,
+        paths: Optional[PathSet] = None,
+        local_report: Optional[str] = None,
+    ) -> str:
+        """
+        Caminhos inviáveis da função segundo a LLM. Com `local_report` (saída do
+        pré-filtro local), `paths` traz só os caminhos que ele não decidiu: o
+        relatório é gravado em output_llm/local_infeasible_paths_<função>.txt e
+        precede a resposta da LLM, que nem é consultada se nada ficou indeciso.
+        """
         logger.info("Iniciando: prompt_detecting_infeasible_paths_in_function -> %s", function)
-        template = self.file_utils.load_markdown_file(caminho_prompt)
-        cdfg_text = cdfg or ""
 
-        prompt = "[code]\n" + code_cleaned + "\n---\n" + template.replace("<INSERT FUNCTION HERE>", function).replace("<INSERT CDFG HERE>", cdfg_text)
+        if local_report is not None:
+            self._write_local_report(function, local_report)
+            # com a lista truncada, os caminhos além do limite ainda precisam da LLM
+            if paths is not None and not paths.paths and not paths.truncated:
+                logger.info("Todos os caminhos de %s decididos pelo pré-filtro; LLM não consultada", function)
+                logger.info("Finalizado: prompt_detecting_infeasible_paths_in_function -> %s", function)
+                return local_report
 
-        reasoning, out = self.ia.call(prompt)
+        candidates = self._candidates(function, graph, paths)
+        prompt = self.build_infeasible_paths_prompt(cdfg, function, code_cleaned, candidates)
 
         path_save = os.path.join(self.output_dir, "output_llm", f"infeasible_paths_{function}.txt")
         path_reasoning = os.path.join(self.output_dir, "reasonings", f"reasoning_infeasible_paths_{function}.txt")
         path_prompt = os.path.join(self.output_dir, "prompts", f"prompt_infeasible_paths_{function}.txt")
 
-        self.file_utils.write_text_file(path_prompt, prompt)
-        self.file_utils.write_text_file(path_save, out or "")
-        self.file_utils.write_text_file(path_reasoning, reasoning if reasoning else "No reasoning provided")
+        scope = self._function_scope(function)
+        out = self._run_stage(
+            f"infeasible_paths:{function}", prompt, path_save, path_reasoning, path_prompt,
+            hash_basis=None if scope is None else self.build_infeasible_paths_prompt(cdfg, function, scope, candidates),
+            rebuild=lambda: self._rebuild_with_slice(
+                function, code_cleaned, lambda sliced: self.build_infeasible_paths_prompt(cdfg, function, sliced, candidates)
+            ),
+        )
 
         logger.info("Finalizado: prompt_detecting_infeasible_paths_in_function -> %s", function)
-        return out if out else "No infeasible paths detected"
+        out = out if out else "No infeasible paths detected"
+        return out if local_report is None else f"{local_report}\n{out}"
 
-    def detecting_all_infeasible_paths(self, result_per_function: Dict[str, FunctionResult], code_cleaned: str) -> str:
-        caminho_prompt = "prompts/detecting_all_infeasible_paths.md"
-        logger.info("Iniciando: prompt_detecting_all_infeasible_paths")
-        template = self.file_utils.load_markdown_file(caminho_prompt)
+    def _write_local_report(self, function: str, local_report: str) -> None:
+        """Grava o relatório do pré-filtro local em output_llm/local_infeasible_paths_<função>.txt."""
+        path_local = os.path.join(self.output_dir, "output_llm", f"local_infeasible_paths_{function}.txt")
+        with self.metrics.timer("io_write", self.report_name, f"prefilter:{function}"):
+            self._write_artifact(path_local, local_report, f"prefilter:{function}", "output")
+        if self.store is not None:
+            self.store.add_infeasible_paths(self.report_name, function, f"prefilter:{function}", "local", local_report)
 
-        prompt = "[code]\n" + code_cleaned + "\n---\n"
-        for func, entry in result_per_function.items():
-            cdfg_content = entry.cdfg or ""
-            infeasible_content = entry.infeasible_paths or ""
-            prompt += f"\n---\n[cdfg {func}]\n{cdfg_content}\n---\n"
-            prompt += f"\n---\n[analise infeasible_paths {func}]\n{infeasible_content}\n---\n"
+    @_timed("detecting_infeasible_paths_batch")
+    def detecting_infeasible_paths_batch(self, items: Sequence[BatchItem], code_cleaned: str) -> Dict[str, str]:
+        """
+        Caminhos inviáveis de várias funções numa única chamada. Cada seção da
+        resposta vai para output_llm/infeasible_paths_<função>.txt (precedida do
+        relatório local, se houver); funções sem seção ficam de fora do retorno.
+        """
+        functions = [item.function for item in items]
+        label = batch_label(functions)
+        logger.info("Iniciando: prompt_detecting_infeasible_paths_batch -> %s", ", ".join(functions))
 
-        prompt += "\n---\n" + template + "\n---\n"
+        candidates = {item.function: self._candidates(item.function, item.graph, item.paths) for item in items}
+        prompt = self.build_infeasible_paths_batch_prompt(items, code_cleaned, candidates)
 
-        reasoning, resposta = self.ia.call(prompt)
+        path_save = os.path.join(self.output_dir, "output_llm", f"infeasible_paths_batch_{label}.txt")
+        path_reasoning = os.path.join(self.output_dir, "reasonings", f"reasoning_infeasible_paths_batch_{label}.txt")
+        path_prompt = os.path.join(self.output_dir, "prompts", f"prompt_infeasible_paths_batch_{label}.txt")
+
+        scope = self._batch_scope(functions)
+        # o prefixo não é "infeasible_paths": os caminhos vão para o store por função, abaixo
+        response = self._run_stage(
+            f"batch_infeasible_paths:{label}", prompt, path_save, path_reasoning, path_prompt,
+            hash_basis=None if scope is None else self.build_infeasible_paths_batch_prompt(items, scope, candidates),
+            rebuild=lambda: self._rebuild_batch_with_slice(
+                functions, code_cleaned,
+                lambda sliced: self.build_infeasible_paths_batch_prompt(items, sliced, candidates),
+            ),
+        )
+
+        sections = split_sections(response, functions)
+        analyses: Dict[str, str] = {}
+        for item in items:
+            section = sections.get(item.function)
+            if section is None:
+                continue
+            stage = f"infeasible_paths:{item.function}"
+            path_function = os.path.join(self.output_dir, "output_llm", f"infeasible_paths_{item.function}.txt")
+            self._write_artifact(path_function, section, stage, "output")
+            if self.store is not None:
+                self.store.add_infeasible_paths(self.report_name, item.function, stage, "llm", section)
+            if item.local_report is None:
+                analyses[item.function] = section
+            else:
+                self._write_local_report(item.function, item.local_report)
+                analyses[item.function] = f"{item.local_report}\n{section}"
+
+        logger.info("Finalizado: prompt_detecting_infeasible_paths_batch -> %d de %d funções", len(analyses), len(items))
+        return analyses
+
+    @_timed("detecting_all_infeasible_paths")
+    def detecting_all_infeasible_paths(self, result_per_function: Dict[str, FunctionResult], code_cleaned: str) -> str:
+        logger.info("Iniciando: prompt_detecting_all_infeasible_paths")
+
+        prompt = self.build_all_infeasible_paths_prompt(result_per_function, code_cleaned)
 
         path_save = os.path.join(self.output_dir, "output_llm", "infeasible_paths_all_functions.txt")
         path_reasoning = os.path.join(self.output_dir, "reasonings", "reasoning_infeasible_paths_all_functions.txt")
         path_prompt_final = os.path.join(self.output_dir, "prompts", "final_prompt_infeasible_paths_all_functions.txt")
 
-        self.file_utils.write_text_file(path_save, resposta or "")
-        self.file_utils.write_text_file(path_reasoning, reasoning if reasoning else "No reasoning provided")
-        self.file_utils.write_text_file(path_prompt_final, prompt)
+        if self._prompt_size(prompt) > self._prompt_limit() and len(result_per_function) > 1:
+            logger.info(
+                "Prompt agregado com tamanho %d excede o orçamento de %d; usando map-reduce",
+                self._prompt_size(prompt), self._prompt_limit(),
+            )
+            batch_prompts = self._batch_all_infeasible_paths_prompts(result_per_function, code_cleaned)
+            if len(batch_prompts) == 1:
+                # com o código recortado, tudo coube em um único prompt
+                prompt = batch_prompts[0]
+            else:
+                partials = [
+                    self._run_stage(
+                        f"infeasible_paths_all_functions:map{number}",
+                        batch_prompt,
+                        os.path.join(self.output_dir, "output_llm", f"infeasible_paths_all_functions_part{number}.txt"),
+                        os.path.join(self.output_dir, "reasonings", f"reasoning_infeasible_paths_all_functions_part{number}.txt"),
+                        os.path.join(self.output_dir, "prompts", f"prompt_infeasible_paths_all_functions_part{number}.txt"),
+                    )
+                    for number, batch_prompt in enumerate(batch_prompts, start=1)
+                ]
+                resposta = self._reduce_reports(partials, path_save, path_reasoning, path_prompt_final)
+                logger.info("Finalizado: prompt_detecting_all_infeasible_paths")
+                return resposta
+
+        resposta = self._run_stage(
+            "infeasible_paths_all_functions", prompt, path_save, path_reasoning, path_prompt_final
+        )
 
         logger.info("Finalizado: prompt_detecting_all_infeasible_paths")
         return resposta
+
+    def _batch_all_infeasible_paths_prompts(self, result_per_function: Dict[str, FunctionResult], code_cleaned: str) -> List[str]:
+        """
+        Etapa "map": divide as funções em lotes consecutivos que cabem no orçamento
+        de contexto e monta o prompt agregado de cada lote, com o recorte de código
+        apenas das funções do lote.
+        """
+        slicer = CodeSlicer(code_cleaned)
+        funcs = list(result_per_function)
+        overhead = self._prompt_size(self.build_all_infeasible_paths_prompt({}, ""))
+        sizes = [
+            self._prompt_size(
+                self.build_all_infeasible_paths_prompt({func: result_per_function[func]}, slicer.slice(func) or "")
+            ) - overhead
+            for func in funcs
+        ]
+        batches = pack_in_order(sizes, max(self._prompt_limit() - overhead, 1))
+        logger.info("Map-reduce: %d funções em %d lotes", len(funcs), len(batches))
+
+        prompts = []
+        for number, batch in enumerate(batches, start=1):
+            names = [funcs[idx] for idx in batch]
+            batch_code = slicer.slice_many(names)
+            if batch_code is None:
+                logger.warning("Nenhuma função do lote %d foi localizada no código; lote sem código", number)
+                batch_code = ""
+            prompts.append(self.build_all_infeasible_paths_prompt({name: result_per_function[name] for name in names}, batch_code))
+        return prompts
+
+    def _reduce_reports(self, partials: List[str], path_save: str, path_reasoning: str, path_prompt: str) -> str:
+        """
+        Etapa "reduce": junta os relatórios parciais em um único relatório. Se a
+        junção não couber no orçamento, reduz em níveis (grupos de relatórios que
+        cabem) até restar um.
+        """
+        level = 1
+        while True:
+            overhead = self._prompt_size(self.build_merge_reports_prompt([]))
+            groups = pack_in_order(
+                [self._prompt_size(self.build_merge_reports_prompt([p])) - overhead for p in partials],
+                max(self._prompt_limit() - overhead, 1),
+            )
+            if len(groups) == len(partials) and len(groups) > 1:
+                logger.warning("Relatórios parciais grandes demais para agrupar; junção final excederá o orçamento")
+            if len(groups) == 1 or len(groups) == len(partials):
+                # tudo cabe em uma junção (ou não há como agrupar mais): junção final
+                prompt = self.build_merge_reports_prompt(partials)
+                return self._run_stage("infeasible_paths_all_functions", prompt, path_save, path_reasoning, path_prompt)
+
+            logger.info("Reduce nível %d: %d relatórios em %d grupos", level, len(partials), len(groups))
+            merged = []
+            for number, group in enumerate(groups, start=1):
+                if len(group) == 1:
+                    # um relatório sozinho segue para o próximo nível sem nova chamada
+                    merged.append(partials[group[0]])
+                    continue
+                prompt = self.build_merge_reports_prompt([partials[idx] for idx in group])
+                merged.append(self._run_stage(
+                    f"infeasible_paths_all_functions:reduce{level}.{number}",
+                    prompt,
+                    os.path.join(self.output_dir, "output_llm", f"infeasible_paths_all_functions_reduce{level}_{number}.txt"),
+                    os.path.join(self.output_dir, "reasonings", f"reasoning_infeasible_paths_all_functions_reduce{level}_{number}.txt"),
+                    os.path.join(self.output_dir, "prompts", f"prompt_infeasible_paths_all_functions_reduce{level}_{number}.txt"),
+                ))
+            partials = merged
+            level += 1
+
+    def _rebuild_with_slice(self, function: str, code: str, build: Callable[[str], str]) -> Optional[str]:
+        sliced = self._sliced_code(function, code)
+        if sliced is None:
+            logger.warning("Função %s não localizada para recorte; prompt mantido", function)
+            return None
+        return build(sliced)
+
+    def _batch_scope(self, functions: Sequence[str]) -> Optional[str]:
+        """No modo incremental, a junção dos trechos que determinam as funções do lote."""
+        scopes = [self._function_scope(function) for function in functions]
+        if any(scope is None for scope in scopes):
+            return None
+        return "\n".join(dict.fromkeys(scopes))
+
+    def _rebuild_batch_with_slice(self, functions: Sequence[str], code: str, build: Callable[[str], str]) -> Optional[str]:
+        sliced = [self._sliced_code(function, code) for function in functions]
+        if any(s is None for s in sliced):
+            logger.warning("Função do lote %s não localizada para recorte; prompt mantido", batch_label(functions))
+            return None
+        return build("\n".join(dict.fromkeys(sliced)))
+
+    def _call_streaming(self, prompt: str, path_save: str, path_reasoning: str):
+        """
+        Chamada em streaming: reasoning e resposta vão sendo gravados em
+        `path_reasoning` e `path_save` enquanto chegam. Se a chamada falhar ou for
+        abortada, o reasoning parcial é mantido antes da mensagem de erro.
+        """
+        writer = ProgressiveWriter(to_disk=self.write_files)
+        targets = {REASONING: path_reasoning, CONTENT: path_save}
+
+        def on_delta(kind: str, text: str) -> None:
+            if kind == RESET:
+                writer.reset()
+            else:
+                writer.write(targets[kind], text)
+
+        try:
+            reasoning, response = self.ia.call(prompt, on_delta=on_delta)
+        finally:
+            writer.close()
+        partial = writer.text(path_reasoning)
+        if is_error_response(response) and partial:
+            reasoning = partial + "\n\n---\n" + (reasoning or "")
+        return reasoning, response
+
+    def _run_stage(
+        self,
+        stage: str,
+        prompt: str,
+        path_save: str,
+        path_reasoning: str,
+        path_prompt: str,
+        hash_basis: Optional[str] = None,
+        postprocess: Optional[Callable[[Optional[str]], str]] = None,
+        rebuild: Optional[Callable[[], Optional[str]]] = None,
+    ) -> str:
+        """
+        Executa uma etapa: dimensiona o prompt, consulta o checkpoint, chama a
+        IA, grava prompt, resposta e reasoning e registra a etapa no manifesto.
+        Retorna o texto salvo em `path_save` (a resposta, ou `postprocess(resposta)`).
+        """
+        prompt, projected = self._preflight(stage, prompt, rebuild)
+        input_hash = hash_input(stage, prompt if hash_basis is None else hash_basis)
+        saved = self._load_checkpoint(stage, input_hash)
+        if saved is not None:
+            self._record(stage, "checkpoint", projected)
+            return saved
+
+        with self.metrics.timer("io_write", self.report_name, stage):
+            self._write_artifact(path_prompt, prompt, stage, "prompt", input_hash)
+        with self.metrics.timer("llm_call", self.report_name, stage) as span:
+            if self.ia.streaming:
+                reasoning, response = self._call_streaming(prompt, path_save, path_reasoning)
+            else:
+                reasoning, response = self.ia.call(prompt)
+            usage = self.ia.last_usage() or {}
+            cached = self.ia.last_was_cached()
+            span.status = "cached" if cached else ("error" if is_error_response(response) else "ok")
+            span.extra.update(
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens"),
+                finish_reason=self.ia.last_finish_reason(),
+                retries=self.ia.last_retries(),
+            )
+        self._record(stage, "cached" if cached else "sent", projected, self.ia.last_usage())
+        output = postprocess(response) if postprocess is not None else (response or "")
+
+        with self.metrics.timer("io_write", self.report_name, stage):
+            ok = not is_error_response(response)
+            self._write_artifact(path_save, output, stage, "output", input_hash, ok)
+            self._write_artifact(path_reasoning, reasoning if reasoning else "No reasoning provided", stage, "reasoning", input_hash, ok)
+        if self.store is not None and ok and stage.startswith("infeasible_paths"):
+            function = stage.split(":", 1)[1] if stage.startswith("infeasible_paths:") else ""
+            self.store.add_infeasible_paths(self.report_name, function, stage, "llm", output)
+        self._mark_done(stage, input_hash, path_save, response)
+        return output
@@ -0,0 +1,231 @@
+"""
+Persistência deduplicada dos prompts gravados em `output/<code>/prompts/`.
+
+Todo prompt repete o código-fonte inteiro (ou o recorte da função), o
+template e, na análise de caminhos, o CDFG. Com o `PromptStore`, esses
+segmentos são gravados uma única vez como blobs endereçados pelo sha256 do
+conteúdo (`output/blobs/<ab>/<hash>.txt`, compartilhados por todos os
+arquivos da execução) e cada prompt vira um manifesto JSON pequeno
+(`prompt_cdfg_fac.json` no lugar de `prompt_cdfg_fac.txt`):
+
+    {"version": 1, "file": "prompt_cdfg_fac.txt", "sha256": "...", "length": 1234,
+     "blobs": "../../blobs", "parts": [{"text": "[code]\\n"}, {"blob": "ab12..."}, ...]}
+
+Os segmentos candidatos de cada prompt são só os marcados durante a sua
+montagem (`segment`/`template` seguidos de `join`, na mesma thread): gravar
+um prompt não percorre os segmentos dos outros prompts da execução.
+
+`load_prompt` remonta o texto exato (conferindo o sha256, também de
+manifestos comprimidos por `--compress-artifacts`) e `rehydrate_prompts`
+regrava os `.txt` de uma árvore de saída inteira.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from core.prompt_templates import Template
+from utils.file_utils import FileUtils, read_artifact_text
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+BLOBS_DIR = "blobs"
+# Segmentos menores que isso ficam no próprio manifesto.
+MIN_SEGMENT_CHARS = 512
+# Prompts montados (e ainda não gravados) cujos segmentos ficam guardados.
+MAX_TRACKED_PROMPTS = 256
+_MANIFEST_SUFFIXES = (".json", ".json.gz", ".json.zst")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def blob_path(blobs_dir: str, digest: str) -> str:
+    return os.path.join(blobs_dir, digest[:2], digest + ".txt")
+
+
+def manifest_path(prompt_path: str) -> str:
+    return os.path.splitext(prompt_path)[0] + ".json"
+
+
+class PromptStore:
+    """
+    Grava prompts como manifestos de referências a blobs. Quem monta o prompt
+    marca os segmentos candidatos (código, templates, CDFGs) com
+    `segment`/`template` e junta as partes com `join`, que associa os
+    segmentos marcados ao prompt; ao gravar, cada ocorrência de um desses
+    segmentos vira uma referência, e o resto fica literal.
+    """
+
+    def __init__(
+        self,
+        blobs_dir: str,
+        file_utils: FileUtils,
+        min_segment_chars: int = MIN_SEGMENT_CHARS,
+        max_tracked_prompts: int = MAX_TRACKED_PROMPTS,
+    ):
+        self.blobs_dir = blobs_dir
+        self.file_utils = file_utils
+        self.min_segment_chars = min_segment_chars
+        self.max_tracked_prompts = max(1, int(max_tracked_prompts))
+        # sha256 do prompt -> segmentos marcados na sua montagem (LRU limitado)
+        self._prompts: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._local = threading.local()
+        self._stored: Set[str] = set()
+        self._lock = threading.Lock()
+        self.prompt_chars = 0
+        self.written_chars = 0
+
+    def _marked(self) -> Dict[str, None]:
+        marked = getattr(self._local, "marked", None)
+        if marked is None:
+            marked = self._local.marked = {}
+        return marked
+
+    def segment(self, text: Optional[str]) -> str:
+        """Marca `text` como segmento do prompt em montagem nesta thread e o devolve (para uso nas concatenações)."""
+        if text and len(text) >= self.min_segment_chars:
+            self._marked()[text] = None
+        return text or ""
+
+    def template(self, template: Template) -> Template:
+        """Marca os trechos fixos de um template (entre os marcadores substituídos) e o devolve."""
+        for literal in template.literals:
+            self.segment(literal)
+        return template
+
+    def join(self, parts: Sequence[str]) -> str:
+        """Junta as partes de um prompt e associa a ele os segmentos marcados desde o último `join` da thread."""
+        prompt = "".join(parts)
+        marked = self._marked()
+        if marked:
+            segments = tuple(marked)
+            marked.clear()
+            digest = content_hash(prompt)
+            with self._lock:
+                self._prompts[digest] = segments
+                self._prompts.move_to_end(digest)
+                while len(self._prompts) > self.max_tracked_prompts:
+                    self._prompts.popitem(last=False)
+        return prompt
+
+    def split(self, prompt: str) -> List[Tuple[str, str]]:
+        """Partes ("text", literal) ou ("blob", hash) que, concatenadas, reproduzem `prompt`."""
+        with self._lock:
+            candidates = self._prompts.get(content_hash(prompt), ())
+        return self._split(prompt, {content_hash(text): text for text in candidates})
+
+    @staticmethod
+    def _split(prompt: str, candidates: Dict[str, str]) -> List[Tuple[str, str]]:
+        segments = sorted(((text, digest) for digest, text in candidates.items()), key=lambda item: len(item[0]), reverse=True)
+        spans: List[Tuple[int, int, str]] = []
+        for text, digest in segments:
+            start = prompt.find(text)
+            while start != -1:
+                end = start + len(text)
+                if all(end <= s or start >= e for s, e, _ in spans):
+                    spans.append((start, end, digest))
+                    start = prompt.find(text, end)
+                else:
+                    start = prompt.find(text, start + 1)
+        spans.sort()
+        parts: List[Tuple[str, str]] = []
+        pos = 0
+        for start, end, digest in spans:
+            if start > pos:
+                parts.append(("text", prompt[pos:start]))
+            parts.append(("blob", digest))
+            pos = end
+        if pos < len(prompt):
+            parts.append(("text", prompt[pos:]))
+        return parts
+
+    def save(self, prompt_path: str, prompt: str) -> str:
+        """Grava os blobs novos e o manifesto do prompt; retorna o caminho do manifesto."""
+        digest = content_hash(prompt)
+        with self._lock:
+            candidates = self._prompts.pop(digest, ())
+        segments = {content_hash(text): text for text in candidates}
+        parts = self._split(prompt, segments)
+        written = 0
+        for kind, value in parts:
+            if kind != "blob":
+                continue
+            with self._lock:
+                if value in self._stored:
+                    continue
+                self._stored.add(value)
+            path = blob_path(self.blobs_dir, value)
+            if not os.path.exists(path):
+                self.file_utils.write_text_file(path, segments[value])
+                written += len(segments[value])
+
+        path = manifest_path(prompt_path)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "file": os.path.basename(prompt_path),
+            "sha256": digest,
+            "length": len(prompt),
+            "blobs": os.path.relpath(self.blobs_dir, os.path.dirname(path)).replace(os.sep, "/"),
+            "parts": [{kind: value} for kind, value in parts],
+        }
+        text = json.dumps(manifest, ensure_ascii=False, indent=1)
+        self.file_utils.write_text_file(path, text)
+        with self._lock:
+            self.prompt_chars += len(prompt)
+            self.written_chars += written + len(text)
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"segments": len(self._stored), "prompt_chars": self.prompt_chars, "written_chars": self.written_chars}
+
+
+def load_prompt(path: str) -> str:
+    """Remonta o prompt de um manifesto; ValueError se o resultado não bater com o sha256 gravado."""
+    manifest = json.loads(read_artifact_text(path))
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Versão de manifesto de prompt incompatível em {path}")
+    blobs_dir = os.path.join(os.path.dirname(path), manifest["blobs"])
+    chunks = []
+    for part in manifest["parts"]:
+        if "text" in part:
+            chunks.append(part["text"])
+        else:
+            with open(blob_path(blobs_dir, part["blob"]), "r", encoding="utf-8", newline="") as f:
+                chunks.append(f.read())
+    prompt = "".join(chunks)
+    if content_hash(prompt) != manifest["sha256"]:
+        raise ValueError(f"Prompt remontado de {path} não confere com o sha256 do manifesto")
+    return prompt
+
+
+def rehydrate_prompts(output_base: str, remove_manifests: bool = False) -> int:
+    """Regrava os `.txt` de todos os manifestos de prompt em `output_base`; retorna quantos."""
+    restored = 0
+    for dirpath, _, filenames in os.walk(output_base):
+        if os.path.basename(dirpath) != "prompts":
+            continue
+        for name in sorted(filenames):
+            suffix = next((s for s in _MANIFEST_SUFFIXES if name.endswith(s)), None)
+            if suffix is None:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                target = json.loads(read_artifact_text(path)).get("file")
+                prompt = load_prompt(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Manifesto de prompt ignorado (%s): %s", path, e)
+                continue
+            FileUtils().write_text_file(os.path.join(dirpath, target or name[: -len(suffix)] + ".txt"), prompt)
+            if remove_manifests:
+                os.remove(path)
+            restored += 1
+    logger.info("Prompts remontados em %s: %d", output_base, restored)
+    return restored
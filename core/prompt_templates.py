@@ -0,0 +1,139 @@
+"""
+Templates de prompt (`prompts/*.md`) compilados uma vez e montados por junção.
+
+Cada template é lido e quebrado em trechos fixos e marcadores nomeados na
+primeira vez que é usado; depois, só é relido quando o arquivo muda (mtime
+ou tamanho). Cada marcador vira um nome (minúsculas, palavras unidas por
+`_`); os usados pelos templates do repositório são:
+
+    <INSERT FUNCTION HERE>            -> function
+    <INSERT FUNCTIONS HERE>           -> functions
+    <INSERT CDFG HERE>                -> cdfg
+    <INSERT PATHS HERE>               -> paths
+    <INSERT PATH CRITERION HERE>      -> path_criterion
+    {replace with function name here} -> function_name
+
+`Template.render(function=..., cdfg=...)` exige exatamente os marcadores do
+template (faltando ou sobrando algum, `TemplateError`; também para um
+template inexistente) e monta o texto com
+um único `"".join`; `Template.parts` devolve a lista de pedaços para quem
+monta prompts maiores juntando listas.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.file_utils import FileUtils
+
+logger = logging.getLogger(__name__)
+
+# Marcadores substituídos nos templates de prompts/*.md.
+PLACEHOLDER = re.compile(
+    r"<INSERT\s+(?P<insert>[^>\n]*?)(?:\s+HERE)?>|\{replace with\s+(?P<replace>[^}\n]*?)(?:\s+here)?\}"
+)
+
+
+class TemplateError(ValueError):
+    """Template inexistente ou valores incompatíveis com os seus marcadores."""
+
+
+def placeholder_name(match: "re.Match") -> str:
+    """Nome do marcador: `<INSERT PATH CRITERION HERE>` -> "path_criterion"."""
+    label = match.group("insert") if match.group("insert") is not None else match.group("replace")
+    return re.sub(r"\W+", "_", label.strip().lower()).strip("_")
+
+
+class Template:
+    """Template compilado: trechos fixos alternados com nomes de marcadores."""
+
+    def __init__(self, text: str, path: str = "<string>"):
+        self.path = path
+        self.text = text
+        # (literal, None) ou ("", nome do marcador), na ordem do template
+        segments: List[Tuple[str, Optional[str]]] = []
+        pos = 0
+        for m in PLACEHOLDER.finditer(text):
+            if m.start() > pos:
+                segments.append((text[pos:m.start()], None))
+            segments.append(("", placeholder_name(m)))
+            pos = m.end()
+        if pos < len(text):
+            segments.append((text[pos:], None))
+        self._segments = segments
+        self.placeholders = frozenset(name for _, name in segments if name is not None)
+
+    @property
+    def literals(self) -> List[str]:
+        """Trechos fixos do template (entre os marcadores)."""
+        return [literal for literal, name in self._segments if name is None]
+
+    def parts(self, values: Optional[Dict[str, str]] = None) -> List[str]:
+        """Pedaços do template com os marcadores preenchidos por `values`."""
+        values = values or {}
+        missing = self.placeholders.difference(values)
+        unknown = set(values).difference(self.placeholders)
+        if missing or unknown:
+            raise TemplateError(
+                f"Template {self.path}: marcadores sem valor {sorted(missing)}, valores sem marcador {sorted(unknown)}"
+            )
+        out: List[str] = []
+        for literal, name in self._segments:
+            if name is None:
+                out.append(literal)
+            else:
+                value = values[name]
+                if not isinstance(value, str):
+                    raise TemplateError(f"Template {self.path}: valor de '{name}' deve ser str, não {type(value).__name__}")
+                out.append(value)
+        return out
+
+    def render(self, **values: str) -> str:
+        return "".join(self.parts(values))
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"Template({self.path!r}, placeholders={sorted(self.placeholders)})"
+
+
+class TemplateRegistry:
+    """Cache de templates compilados por caminho, recarregados só quando o arquivo muda."""
+
+    def __init__(self):
+        self._templates: Dict[str, Tuple[Tuple[int, int], Template]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, path: str) -> Template:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise TemplateError(f"Template não encontrado: {path}") from e
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._templates.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        template = Template(FileUtils.load_markdown_file(path), path)
+        with self._lock:
+            self._templates[path] = (version, template)
+            self.loads += 1
+        logger.info("Template %s: %r", "recarregado" if cached is not None else "carregado", template)
+        return template
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+
+_registry = TemplateRegistry()
+
+
+def load_template(path: str) -> Template:
+    """Template compilado de `path` (compartilhado pelo processo; recarregado se o arquivo mudar)."""
+    return _registry.get(path)
+
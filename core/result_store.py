@@ -0,0 +1,408 @@
+"""
+Armazenamento estruturado (SQLite) dos resultados do pipeline.
+
+Um único arquivo guarda, por execução (`runs`):
+
+- `artifacts`: prompts, reasonings, respostas (CDFGs, listas de funções,
+  relatórios) e o código original, com arquivo, função, etapa e o caminho que
+  o artefato teria na árvore `output/<code>/...`;
+- `infeasible_paths`: os caminhos inviáveis extraídos dos relatórios (da LLM
+  ou do pré-filtro local);
+- `token_usage`: as linhas do `TokenReport` (tokens estimados x reais);
+- `events`: os eventos do `MetricsRecorder` (tempos, tokens, retries).
+
+As escritas são acumuladas em memória e gravadas em lotes, cada lote numa
+transação. `export` regenera a árvore de diretórios de antes a partir do
+banco:
+
+    python results.py export output/results.sqlite output
+    python results.py runs output/results.sqlite
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from core.metrics import EVENT_FIELDS, Event
+from core.prompt_store import rehydrate_prompts
+from core.token_budget import REPORT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+DEFAULT_BATCH_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    file TEXT NOT NULL,
+    function TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    input_hash TEXT,
+    ok INTEGER NOT NULL DEFAULT 1,
+    created REAL NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_lookup ON artifacts (file, function, stage, kind);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS artifacts_path ON artifacts (path);
+CREATE INDEX IF NOT EXISTS artifacts_checkpoint ON artifacts (file, stage, input_hash);
+CREATE TABLE IF NOT EXISTS infeasible_paths (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    file TEXT NOT NULL,
+    function TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    source TEXT NOT NULL,
+    number INTEGER,
+    path_function TEXT,
+    path_id TEXT,
+    description TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS infeasible_paths_lookup ON infeasible_paths (file, function, run_id);
+CREATE TABLE IF NOT EXISTS token_usage (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    file TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    projected_prompt_tokens INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS token_usage_lookup ON token_usage (file, run_id);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    kind TEXT NOT NULL,
+    file TEXT,
+    name TEXT,
+    started REAL,
+    seconds REAL,
+    status TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    finish_reason TEXT,
+    retries INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_lookup ON events (kind, file, run_id);
+"""
+
+_ARTIFACT_COLUMNS = ("run_id", "file", "function", "stage", "kind", "path", "input_hash", "ok", "created", "content")
+_PATH_COLUMNS = ("run_id", "file", "function", "stage", "source", "number", "path_function", "path_id", "description", "reason")
+_TOKEN_COLUMNS = ("run_id",) + tuple(REPORT_FIELDS)
+_EVENT_COLUMNS = ("run_id",) + tuple(EVENT_FIELDS)
+
+_TABLES = {
+    "artifacts": _ARTIFACT_COLUMNS,
+    "infeasible_paths": _PATH_COLUMNS,
+    "token_usage": _TOKEN_COLUMNS,
+    "events": _EVENT_COLUMNS,
+}
+
+
+class InfeasiblePath(NamedTuple):
+    """Um item de relatório de caminhos inviáveis."""
+    number: Optional[int]
+    function: Optional[str]
+    path_id: Optional[str]
+    description: Optional[str]
+    reason: Optional[str]
+
+
+# "1. **Infeasible Path [fac]** (P3)" (prompts por função) ou
+# "- Infeasible Path #1: Nodes [A3→B5]" (prompt agregado)
+_ITEM = re.compile(
+    r"^[ \t]*(?:(?P<number>\d+)\.[ \t]*\*\*Infeasible Path[ \t]*(?:\[(?P<function>[^\]\n]*)\])?\*\*(?:[ \t]*\((?P<path_id>[^)\n]*)\))?"
+    r"|[-*][ \t]*\**Infeasible Path[ \t]*#(?P<number2>\d+)\**:[ \t]*(?:Nodes[ \t]*)?\[?(?P<nodes>[^\]\n]*)\]?)",
+    re.M | re.I,
+)
+_FIELD = re.compile(r"^[ \t]*(?:[-*][ \t]*)?\**(Description|Reason)\**[ \t]*:\**[ \t]*(.+)$", re.M | re.I)
+
+
+def parse_infeasible_paths(report: Optional[str]) -> List[InfeasiblePath]:
+    """Caminhos de um relatório no formato de saída dos prompts; [] se não houver nenhum reconhecível."""
+    if not report:
+        return []
+    items = list(_ITEM.finditer(report))
+    paths = []
+    for i, m in enumerate(items):
+        body = report[m.end():items[i + 1].start() if i + 1 < len(items) else len(report)]
+        fields = {name.lower(): value.strip() for name, value in _FIELD.findall(body)}
+        number = m.group("number") or m.group("number2")
+        paths.append(InfeasiblePath(
+            number=int(number) if number else None,
+            function=(m.group("function") or "").strip() or None,
+            path_id=(m.group("path_id") or "").strip() or None,
+            description=fields.get("description") or (m.group("nodes") or "").strip() or None,
+            reason=fields.get("reason"),
+        ))
+    return paths
+
+
+def _int_or_none(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+class ResultStore:
+    """
+    Banco SQLite com os resultados de uma ou mais execuções, compartilhado
+    pelas threads do pipeline. As linhas ficam pendentes até somarem
+    `batch_size`, até uma consulta ou até `flush()`/`close()`.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.run_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[tuple]] = {table: [] for table in _TABLES}
+        self._pending_count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            elif int(row[0]) != SCHEMA_VERSION:
+                raise ValueError(f"Versão de esquema incompatível em {path}: {row[0]} (esperada {SCHEMA_VERSION})")
+
+    # --------------------------------------------------------------- escrita
+
+    def begin_run(self, config: Optional[dict] = None) -> int:
+        """Abre uma execução; as linhas adicionadas depois pertencem a ela."""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO runs (started, config) VALUES (?, ?)",
+                    (time.time(), json.dumps(config or {}, sort_keys=True, default=str)),
+                )
+            self.run_id = cursor.lastrowid
+        logger.info("Armazenamento de resultados: execução %d em %s", self.run_id, self.path)
+        return self.run_id
+
+    def finish_run(self) -> None:
+        self.flush()
+        if self.run_id is None:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE runs SET finished = ? WHERE run_id = ?", (time.time(), self.run_id))
+
+    def _add(self, table: str, rows: Iterable[tuple]) -> None:
+        if self.run_id is None:
+            raise RuntimeError("ResultStore: begin_run() não foi chamado")
+        flush = False
+        with self._lock:
+            pending = self._pending[table]
+            before = len(pending)
+            pending.extend((self.run_id,) + row for row in rows)
+            self._pending_count += len(pending) - before
+            flush = self._pending_count >= self.batch_size
+        if flush:
+            self.flush()
+
+    def add_artifact(
+        self,
+        file: str,
+        function: str,
+        stage: str,
+        kind: str,
+        path: str,
+        content: str,
+        input_hash: Optional[str] = None,
+        ok: bool = True,
+    ) -> None:
+        """`path` é relativo à raiz de saída (ex.: "fac/cdfgs/cdfg_fac.txt")."""
+        self._add("artifacts", [(file, function, stage, kind, path, input_hash, int(ok), time.time(), content)])
+
+    def add_infeasible_paths(self, file: str, function: str, stage: str, source: str, report: Optional[str]) -> int:
+        """Extrai e grava os caminhos do relatório; retorna quantos foram reconhecidos."""
+        paths = parse_infeasible_paths(report)
+        self._add("infeasible_paths", [
+            (file, function, stage, source, p.number, p.function, p.path_id, p.description, p.reason) for p in paths
+        ])
+        return len(paths)
+
+    def add_token_rows(self, rows: Sequence[Dict[str, object]]) -> None:
+        self._add("token_usage", [
+            (row["file"], row["stage"], row["status"], _int_or_none(row["projected_prompt_tokens"]),
+             _int_or_none(row["prompt_tokens"]), _int_or_none(row["completion_tokens"]),
+             _int_or_none(row["total_tokens"]))
+            for row in rows
+        ])
+
+    def add_events(self, events: Sequence[Event]) -> None:
+        self._add("events", [tuple(asdict(event)[name] for name in EVENT_FIELDS) for event in events])
+
+    def flush(self) -> None:
+        """Grava as linhas pendentes numa única transação."""
+        with self._lock:
+            if not self._pending_count:
+                return
+            pending = self._pending
+            self._pending = {table: [] for table in _TABLES}
+            count, self._pending_count = self._pending_count, 0
+            t0 = time.perf_counter()
+            try:
+                with self._conn:
+                    for table, rows in pending.items():
+                        if rows:
+                            columns = _TABLES[table]
+                            self._conn.executemany(
+                                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                rows,
+                            )
+            except sqlite3.Error:
+                # a transação foi desfeita: devolve as linhas para a próxima tentativa
+                for table, rows in pending.items():
+                    self._pending[table][:0] = rows
+                self._pending_count += count
+                raise
+        logger.debug("ResultStore: %d linhas gravadas em %.3fs", count, time.perf_counter() - t0)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._conn.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -------------------------------------------------------------- consulta
+
+    def query(self, sql: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        """Consulta livre (grava antes as linhas pendentes)."""
+        self.flush()
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            finally:
+                self._conn.row_factory = None
+
+    def checkpoint(self, file: str, stage: str, input_hash: str) -> Optional[str]:
+        """Saída mais recente da etapa concluída com as mesmas entradas, em qualquer execução."""
+        rows = self.query(
+            "SELECT content FROM artifacts WHERE file = ? AND stage = ? AND input_hash = ? "
+            "AND kind = 'output' AND ok = 1 ORDER BY id DESC LIMIT 1",
+            (file, stage, input_hash),
+        )
+        return rows[0]["content"] if rows else None
+
+    def runs(self) -> List[sqlite3.Row]:
+        return self.query(
+            "SELECT r.run_id, r.started, r.finished, r.config, "
+            "(SELECT COUNT(*) FROM artifacts a WHERE a.run_id = r.run_id) AS artifacts, "
+            "(SELECT COUNT(DISTINCT file) FROM artifacts a WHERE a.run_id = r.run_id) AS files "
+            "FROM runs r ORDER BY r.run_id"
+        )
+
+    def export(self, output_base: str, run_id: Optional[int] = None) -> int:
+        """
+        Regenera em `output_base` a árvore `<code>/{prompts,reasonings,cdfgs,output_llm}`
+        e os `token_report.csv` por arquivo, com a versão mais recente de cada
+        artefato até a execução `run_id` (padrão: a última). Retorna o número
+        de arquivos escritos.
+        """
+        if run_id is None:
+            rows = self.query("SELECT MAX(run_id) AS run_id FROM runs")
+            run_id = rows[0]["run_id"] if rows else None
+            if run_id is None:
+                return 0
+        latest = self.query(
+            "SELECT path, content FROM artifacts WHERE id IN "
+            "(SELECT MAX(id) FROM artifacts WHERE run_id <= ? GROUP BY path)",
+            (run_id,),
+        )
+        written = 0
+        root = os.path.abspath(output_base)
+        for row in latest:
+            target = os.path.abspath(os.path.join(root, row["path"]))
+            if os.path.commonpath([root, target]) != root:
+                logger.warning("Caminho fora da saída ignorado na exportação: %s", row["path"])
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(row["content"])
+            written += 1
+
+        tokens = self.query(
+            f"SELECT {', '.join(REPORT_FIELDS)} FROM token_usage WHERE run_id = ? ORDER BY rowid", (run_id,)
+        )
+        by_file: Dict[str, List[dict]] = {}
+        for row in tokens:
+            by_file.setdefault(row["file"], []).append({k: ("" if row[k] is None else row[k]) for k in REPORT_FIELDS})
+        for file, file_rows in by_file.items():
+            target = os.path.join(root, file, "token_report.csv")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(file_rows)
+            written += 1
+        logger.info("Exportação da execução %d: %d arquivos em %s", run_id, written, output_base)
+        return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Consulta e exportação do armazenamento de resultados (SQLite).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Regenera a árvore de saída em diretórios a partir do banco.")
+    export.add_argument("database")
+    export.add_argument("output", help="Diretório de saída (ex.: output).")
+    export.add_argument("--run", type=int, default=None, help="Execução a exportar (padrão: a última).")
+    runs = sub.add_parser("runs", help="Lista as execuções registradas no banco.")
+    runs.add_argument("database")
+    rehydrate = sub.add_parser("rehydrate", help="Remonta os .txt dos prompts gravados com --dedup-prompts.")
+    rehydrate.add_argument("output", help="Diretório de saída (ex.: output).")
+    rehydrate.add_argument("--remove-manifests", action="store_true", help="Apaga os manifestos remontados.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.command == "rehydrate":
+        rehydrate_prompts(args.output, args.remove_manifests)
+        return
+    if not os.path.isfile(args.database):
+        parser.error(f"banco não encontrado: {args.database}")
+    with ResultStore(args.database) as store:
+        if args.command == "export":
+            store.export(args.output, args.run)
+        else:
+            for row in store.runs():
+                finished = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["finished"])) if row["finished"] else "-"
+                started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["started"]))
+                print(f"{row['run_id']:>4}  {started}  {finished}  {row['files']:>4} arquivos  {row['artifacts']:>6} artefatos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Ordenação de arquivos para o processamento paralelo do pipeline."""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+from utils.lizard_metrics import load_lizard_metrics
+from utils.models import FunctionMetrics
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_file_weight(path: str, metrics: Optional[List[FunctionMetrics]]) -> float:
+    """
+    Estima o custo relativo (em unidades arbitrárias) de processar um arquivo.
+
+    Cada chamada por função reenvia o arquivo inteiro, então o tamanho é
+    multiplicado pelo número de chamadas; a complexidade (token x CCN) aproxima
+    o trabalho de raciocínio do modelo. Sem métricas, assume uma única função.
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if not metrics:
+        return float(size * 2)
+    return float(size * (len(metrics) + 1) + sum(m.token * m.ccn for m in metrics))
+
+
+class FileScheduler:
+    """Define a ordem de despacho dos arquivos: os mais pesados primeiro."""
+
+    def __init__(self, codes_dir: str, metrics_path: Optional[str] = "annotations/metricas.txt"):
+        self.codes_dir = codes_dir
+        self.metrics: Dict[str, List[FunctionMetrics]] = (
+            load_lizard_metrics(metrics_path) if metrics_path else {}
+        )
+
+    def weight(self, fname: str) -> float:
+        return estimate_file_weight(os.path.join(self.codes_dir, fname), self.metrics.get(fname))
+
+    def order(self, files: List[str]) -> List[str]:
+        """Ordena por peso decrescente; empates mantêm a ordem alfabética."""
+        weights = {fname: self.weight(fname) for fname in files}
+        ordered = sorted(files, key=lambda fname: (-weights[fname], fname))
+        logger.debug("Ordem de despacho: %s", [(f, weights[f]) for f in ordered])
+        return ordered
@@ -0,0 +1,107 @@
+"""Orçamento de tokens por prompt e relatório de tokens estimados x reais."""
+
+import csv
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# warn: apenas registra; refuse: não envia o prompt; slice: recorta o código e, se ainda exceder, avisa.
+TOKEN_POLICIES = ("warn", "refuse", "slice")
+
+REPORT_FIELDS = (
+    "file",
+    "stage",
+    "status",
+    "projected_prompt_tokens",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+)
+
+
+class PromptTooLargeError(Exception):
+    """Prompt acima do orçamento de tokens com a política "refuse"."""
+
+    def __init__(self, stage: str, tokens: int, budget: int):
+        super().__init__(f"Prompt da etapa {stage} tem ~{tokens} tokens (orçamento: {budget})")
+        self.stage = stage
+        self.tokens = tokens
+        self.budget = budget
+
+
+class TokenReport:
+    """
+    Linhas (arquivo, etapa) com os tokens estimados antes do envio e os
+    informados pelo endpoint em `usage`. Pode ser preenchido por várias
+    threads ao mesmo tempo.
+
+    `status` é "sent" (chamada feita), "checkpoint" (etapa reaproveitada, sem
+    chamada), "cached" (respondida pelo cache de respostas, sem `usage`) ou
+    "refused" (acima do orçamento com a política "refuse").
+    """
+
+    def __init__(self):
+        self._rows: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+
+    def record(self, file: str, stage: str, status: str, projected: int, usage: Optional[dict] = None) -> None:
+        usage = usage or {}
+        row = {
+            "file": file,
+            "stage": stage,
+            "status": status,
+            "projected_prompt_tokens": projected,
+            "prompt_tokens": usage.get("prompt_tokens", ""),
+            "completion_tokens": usage.get("completion_tokens", ""),
+            "total_tokens": usage.get("total_tokens", ""),
+        }
+        with self._lock:
+            self._rows.append(row)
+
+    def rows(self, file: Optional[str] = None) -> List[Dict[str, object]]:
+        with self._lock:
+            return [dict(row) for row in self._rows if file is None or row["file"] == file]
+
+    def summary(self, file: Optional[str] = None) -> Dict[str, int]:
+        """Totais estimados e reais; a razão só considera etapas com `usage`."""
+        rows = self.rows(file)
+        measured = [r for r in rows if r["prompt_tokens"] != ""]
+        return {
+            "stages": len(rows),
+            "projected_prompt_tokens": sum(int(r["projected_prompt_tokens"]) for r in rows),
+            "measured_stages": len(measured),
+            "measured_projected_tokens": sum(int(r["projected_prompt_tokens"]) for r in measured),
+            "prompt_tokens": sum(int(r["prompt_tokens"]) for r in measured),
+            "completion_tokens": sum(int(r["completion_tokens"] or 0) for r in measured),
+        }
+
+    def write_csv(self, path: str, file: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows(file))
+
+
+class TokenBudget:
+    """
+    Dimensiona cada prompt antes do envio. Sem `max_tokens`, apenas mede;
+    com ele, aplica `policy` aos prompts que o excedem.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, policy: str = "warn"):
+        if policy not in TOKEN_POLICIES:
+            raise ValueError(f"Política de orçamento inválida: {policy!r}; use uma de {TOKEN_POLICIES}")
+        self.max_tokens = max_tokens if max_tokens and max_tokens > 0 else None
+        self.policy = policy
+
+    def estimate(self, prompt: str) -> int:
+        return estimate_tokens(prompt)
+
+    def exceeds(self, tokens: int) -> bool:
+        return self.max_tokens is not None and tokens > self.max_tokens
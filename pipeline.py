@@ -4,9 +4,19 @@ Este arquivo mantém compatibilidade com execuções diretas de
 `python pipeline.py` ao montar logging básico e chamar `Pipeline.run()`.
 """
 
+import argparse
 import logging
+from typing import Optional
 
+from ai.response_cache import ResponseCache
+from ai.retry import RetryPolicy
+from ai.transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from core.batching import DEFAULT_BATCH_MAX_CCN, DEFAULT_BATCH_MAX_LINES
+from core.chunking import DEFAULT_CONTEXT_CHARS
 from core.pipeline_main import Pipeline
+from core.token_budget import TOKEN_POLICIES
+from utils.cdfg_paths import DEFAULT_LOOP_BOUND, DEFAULT_MAX_PATHS, PATH_MODES
+from utils.file_utils import COMPRESSIONS
 
 
 # Configuração básica de logging do módulo (pode ser sobrescrita pela aplicação)
@@ -14,8 +24,268 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name
 logger = logging.getLogger(__name__)
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Detecção de caminhos inviáveis com LLM.")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Número máximo de funções analisadas em paralelo por arquivo (padrão: 1, serial).",
+    )
+    parser.add_argument(
+        "--max-files",
+        type=int,
+        default=1,
+        help="Número de arquivos de 'codes/' processados simultaneamente (padrão: 1).",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help=(
+            "Limite global de requisições simultâneas à LLM, compartilhado por arquivos e funções "
+            "(padrão: --max-files x --max-workers)."
+        ),
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Timeout (s) para abrir a conexão com o endpoint da LLM.",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Timeout (s) de leitura da resposta da LLM; uma chamada travada falha em vez de parar o pipeline.",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=RetryPolicy.max_retries,
+        help="Tentativas extras por requisição em erros transitórios (429, 5xx, timeout), com backoff exponencial.",
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=None,
+        help="Limite de requisições por minuto à LLM (reduzido automaticamente ao receber 429).",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=float,
+        default=None,
+        help="Limite de tokens por minuto (estimados no envio e corrigidos pelo `usage` da resposta).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Consome as respostas da LLM em streaming (SSE), gravando reasoning e resposta enquanto chegam.",
+    )
+    parser.add_argument(
+        "--max-reasoning-tokens",
+        type=int,
+        default=None,
+        help="Com --stream, aborta a chamada quando o reasoning passa deste número de tokens (estimados).",
+    )
+    parser.add_argument(
+        "--max-reasoning-seconds",
+        type=float,
+        default=None,
+        help="Com --stream, aborta a chamada se a resposta não começar em até S segundos.",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=ResponseCache.MODES + ("off",),
+        default="off",
+        help=(
+            "Cache de respostas da LLM: off (padrão), readwrite, readonly ou bypass (ignora e regrava). "
+            "Com readwrite/readonly, prompts repetidos recebem a resposta gravada, não uma nova."
+        ),
+    )
+    parser.add_argument("--cache-dir", default=".cache/llm", help="Diretório do cache de respostas.")
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=1024,
+        help="Tamanho máximo do cache em MB; as entradas menos usadas são removidas.",
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=None,
+        help="Idade máxima de uma entrada do cache em dias (padrão: sem limite).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma uma execução interrompida: pula etapas já concluídas cujas entradas não mudaram.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reanalisa apenas as funções cujo código mudou desde a última execução (implica --resume).",
+    )
+    parser.add_argument(
+        "--function-extractor",
+        choices=("local", "llm"),
+        default="local",
+        help="Como obter a lista de funções: extrator C local (padrão, com a LLM como fallback) ou sempre a LLM.",
+    )
+    parser.add_argument(
+        "--slice-prompts",
+        action="store_true",
+        help="Nos prompts por função, envia só o código da função e o contexto de que ela depende.",
+    )
+    parser.add_argument(
+        "--context-chars",
+        type=int,
+        default=DEFAULT_CONTEXT_CHARS,
+        help="Tamanho máximo de um prompt em caracteres; acima disso o código é recortado e agregado em lotes.",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Máximo de tokens (estimados localmente) por prompt; sem valor, os prompts são apenas medidos.",
+    )
+    parser.add_argument(
+        "--token-policy",
+        choices=TOKEN_POLICIES,
+        default="warn",
+        help="Prompt acima de --token-budget: warn (envia e avisa), refuse (não envia) ou slice (recorta o código da função).",
+    )
+    parser.add_argument(
+        "--path-mode",
+        choices=("off",) + PATH_MODES,
+        default="off",
+        help="Enumera localmente os caminhos do CDFG e envia a lista à LLM, que só julga a viabilidade: "
+        "paths (entrada -> saída), prime (caminhos primos) ou edge-pair (pares de arestas). Padrão: off.",
+    )
+    parser.add_argument(
+        "--loop-bound",
+        type=int,
+        default=DEFAULT_LOOP_BOUND,
+        help="Iterações máximas de cada laço no modo paths (padrão: 1).",
+    )
+    parser.add_argument(
+        "--max-paths",
+        type=int,
+        default=DEFAULT_MAX_PATHS,
+        help="Máximo de caminhos candidatos por função; acima disso a lista é truncada (padrão: 100).",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Decide localmente (propagação de constantes e intervalos) os caminhos candidatos obviamente "
+        "viáveis ou inviáveis; só os indecisos vão para a LLM. Implica --path-mode paths se estiver off.",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        metavar="DB",
+        help="Grava prompts, reasonings, CDFGs, caminhos inviáveis, tokens e tempos num banco SQLite "
+        "(ex.: output/results.sqlite) em vez de um arquivo texto por etapa e função. "
+        "A árvore de arquivos é regenerada com: python results.py export DB output.",
+    )
+    parser.add_argument(
+        "--store-files",
+        action="store_true",
+        help="Com --store, grava também os arquivos texto de sempre.",
+    )
+    parser.add_argument(
+        "--sync-writes",
+        action="store_true",
+        help="Grava os artefatos na própria thread de trabalho, em vez de uma thread de gravação em segundo plano.",
+    )
+    parser.add_argument(
+        "--compress-artifacts",
+        choices=("off",) + COMPRESSIONS,
+        default="off",
+        help="Comprime prompts e reasonings grandes (.gz/.zst; zstd requer o pacote zstandard). Padrão: off.",
+    )
+    parser.add_argument(
+        "--dedup-prompts",
+        action="store_true",
+        help="Grava cada prompt como um manifesto JSON de referências a blobs (código, templates, CDFGs) "
+        "guardados uma vez em output/blobs/. Os .txt são remontados com: python results.py rehydrate output.",
+    )
+    parser.add_argument(
+        "--batch-functions",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Agrupa até N funções pequenas (ver --batch-max-lines e --batch-max-ccn) numa mesma requisição "
+        "de CDFG e de caminhos inviáveis; funções sem seção válida na resposta voltam para a chamada individual. "
+        "Padrão: 0 (uma requisição por função).",
+    )
+    parser.add_argument(
+        "--batch-max-lines",
+        type=int,
+        default=DEFAULT_BATCH_MAX_LINES,
+        help=f"Linhas máximas de uma função agrupável (padrão: {DEFAULT_BATCH_MAX_LINES}).",
+    )
+    parser.add_argument(
+        "--batch-max-ccn",
+        type=int,
+        default=DEFAULT_BATCH_MAX_CCN,
+        help=f"Complexidade ciclomática máxima de uma função agrupável (padrão: {DEFAULT_BATCH_MAX_CCN}).",
+    )
+    return parser.parse_args()
+
+
+def build_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    if args.cache_mode == "off":
+        return None
+    if args.cache_mode != "bypass":
+        logger.warning(
+            "Cache de respostas ativo (%s, %s): prompts já enviados recebem a resposta gravada, "
+            "sem nova chamada à LLM",
+            args.cache_mode, args.cache_dir,
+        )
+    return ResponseCache(
+        cache_dir=args.cache_dir,
+        mode=args.cache_mode,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        max_age_seconds=args.cache_max_age_days * 86400 if args.cache_max_age_days is not None else None,
+    )
+
+
 def main() -> None:
-    Pipeline().run()
+    args = parse_args()
+    Pipeline(
+        max_workers=args.max_workers,
+        max_files=args.max_files,
+        max_concurrent_requests=args.max_requests,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        cache=build_cache(args),
+        resume=args.resume,
+        incremental=args.incremental,
+        function_extractor=args.function_extractor,
+        slice_prompts=args.slice_prompts,
+        context_chars=args.context_chars,
+        token_budget=args.token_budget,
+        token_policy=args.token_policy,
+        max_retries=args.max_retries,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        stream=args.stream,
+        max_reasoning_tokens=args.max_reasoning_tokens,
+        max_reasoning_seconds=args.max_reasoning_seconds,
+        path_mode=None if args.path_mode == "off" else args.path_mode,
+        loop_bound=args.loop_bound,
+        max_paths=args.max_paths,
+        prefilter=args.prefilter,
+        result_store=args.store,
+        store_files=args.store_files,
+        async_writes=not args.sync_writes,
+        compress_artifacts=None if args.compress_artifacts == "off" else args.compress_artifacts,
+        dedup_prompts=args.dedup_prompts,
+        batch_functions=args.batch_functions,
+        batch_max_lines=args.batch_max_lines,
+        batch_max_ccn=args.batch_max_ccn,
+    ).run()
 
 
 if __name__ == "__main__":
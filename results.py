@@ -0,0 +1,16 @@
+"""Ferramentas sobre os resultados gravados pelo pipeline.
+
+- `runs` / `export`: armazenamento SQLite (ver core/result_store.py);
+- `rehydrate`: remonta os prompts gravados com --dedup-prompts (ver core/prompt_store.py).
+
+Exemplos:
+
+    python results.py runs output/results.sqlite
+    python results.py export output/results.sqlite output
+    python results.py rehydrate output
+"""
+
+from core.result_store import main
+
+if __name__ == "__main__":
+    main()
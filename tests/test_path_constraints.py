@@ -0,0 +1,174 @@
+"""Testes do pré-filtro local de caminhos (`utils.path_constraints`)."""
+
+from utils.c_slicer import CodeSlicer
+from utils.cdfg import parse_cdfg
+from utils.cdfg_paths import describe_paths, entry_exit_paths
+from utils.path_constraints import (
+    FEASIBLE, INFEASIBLE, UNDECIDED, PathPrefilter, format_local_report, node_code_map, undecided_paths,
+)
+
+# decisão simples: 1 -> 2 -> 3 (if) -> 4 (then) -> 5, 3 -> 5 (else)
+DECISION = """digraph f {
+  1 [label="%s"]; 2 [label="%s"]; 3 [label="if (%s)"]; 4 [label="g();"]; 5 [label="return;"];
+  1 -> 2; 2 -> 3; 3 -> 4 [label="True"]; 3 -> 5 [label="False"]; 4 -> 5;
+}"""
+
+
+def verdicts(source, dot, function="f", loop_bound=1):
+    """{sequência de nós: veredito} de todos os caminhos entrada -> saída."""
+    graph = parse_cdfg(dot, function)
+    checker = PathPrefilter(graph, dot, source, function)
+    paths = entry_exit_paths(graph, loop_bound=loop_bound)
+    return {" ".join(graph.nodes[v] for v in path): checker.check(path).status for path in paths.paths}
+
+
+def decision(first, second, condition, declarations="int x, y;"):
+    source = "void g(void);\nvoid f(void) {\n  %s\n  %s\n  %s\n  if (%s)\n    g();\n}\n" % (
+        declarations, first, second, condition,
+    )
+    return verdicts(source, DECISION % (first, second, condition))
+
+
+def test_contradictory_conditions():
+    dot = """digraph f {
+      1 [label="if (x > 10)"]; 2 [label="y = 1;"]; 3 [label="if (x < 5)"]; 4 [label="y = 2;"]; 5 [label="return y;"];
+      1 -> 2 [label="True"]; 1 -> 3 [label="False"]; 2 -> 3; 3 -> 4 [label="True"]; 3 -> 5 [label="False"]; 4 -> 5;
+    }"""
+    source = "int f(int x) {\n  int y = 0;\n  if (x > 10) y = 1;\n  if (x < 5) y = 2;\n  return y;\n}\n"
+    result = verdicts(source, dot)
+    assert result["1 2 3 4 5"] == INFEASIBLE
+    assert result["1 2 3 5"] == UNDECIDED
+    assert result["1 3 4 5"] == UNDECIDED
+
+
+def test_constant_condition_decides_both_branches():
+    result = decision("x = 3;", "y = x + 2;", "y > 5")
+    assert result == {"1 2 3 4 5": INFEASIBLE, "1 2 3 5": FEASIBLE}
+
+
+def test_fixed_bound_loop():
+    dot = """digraph f {
+      1 [label="s = 0;"]; 2 [label="for (i = 0; i < 3; i++)"]; 3 [label="s = s + i;"]; 4 [label="return s;"];
+      1 -> 2; 2 -> 3 [label="True"]; 3 -> 2; 2 -> 4 [label="False"];
+    }"""
+    source = "int f(void) {\n  int i, s;\n  s = 0;\n  for (i = 0; i < 3; i++)\n    s = s + i;\n  return s;\n}\n"
+    # sem iterar ou saindo depois de 1 ou 2 voltas: impossível com i de 0 a 3
+    for bound in (0, 1, 2):
+        assert set(verdicts(source, dot, loop_bound=bound).values()) == {INFEASIBLE}
+    result = verdicts(source, dot, loop_bound=3)
+    assert result["1 2 3 2 3 2 3 2 4"] == FEASIBLE
+
+
+def test_unsigned_char_wraparound():
+    result = decision("c = 255;", "c++;", "c == 0", declarations="unsigned char c;")
+    assert INFEASIBLE not in result.values()
+
+
+def test_short_overflow():
+    result = decision("s = 32767;", "s = s + 1;", "s > 0", declarations="short s;")
+    assert INFEASIBLE not in result.values()
+
+
+def test_unsigned_int_subtraction_wraps():
+    result = decision("u = 0;", "u = u - 1;", "u > 100", declarations="unsigned int u;")
+    assert INFEASIBLE not in result.values()
+
+
+def test_typedef_wraparound():
+    source = (
+        "typedef unsigned char u8;\nvoid g(void);\nvoid f(void) {\n  u8 c;\n  c = 200;\n  c = c + 100;\n"
+        "  if (c > 250)\n    g();\n}\n"
+    )
+    result = verdicts(source, DECISION % ("c = 200;", "c = c + 100;", "c > 250"))
+    assert INFEASIBLE not in result.values()
+
+
+def test_unsigned_compared_with_negative():
+    # em C, -1 vira UINT_MAX: `u > -1` é sempre falso
+    result = decision("u = 5;", "u = u + 1;", "u > -1", declarations="unsigned int u;")
+    assert INFEASIBLE not in result.values()
+
+
+def test_values_within_range_are_still_decided():
+    result = decision("c = 100;", "c++;", "c == 0", declarations="unsigned char c;")
+    assert result == {"1 2 3 4 5": INFEASIBLE, "1 2 3 5": FEASIBLE}
+
+
+def test_float_to_int_conversion_truncates():
+    # em C, 2.7, 2.5 e 5 / 2.0 viram 2 ao serem atribuídos a um int
+    cases = (
+        ("x = 2.7;", "x == 2", "1 2 3 4 5"),
+        ("x = 2.5;", "x > 2", "1 2 3 5"),
+        ("x = 5 / 2.0;", "x == 2", "1 2 3 4 5"),
+    )
+    for first, condition, feasible in cases:
+        result = decision(first, "y = 0;", condition)
+        assert result[feasible] != INFEASIBLE, (first, condition)
+
+
+def test_float_variables_are_not_exact_reals():
+    # 0.1 não é representável: `f == 0.1` é falso com f float
+    result = decision("f = 0.1;", "y = 0;", "f == 0.1", declarations="float f; int y;")
+    assert result["1 2 3 5"] != INFEASIBLE
+    # 16777217 arredonda para 16777216 em float
+    result = decision("f = 16777217;", "y = 0;", "f == 16777216", declarations="float f; int y;")
+    assert result["1 2 3 4 5"] != INFEASIBLE
+    result = decision("d = 1;", "d = d / 3;", "d * 3 == 1", declarations="double d; int y;")
+    assert INFEASIBLE not in result.values()
+
+
+def test_unknown_type_is_not_tracked():
+    source = "void g(void);\nvoid f(void) {\n  T c;\n  c = 255;\n  c++;\n  if (c == 0)\n    g();\n}\n"
+    result = verdicts(source, DECISION % ("c = 255;", "c++;", "c == 0"))
+    assert INFEASIBLE not in result.values()
+
+
+def test_unknown_call_clobbers_globals_but_not_safe_locals():
+    source = "int g(void);\nint n;\nvoid f(void) {\n  int x;\n  n = 1;\n  x = g();\n  if (n == 1)\n    g();\n}\n"
+    result = verdicts(source, DECISION % ("n = 1;", "x = g();", "n == 1"))
+    assert set(result.values()) == {UNDECIDED}
+
+    source = "int g(void);\nvoid f(void) {\n  int x, y;\n  y = 1;\n  x = g();\n  if (y == 1)\n    g();\n}\n"
+    result = verdicts(source, DECISION % ("y = 1;", "x = g();", "y == 1"))
+    assert result["1 2 3 5"] == INFEASIBLE
+
+
+def test_line_references_in_sliced_code():
+    source = (
+        "#include <stdio.h>\nint unused(int a) {\n  return a + 1;\n}\n\n"
+        "int f(int x) {\n  if (x > 10)\n    x = 1;\n  if (x > 20)\n    x = 2;\n  return x;\n}\n"
+    )
+    dot = """digraph f {
+      A; B; C; D; E;
+      A -> B [label="True"]; A -> C [label="False"]; B -> C; C -> D [label="True"]; C -> E [label="False"]; D -> E;
+    }
+    Code-to-node correspondence:
+    - Node A: line 7
+    - Node B: line 8
+    - Node C: line 9
+    - Node D: line 10
+    - Node E: line 11
+    """
+    sliced = CodeSlicer(source).slice("f")
+    assert "#line" in sliced
+    graph = parse_cdfg(dot, "f")
+    expected = ["if (x > 10)", "x = 1;", "if (x > 20)", "x = 2;", "return x;"]
+    for text in (source, sliced):
+        codes = node_code_map(graph, dot, text)
+        assert [c.strip() for c in codes] == expected
+    result = verdicts(sliced, dot)
+    assert result["A B C D E"] == INFEASIBLE
+
+
+def test_truncated_list_keeps_enumerated_count():
+    dot = DECISION % ("x = 3;", "y = x + 2;", "y > 5")
+    graph = parse_cdfg(dot, "f")
+    paths = entry_exit_paths(graph, max_paths=1)
+    assert paths.truncated and len(paths.paths) == 1
+    checker = PathPrefilter(graph, dot, None, "f")
+    found = [checker.check(path) for path in paths.paths]
+    rest = undecided_paths(paths, found)
+    assert rest.total == 1 and rest.truncated
+    assert "truncated at 1 paths" in describe_paths(rest)
+    report = format_local_report("f", graph, paths, found)
+    assert "truncated" in report
@@ -0,0 +1,207 @@
+"""Localização de definições de funções em código C, sem chamar a LLM."""
+
+import logging
+import re
+from typing import List
+
+from utils.models import SourceFunction
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Palavras que podem aparecer antes de "(" em nível global sem serem nomes de função.
+_NOT_FUNCTION_NAMES = frozenset({
+    "if", "while", "for", "switch", "return", "sizeof", "do", "else", "case",
+    "goto", "typedef", "struct", "union", "enum", "__attribute__", "__declspec",
+})
+
+
+def mask_source(code: str) -> str:
+    """
+    Retorna uma cópia de `code` do mesmo tamanho em que comentários, literais de
+    string/caractere e linhas de pré-processador são trocados por espaços
+    (quebras de linha são preservadas). Assim, offsets e números de linha do
+    texto mascarado valem para o original e chaves/parênteses dentro desses
+    trechos não confundem a análise estrutural.
+    """
+    out = list(code)
+    n = len(code)
+    i = 0
+    line_start = True
+
+    def blank(start: int, end: int) -> None:
+        for k in range(start, end):
+            if out[k] != "\n":
+                out[k] = " "
+
+    while i < n:
+        c = code[i]
+        if c == "\n":
+            line_start = True
+            i += 1
+            continue
+        if line_start and c in " \t":
+            i += 1
+            continue
+        if line_start and c == "#":
+            # diretiva de pré-processador, inclusive continuações com "\"
+            j = i
+            while j < n:
+                if code[j] == "\n" and code[j - 1] != "\\":
+                    break
+                if code.startswith("/*", j):
+                    end = code.find("*/", j + 2)
+                    j = n if end == -1 else end + 2
+                    continue
+                j += 1
+            blank(i, j)
+            i = j
+            continue
+        line_start = False
+        if code.startswith("//", i):
+            j = code.find("\n", i)
+            j = n if j == -1 else j
+            blank(i, j)
+            i = j
+        elif code.startswith("/*", i):
+            j = code.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            blank(i, j)
+            i = j
+        elif c == '"' or c == "'":
+            j = i + 1
+            while j < n and code[j] != c and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            j = min(j + 1, n)
+            blank(i + 1, j - 1)
+            i = j
+        else:
+            i += 1
+    return "".join(out)
+
+
+def _match_close(masked: str, start: int, open_ch: str, close_ch: str) -> int:
+    """Índice do fechamento correspondente a `masked[start]`, ou -1."""
+    depth = 0
+    for k in range(start, len(masked)):
+        ch = masked[k]
+        if ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return k
+    return -1
+
+
+def _skip_ws(masked: str, i: int) -> int:
+    n = len(masked)
+    while i < n and masked[i].isspace():
+        i += 1
+    return i
+
+
+def _knr_body_open(masked: str, i: int) -> int:
+    """
+    Para definições no estilo K&R (`f(a, b) int a; char *b; { ... }`), retorna o
+    índice da `{` do corpo se o trecho a partir de `i` for apenas uma sequência
+    de declarações de parâmetros terminadas em `;`. Caso contrário, -1.
+    """
+    n = len(masked)
+    if i >= n or not (masked[i].isalpha() or masked[i] == "_"):
+        return -1
+    last = ""
+    depth = 0
+    for k in range(i, n):
+        ch = masked[k]
+        if ch == "{":
+            return k if depth == 0 and last == ";" else -1
+        if ch in "}=\"'":
+            return -1
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                return -1
+        if not ch.isspace():
+            last = ch
+    return -1
+
+
+def find_functions(code: str) -> List[SourceFunction]:
+    """
+    Encontra as definições de funções de nível global em `code`, com nome e
+    intervalo de linhas (a linha inicial é a do nome, como no lizard).
+
+    Uma definição é um identificador seguido de uma lista de parâmetros
+    balanceada e de um corpo `{ ... }`, opcionalmente com declarações de
+    parâmetros no estilo K&R entre os dois. Comentários, literais e diretivas
+    de pré-processador são ignorados; protótipos, chamadas em inicializadores
+    e blocos `struct`/`enum` não são considerados definições.
+    """
+    masked = mask_source(code)
+    functions: List[SourceFunction] = []
+    n = len(masked)
+    depth = 0
+    boundary = 0  # início da declaração global corrente
+    i = 0
+    while i < n:
+        ch = masked[i]
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                boundary = i + 1
+        elif ch == ";" and depth == 0:
+            boundary = i + 1
+        elif depth == 0 and (ch.isalpha() or ch == "_") and (i == 0 or not (masked[i - 1].isalnum() or masked[i - 1] == "_")):
+            match = _IDENTIFIER.match(masked, i)
+            name = match.group(0)
+            j = _skip_ws(masked, match.end())
+            if name not in _NOT_FUNCTION_NAMES and j < n and masked[j] == "(":
+                close = _match_close(masked, j, "(", ")")
+                if close == -1:
+                    break
+                body_open = _skip_ws(masked, close + 1)
+                if body_open < n and masked[body_open] != "{":
+                    body_open = _knr_body_open(masked, body_open)
+                if 0 <= body_open < n and masked[body_open] == "{":
+                    body_close = _match_close(masked, body_open, "{", "}")
+                    if body_close == -1:
+                        break
+                    start = _skip_ws(masked, boundary)
+                    functions.append(SourceFunction(
+                        name=name,
+                        start_line=code.count("\n", 0, i) + 1,
+                        end_line=code.count("\n", 0, body_close) + 1,
+                        start_offset=start,
+                        end_offset=body_close + 1,
+                    ))
+                    i = body_close + 1
+                    boundary = i
+                    continue
+                i = close + 1
+                continue
+            i = match.end()
+            continue
+        i += 1
+    return functions
+
+
+def function_source(code: str, function: SourceFunction) -> str:
+    return code[function.start_offset:function.end_offset]
+
+
+def source_skeleton(code: str, functions: List[SourceFunction]) -> str:
+    """`code` sem os corpos das funções: apenas globais, macros, tipos e protótipos."""
+    parts = []
+    last = 0
+    for fn in sorted(functions, key=lambda f: f.start_offset):
+        parts.append(code[last:fn.start_offset])
+        last = fn.end_offset
+    parts.append(code[last:])
+    return "".join(parts)
+
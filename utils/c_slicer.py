@@ -0,0 +1,271 @@
+"""Recorte do código C por função: apenas o contexto de que cada função depende."""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.c_functions import find_functions, function_source, mask_source
+from utils.models import SourceFunction
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\S")
+_CALL = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s*\(")
+_DEFINE = re.compile(r"#\s*define\s+([A-Za-z_][A-Za-z0-9_]*)")
+_INCLUDE = re.compile(r"#\s*include\b")
+
+_C_KEYWORDS = frozenset({
+    "auto", "break", "case", "char", "const", "continue", "default", "do", "double",
+    "else", "enum", "extern", "float", "for", "goto", "if", "int", "long", "register",
+    "return", "short", "signed", "sizeof", "static", "struct", "switch", "typedef",
+    "union", "unsigned", "void", "volatile", "while", "inline", "restrict",
+})
+
+
+@dataclass
+class _Unit:
+    """Declaração de nível global (diretiva, tipo, variável ou protótipo)."""
+    start: int
+    text: str
+    defines: Set[str] = field(default_factory=set)
+    uses: Set[str] = field(default_factory=set)
+    always: bool = False
+
+
+def _identifiers(masked_text: str) -> Set[str]:
+    return {tok for tok in _IDENTIFIER.findall(masked_text) if tok not in _C_KEYWORDS}
+
+
+def _skip_group(tokens: List[str], i: int) -> int:
+    """Índice logo após o fechamento do grupo aberto em `tokens[i]` ('(', '[' ou '{')."""
+    depth = 0
+    while i < len(tokens):
+        if tokens[i] in "([{":
+            depth += 1
+        elif tokens[i] in ")]}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _declared_names(masked_text: str) -> Set[str]:
+    """
+    Nomes declarados por uma declaração global: variáveis, funções (protótipos),
+    nomes de typedef, tags de struct/union/enum definidas e enumeradores.
+    Tipos usados na declaração e nomes de parâmetros não contam.
+    """
+    tokens = _TOKEN.findall(masked_text)
+    names: Set[str] = set()
+    candidate: Optional[str] = None
+    i, n = 0, len(tokens)
+    while i < n:
+        tok = tokens[i]
+        if tok in ("struct", "union", "enum"):
+            is_enum = tok == "enum"
+            j = i + 1
+            if j < n and _IDENTIFIER.fullmatch(tokens[j]):
+                if j + 1 < n and tokens[j + 1] == "{":
+                    names.add(tokens[j])
+                j += 1
+            if j < n and tokens[j] == "{":
+                end = _skip_group(tokens, j)
+                if is_enum:
+                    body = tokens[j + 1:end - 1]
+                    names.update(
+                        t for k, t in enumerate(body)
+                        if _IDENTIFIER.fullmatch(t) and (k == 0 or body[k - 1] == ",")
+                    )
+                j = end
+            i = j
+            candidate = None
+            continue
+        if tok == "{":
+            i = _skip_group(tokens, i)
+            candidate = None
+            continue
+        if tok == "(":
+            if candidate is not None:
+                # lista de parâmetros: o declarador é o identificador anterior
+                names.add(candidate)
+                candidate = None
+                i = _skip_group(tokens, i)
+                continue
+            i += 1  # parênteses de agrupamento, ex.: (*fp)
+            continue
+        if tok == "[":
+            if candidate is not None:
+                names.add(candidate)
+                candidate = None
+            i = _skip_group(tokens, i)
+            continue
+        if tok == "=":
+            if candidate is not None:
+                names.add(candidate)
+                candidate = None
+            # pula o inicializador até a próxima ',' ou ';' de nível 0
+            i += 1
+            while i < n and tokens[i] not in (",", ";"):
+                i = _skip_group(tokens, i) if tokens[i] in "([{" else i + 1
+            continue
+        if tok in (",", ";", ")"):
+            if candidate is not None and tok != ")":
+                names.add(candidate)
+                candidate = None
+            i += 1
+            continue
+        if _IDENTIFIER.fullmatch(tok) and tok not in _C_KEYWORDS:
+            candidate = tok
+        i += 1
+    if candidate is not None:
+        names.add(candidate)
+    return names
+
+
+class CodeSlicer:
+    """
+    Analisa um arquivo C uma única vez e monta, para cada função, um contexto
+    mínimo: os `#include`s, as macros/tipos/variáveis globais que ela referencia
+    (transitivamente), as assinaturas das funções que ela chama e o próprio
+    corpo, precedido de `#line` para preservar a numeração do arquivo original.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.masked = mask_source(code)
+        self.functions: Dict[str, SourceFunction] = {fn.name: fn for fn in find_functions(code)}
+        self.units: List[_Unit] = self._split_units()
+
+    def _split_units(self) -> List[_Unit]:
+        code, masked = self.code, self.masked
+        ranges = sorted((fn.start_offset, fn.end_offset) for fn in self.functions.values())
+        units: List[_Unit] = []
+
+        # Trechos fora das funções, divididos em diretivas e declarações terminadas em ';'.
+        gaps = []
+        last = 0
+        for start, end in ranges:
+            gaps.append((last, start))
+            last = end
+        gaps.append((last, len(code)))
+
+        for gap_start, gap_end in gaps:
+            pos = gap_start
+            decl_start = None
+            depth = 0
+            while pos < gap_end:
+                line_end = code.find("\n", pos, gap_end)
+                line_end = gap_end if line_end == -1 else line_end
+                stripped = code[pos:line_end].lstrip()
+                if decl_start is None and depth == 0 and stripped.startswith("#"):
+                    # diretiva (com continuações) como unidade própria
+                    end = line_end
+                    while end < gap_end and code[end - 1] == "\\":
+                        nxt = code.find("\n", end + 1, gap_end)
+                        end = gap_end if nxt == -1 else nxt
+                    units.append(self._directive_unit(pos, code[pos:end]))
+                    pos = end + 1
+                    continue
+                for k in range(pos, line_end):
+                    ch = masked[k]
+                    if ch.isspace():
+                        continue
+                    if decl_start is None:
+                        decl_start = k
+                    if ch == "{":
+                        depth += 1
+                    elif ch == "}":
+                        depth -= 1
+                    elif ch == ";" and depth == 0:
+                        units.append(self._declaration_unit(decl_start, k + 1))
+                        decl_start = None
+                pos = line_end + 1
+            if decl_start is not None:
+                units.append(self._declaration_unit(decl_start, gap_end))
+        units.sort(key=lambda u: u.start)
+        return units
+
+    def _directive_unit(self, start: int, text: str) -> _Unit:
+        if _INCLUDE.match(text.lstrip()):
+            return _Unit(start=start, text=text.strip(), always=True)
+        match = _DEFINE.match(text.lstrip())
+        if match:
+            body = mask_source(text.lstrip()[match.end():].replace("\\\n", " "))
+            return _Unit(start=start, text=text.strip(), defines={match.group(1)}, uses=_identifiers(body))
+        # #if/#else/#endif etc.: sem o código que envolviam, não acrescentam contexto
+        return _Unit(start=start, text="")
+
+    def _declaration_unit(self, start: int, end: int) -> _Unit:
+        masked = self.masked[start:end]
+        return _Unit(
+            start=start,
+            text=self.code[start:end].strip(),
+            defines=_declared_names(masked),
+            uses=_identifiers(masked),
+        )
+
+    def signature(self, name: str) -> Optional[str]:
+        """Cabeçalho da função `name` como protótipo (sem o corpo)."""
+        fn = self.functions.get(name)
+        if fn is None:
+            return None
+        body_open = self.masked.find("{", fn.start_offset, fn.end_offset)
+        header = self.code[fn.start_offset:body_open].rstrip()
+        return header + ";"
+
+    def slice(self, name: str) -> Optional[str]:
+        """Contexto mínimo para analisar `name`, ou None se a função não foi localizada."""
+        if name not in self.functions:
+            return None
+        return self.slice_many([name])
+
+    def slice_many(self, names: Iterable[str]) -> Optional[str]:
+        """
+        Contexto mínimo compartilhado por várias funções (na ordem do arquivo).
+        Funções não localizadas são ignoradas; retorna None se nenhuma for.
+        """
+        fns = sorted(
+            {self.functions[n].start_offset: self.functions[n] for n in names if n in self.functions}.values(),
+            key=lambda f: f.start_offset,
+        )
+        if not fns:
+            return None
+        own = {fn.name for fn in fns}
+        needed: Set[str] = set()
+        callees: Set[str] = set()
+        for fn in fns:
+            body_masked = self.masked[fn.start_offset:fn.end_offset]
+            needed |= _identifiers(body_masked)
+            callees.update(c for c in _CALL.findall(body_masked) if c in self.functions)
+        needed -= own
+        callees -= own
+
+        selected: Set[int] = set()
+        changed = True
+        while changed:
+            changed = False
+            for idx, unit in enumerate(self.units):
+                if idx in selected or not unit.text:
+                    continue
+                if unit.always or unit.defines & needed:
+                    selected.add(idx)
+                    needed |= unit.uses - own
+                    changed = True
+
+        parts: List[str] = [self.units[idx].text for idx in sorted(selected)]
+        declared: Set[str] = set()
+        for idx in selected:
+            declared |= self.units[idx].defines
+        # assinaturas apenas de funções chamadas que ainda não têm protótipo no recorte
+        signatures = [
+            sig for sig in (self.signature(c) for c in sorted(callees - declared)) if sig
+        ]
+        if signatures:
+            parts.append("\n".join(signatures))
+        for fn in fns:
+            start_line = self.code.count("\n", 0, fn.start_offset) + 1
+            parts.append(f"#line {start_line}\n" + function_source(self.code, fn))
+        return "\n\n".join(parts) + "\n"
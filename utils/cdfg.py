@@ -0,0 +1,615 @@
+"""
+Leitura local de CDFGs em Graphviz DOT e modelo de grafo compacto em memória.
+
+A LLM devolve o CDFG como texto (prosa + bloco ```dot```). Este módulo
+localiza os blocos `digraph` com um tokenizador DOT (chaves dentro de strings
+e comentários não contam), faz o parse e congela o resultado em um `CDFG`:
+nós com ids inteiros na ordem de aparição, adjacência em formato CSR
+(`array('i')`) e as anotações def/c-use/p-use lidas dos `xlabel`s pedidos em
+`prompts/generate_cdfg.md`. Etapas posteriores consultam o grafo em vez de
+reprocessar o texto.
+"""
+
+import logging
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(
+    r"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?(?:\*/|\Z)|\#[^\n]*)
+    |(?P<string>"(?:[^"\\]|\\.)*")
+    |(?P<html><(?:[^<>]|<[^<>]*>)*>)
+    |(?P<arrow>->|--)
+    |(?P<id>-?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)|[A-Za-z_\u0080-\uffff][A-Za-z0-9_\u0080-\uffff]*)
+    |(?P<punct>[{}\[\];,=:+])
+    |(?P<other>.)
+    """,
+    re.S | re.X,
+)
+
+# Dentro de um bloco só importam as chaves: strings, HTML e comentários são
+# pulados inteiros (chaves neles não contam); o resto nem vira token.
+_BLOCK_TOKEN = re.compile(
+    r"""
+    (?P<skip>//[^\n]*|/\*.*?(?:\*/|\Z)|\#[^\n]*|"(?:[^"\\]|\\.)*"|<(?:[^<>]|<[^<>]*>)*>)
+    |(?P<punct>[{}])
+    |(?P<other>["<])
+    """,
+    re.S | re.X,
+)
+
+_DIGRAPH_KEYWORD = re.compile(r"\b(?:strict\s+)?digraph\b", re.I)
+# Cauda do texto mantida entre pedaços quando não há bloco aberto (a palavra-chave pode estar partida).
+_KEYWORD_TAIL = 64
+# Blocos maiores que isso na leitura em fluxo são descartados (memória constante).
+DEFAULT_MAX_BLOCK_CHARS = 16 * 1024 * 1024
+DEFAULT_CHUNK_CHARS = 1024 * 1024
+
+# Anotações de fluxo de dados nos xlabels: "Def: a, b\nC-Use: x\nP-Use: y".
+_ANNOTATION = re.compile(
+    r"\b(defs?|definitions?|c[-_ ]?uses?|p[-_ ]?uses?)\s*[:=]\s*"
+    r"(.*?)(?=\b(?:defs?|definitions?|c[-_ ]?uses?|p[-_ ]?uses?)\s*[:=]|$)",
+    re.I,
+)
+_ANNOTATION_BREAK = re.compile(r"\\[nlr]|[\r\n;|]")
+_EMPTY_VARIABLE = frozenset({"", "-", "none", "nenhum", "nenhuma", "n/a", "\u2205", "{}"})
+
+DEF = 0
+C_USE = 1
+P_USE = 2
+
+_TRUE_LABELS = frozenset({"true", "t", "yes", "sim", "verdadeiro", "v"})
+_FALSE_LABELS = frozenset({"false", "f", "no", "não", "nao", "falso"})
+
+
+class DotSyntaxError(ValueError):
+    """Bloco DOT que não pôde ser interpretado."""
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+class DigraphBlock(NamedTuple):
+    """Trecho `digraph ... { ... }` localizado em um texto (offsets 0-based, `end` exclusivo)."""
+    name: Optional[str]
+    start: int
+    end: int
+    text: str
+
+
+def tokenize_dot(text: str, pos: int = 0) -> Iterator[Token]:
+    """Tokens DOT de `text` a partir de `pos`, sem espaços e comentários."""
+    for m in _TOKEN.finditer(text, pos):
+        kind = m.lastgroup
+        if kind == "skip":
+            continue
+        yield Token(kind, m.group(), m.start(), m.end())
+
+
+def _unquote(token: Token) -> str:
+    if token.kind == "string":
+        # em DOT só \" é escape; \n, \l etc. ficam para quem interpreta o rótulo
+        return token.text[1:-1].replace('\\"', '"').replace("\\\r\n", "").replace("\\\n", "")
+    if token.kind == "html":
+        return token.text[1:-1]
+    return token.text
+
+
+def find_digraphs(text: str) -> List[DigraphBlock]:
+    """
+    Todos os blocos `digraph [nome] { ... }` de `text`, na ordem em que aparecem.
+
+    Uma ocorrência da palavra "digraph" que não seja seguida de um nome
+    opcional e de `{` (prosa, por exemplo) é ignorada, assim como blocos que
+    não fecham as chaves (saída truncada).
+    """
+    blocks: List[DigraphBlock] = []
+    offset = 0
+    while True:
+        m = _DIGRAPH_KEYWORD.search(text, offset)
+        if m is None:
+            break
+        offset = m.end()
+        tokens = tokenize_dot(text, m.end())
+        first = next(tokens, None)
+        name = None
+        if first is not None and first.kind in ("id", "string", "html"):
+            name = _unquote(first)
+            first = next(tokens, None)
+        if first is None or first.text != "{":
+            continue
+
+        depth = 1
+        end = None
+        for token in _BLOCK_TOKEN.finditer(text, first.end):
+            if token.lastgroup != "punct":
+                continue
+            if token.group() == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    end = token.end()
+                    break
+        if end is None:
+            logger.debug("Bloco digraph sem fechamento na posição %d; ignorando", m.start())
+            offset = first.end
+            continue
+        blocks.append(DigraphBlock(name, m.start(), end, text[m.start():end]))
+        offset = end
+    return blocks
+
+
+def iter_digraphs(chunks: Iterable[str], max_block_chars: int = DEFAULT_MAX_BLOCK_CHARS) -> Iterator[DigraphBlock]:
+    """
+    Versão em fluxo de `find_digraphs`: consome o texto em pedaços e devolve
+    os blocos à medida que fecham, em uma única passada. Só o bloco em
+    andamento (ou uma cauda curta, fora de blocos) fica em memória, de modo
+    que transcrições de centenas de MB são lidas com memória constante.
+
+    Um token que encosta no fim do pedaço (ou uma string/HTML sem
+    fechamento) pode estar partido: a tokenização recomeça dele quando o
+    próximo pedaço chega. Blocos maiores que `max_block_chars` são
+    descartados como truncados. Os offsets são relativos ao texto inteiro.
+    """
+    buf = ""
+    base = 0         # offset, no texto inteiro, de buf[0]
+    pos = 0          # onde a varredura continua em buf
+    stage = 0        # 0: procurando "digraph"; 1: nome e "{"; 2: dentro do bloco
+    start = kw_end = brace_end = depth = 0
+    name: Optional[str] = None
+    named = False
+    chunks = iter(chunks)
+    eof = False
+    while not eof:
+        chunk = next(chunks, None)
+        eof = chunk is None
+        if not eof:
+            # descarta o que já foi consumido antes de anexar o novo pedaço
+            cut = start if stage else pos
+            if cut:
+                buf = buf[cut:]
+                base += cut
+                pos -= cut
+                start -= cut
+                kw_end -= cut
+                brace_end -= cut
+            buf += chunk
+        while True:
+            if stage == 0:
+                m = _DIGRAPH_KEYWORD.search(buf, pos)
+                if m is None or (not eof and m.end() == len(buf)):
+                    pos = m.start() if m is not None else max(pos, len(buf) - _KEYWORD_TAIL)
+                    break
+                start, kw_end, pos, stage, name, named = m.start(), m.end(), m.end(), 1, None, False
+                continue
+
+            if not eof and len(buf) - start > max_block_chars:
+                logger.warning("Bloco digraph na posição %d excede %d caracteres; ignorando", base + start, max_block_chars)
+                pos, stage = (brace_end if stage == 2 else kw_end), 0
+                continue
+
+            # cabeçalho com o tokenizador completo; corpo só com o que afeta as chaves
+            pattern = _TOKEN if stage == 1 else _BLOCK_TOKEN
+            limit = len(buf)
+            moved = False
+            for m in pattern.finditer(buf, pos):
+                kind = m.lastgroup
+                end = m.end()
+                if not eof and (end == limit or (kind == "other" and m.group() in '"<')):
+                    break  # token possivelmente partido: espera o próximo pedaço
+                pos = end
+                if kind == "skip":
+                    continue
+                text = m.group()
+                if stage == 1:
+                    if text == "{":
+                        stage, depth, brace_end = 2, 1, end
+                    elif not named and kind in ("id", "string", "html"):
+                        name, named = _unquote(Token(kind, text, m.start(), end)), True
+                        continue
+                    else:
+                        pos, stage = kw_end, 0
+                    moved = True
+                    break
+                if text == "{":
+                    depth += 1
+                elif text == "}":
+                    depth -= 1
+                    if depth == 0:
+                        yield DigraphBlock(name, base + start, base + end, buf[start:end])
+                        stage = 0
+                        moved = True
+                        break
+            if moved:
+                continue
+            if not eof:
+                break
+            # fim do texto com o bloco aberto: mesma regra de `find_digraphs`
+            if stage == 2:
+                logger.debug("Bloco digraph sem fechamento na posição %d; ignorando", base + start)
+            pos, stage = (brace_end if stage == 2 else kw_end), 0
+
+
+def read_chunks(path: str, chunk_chars: int = DEFAULT_CHUNK_CHARS, encoding: str = "utf-8") -> Iterator[str]:
+    """Lê um arquivo texto em pedaços de `chunk_chars` caracteres (bytes inválidos são ignorados)."""
+    with open(path, "r", encoding=encoding, errors="ignore") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _split_variables(text: str) -> List[str]:
+    names = []
+    for part in text.split(","):
+        part = part.strip().strip("{}").strip()
+        if part.lower() not in _EMPTY_VARIABLE:
+            names.append(part)
+    return names
+
+
+def parse_annotations(text: str) -> Tuple[List[str], List[str], List[str]]:
+    """(defs, c-uses, p-uses) declarados em um rótulo como `Def: a, b\\nC-Use: x\\nP-Use: y`."""
+    found: Tuple[List[str], List[str], List[str]] = ([], [], [])
+    for segment in _ANNOTATION_BREAK.split(text):
+        for m in _ANNOTATION.finditer(segment):
+            key = m.group(1).lower()
+            kind = DEF if key.startswith("def") else C_USE if key.startswith("c") else P_USE
+            for name in _split_variables(m.group(2)):
+                if name not in found[kind]:
+                    found[kind].append(name)
+    return found
+
+
+class CDFG:
+    """
+    Grafo de controle e dados imutável, com ids de nó inteiros (0..n-1, na
+    ordem de aparição no DOT) e arestas numeradas na ordem de declaração.
+
+    Adjacência em CSR: as arestas que saem do nó `v` são
+    `_out_edges[_out_offsets[v]:_out_offsets[v + 1]]` (idem para entrada).
+    Variáveis são internadas em `variables`; as anotações def/c-use/p-use de
+    cada nó também ficam em CSR, como índices de `variables`.
+    """
+
+    __slots__ = (
+        "name",
+        "nodes",
+        "labels",
+        "shapes",
+        "variables",
+        "edge_src",
+        "edge_dst",
+        "edge_labels",
+        "_index",
+        "_out_offsets",
+        "_out_edges",
+        "_in_offsets",
+        "_in_edges",
+        "_annotations",
+    )
+
+    def __init__(
+        self,
+        name: Optional[str],
+        nodes: Sequence[str],
+        labels: Sequence[Optional[str]],
+        shapes: Sequence[Optional[str]],
+        edges: Sequence[Tuple[int, int, Optional[str]]],
+        annotations: Sequence[Tuple[Sequence[str], Sequence[str], Sequence[str]]],
+    ):
+        n = len(nodes)
+        self.name = name
+        self.nodes: Tuple[str, ...] = tuple(nodes)
+        self.labels: Tuple[Optional[str], ...] = tuple(labels)
+        self.shapes: Tuple[Optional[str], ...] = tuple(shapes)
+        self._index: Dict[str, int] = {node: i for i, node in enumerate(self.nodes)}
+        self.edge_src = array("i", (e[0] for e in edges))
+        self.edge_dst = array("i", (e[1] for e in edges))
+        self.edge_labels: Tuple[Optional[str], ...] = tuple(e[2] for e in edges)
+        self._out_offsets, self._out_edges = _csr(n, self.edge_src)
+        self._in_offsets, self._in_edges = _csr(n, self.edge_dst)
+
+        variables: Dict[str, int] = {}
+        per_kind = []
+        for kind in (DEF, C_USE, P_USE):
+            rows = [[variables.setdefault(var, len(variables)) for var in ann[kind]] for ann in annotations]
+            offsets = array("i", [0])
+            ids = array("i")
+            for row in rows:
+                ids.extend(row)
+                offsets.append(len(ids))
+            per_kind.append((offsets, ids))
+        self.variables: Tuple[str, ...] = tuple(variables)
+        self._annotations = tuple(per_kind)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __repr__(self) -> str:
+        return f"CDFG({self.name!r}, nodes={len(self.nodes)}, edges={len(self.edge_src)})"
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def node_id(self, name: str) -> Optional[int]:
+        return self._index.get(name)
+
+    def out_edges(self, node: int) -> array:
+        return self._out_edges[self._out_offsets[node]:self._out_offsets[node + 1]]
+
+    def in_edges(self, node: int) -> array:
+        return self._in_edges[self._in_offsets[node]:self._in_offsets[node + 1]]
+
+    def successors(self, node: int) -> List[int]:
+        return [self.edge_dst[e] for e in self.out_edges(node)]
+
+    def predecessors(self, node: int) -> List[int]:
+        return [self.edge_src[e] for e in self.in_edges(node)]
+
+    def out_degree(self, node: int) -> int:
+        return self._out_offsets[node + 1] - self._out_offsets[node]
+
+    def in_degree(self, node: int) -> int:
+        return self._in_offsets[node + 1] - self._in_offsets[node]
+
+    @property
+    def entry(self) -> Optional[int]:
+        """Primeiro nó sem predecessores (ou o primeiro nó, se todos tiverem)."""
+        if not self.nodes:
+            return None
+        for node in range(len(self.nodes)):
+            if self.in_degree(node) == 0:
+                return node
+        return 0
+
+    @property
+    def exits(self) -> List[int]:
+        """Nós finais: `doublecircle` ou sem sucessores."""
+        return [
+            node for node in range(len(self.nodes))
+            if self.shapes[node] == "doublecircle" or self.out_degree(node) == 0
+        ]
+
+    def is_decision(self, node: int) -> bool:
+        return self.out_degree(node) > 1 or self.shapes[node] == "diamond"
+
+    def edge_branch(self, edge: int) -> Optional[bool]:
+        """True/False para arestas rotuladas como ramo verdadeiro/falso; None caso contrário."""
+        label = self.edge_labels[edge]
+        if not label:
+            return None
+        word = re.split(r"\\[nlr]|[\s(:,]", label.strip(), maxsplit=1)[0].lower()
+        if word in _TRUE_LABELS:
+            return True
+        if word in _FALSE_LABELS:
+            return False
+        return None
+
+    def _variables_of(self, kind: int, node: int) -> Tuple[str, ...]:
+        offsets, ids = self._annotations[kind]
+        return tuple(self.variables[i] for i in ids[offsets[node]:offsets[node + 1]])
+
+    def defs(self, node: int) -> Tuple[str, ...]:
+        return self._variables_of(DEF, node)
+
+    def c_uses(self, node: int) -> Tuple[str, ...]:
+        return self._variables_of(C_USE, node)
+
+    def p_uses(self, node: int) -> Tuple[str, ...]:
+        return self._variables_of(P_USE, node)
+
+    def nodes_defining(self, variable: str) -> List[int]:
+        return [node for node in range(len(self.nodes)) if variable in self.defs(node)]
+
+
+def _csr(n: int, keys: array) -> Tuple[array, array]:
+    """Offsets e ids de aresta agrupados por `keys` (ordenação por contagem, estável)."""
+    offsets = array("i", [0]) * (n + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array("i", offsets)
+    ordered = array("i", [0]) * len(keys)
+    for edge, key in enumerate(keys):
+        ordered[cursor[key]] = edge
+        cursor[key] += 1
+    return offsets, ordered
+
+
+class _Parser:
+    """Parser recursivo da gramática DOT (subconjunto usado por CDFGs, incluindo subgraphs)."""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+        self.nodes: Dict[str, Dict[str, str]] = {}
+        self.edges: List[Tuple[str, str, Dict[str, str]]] = []
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise DotSyntaxError("fim inesperado do bloco DOT")
+        self.pos += 1
+        return token
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token is not None and token.kind in ("punct", "arrow") and token.text == text:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        if not self.accept(text):
+            token = self.peek()
+            found = "fim do bloco" if token is None else repr(token.text)
+            raise DotSyntaxError(f"esperado {text!r}, encontrado {found}")
+
+    def keyword(self, *words: str) -> Optional[str]:
+        token = self.peek()
+        if token is not None and token.kind == "id" and token.text.lower() in words:
+            return token.text.lower()
+        return None
+
+    def value(self) -> str:
+        token = self.next()
+        if token.kind not in ("id", "string", "html"):
+            raise DotSyntaxError(f"identificador esperado, encontrado {token.text!r}")
+        text = _unquote(token)
+        while token.kind == "string" and self.accept("+"):
+            token = self.next()
+            text += _unquote(token)
+        return text
+
+    def graph(self) -> Optional[str]:
+        if self.keyword("strict"):
+            self.pos += 1
+        if not self.keyword("digraph", "graph"):
+            raise DotSyntaxError("o bloco não começa com 'digraph'")
+        self.pos += 1
+        name = None
+        if not self.accept("{"):
+            name = self.value()
+            self.expect("{")
+        self.stmt_list({}, {})
+        return name
+
+    def attr_list(self) -> Dict[str, str]:
+        attrs: Dict[str, str] = {}
+        while self.accept("["):
+            while not self.accept("]"):
+                key = self.value()
+                attrs[key] = self.value() if self.accept("=") else "true"
+                if not self.accept(","):
+                    self.accept(";")
+        return attrs
+
+    def stmt_list(self, node_defaults: Dict[str, str], edge_defaults: Dict[str, str]) -> List[str]:
+        """Consome comandos até `}`; retorna os nós mencionados (para subgraphs usados em arestas)."""
+        node_defaults = dict(node_defaults)
+        edge_defaults = dict(edge_defaults)
+        mentioned: List[str] = []
+        while not self.accept("}"):
+            if self.accept(";") or self.accept(","):
+                continue
+            kw = self.keyword("node", "edge", "graph")
+            if kw is not None and (self.peek(1) is None or self.peek(1).text == "["):
+                self.pos += 1
+                attrs = self.attr_list()
+                if kw == "node":
+                    node_defaults.update(attrs)
+                elif kw == "edge":
+                    edge_defaults.update(attrs)
+                continue
+            token = self.peek()
+            if token is None:
+                raise DotSyntaxError("bloco DOT sem '}' final")
+            if token.kind in ("id", "string") and self.peek(1) is not None and self.peek(1).text == "=":
+                self.pos += 2
+                self.value()  # atributo do grafo (rankdir=TB etc.)
+                continue
+            operands = [self.operand(node_defaults, edge_defaults)]
+            while self.accept("->") or self.accept("--"):
+                operands.append(self.operand(node_defaults, edge_defaults))
+            attrs = self.attr_list()
+            if len(operands) == 1:
+                for node in operands[0]:
+                    self.nodes[node].update(attrs)
+            else:
+                edge_attrs = dict(edge_defaults)
+                edge_attrs.update(attrs)
+                for left, right in zip(operands, operands[1:]):
+                    for src in left:
+                        for dst in right:
+                            self.edges.append((src, dst, edge_attrs))
+            for group in operands:
+                mentioned.extend(group)
+        return mentioned
+
+    def operand(self, node_defaults: Dict[str, str], edge_defaults: Dict[str, str]) -> List[str]:
+        if self.keyword("subgraph") or (self.peek() is not None and self.peek().text == "{"):
+            if self.keyword("subgraph"):
+                self.pos += 1
+                if not (self.peek() is not None and self.peek().text == "{"):
+                    self.value()
+            self.expect("{")
+            return list(dict.fromkeys(self.stmt_list(node_defaults, edge_defaults)))
+        node = self.value()
+        # porta (a:p ou a:p:sw) não altera a topologia
+        while self.accept(":"):
+            self.value()
+        if node not in self.nodes:
+            self.nodes[node] = dict(node_defaults)
+        return [node]
+
+
+def parse_dot(text: str) -> CDFG:
+    """
+    Interpreta um bloco `digraph` (o primeiro de `text`, se houver prosa em
+    volta) e devolve o `CDFG` correspondente. Levanta `DotSyntaxError` se
+    não houver digraph ou se o bloco for inválido.
+    """
+    blocks = find_digraphs(text)
+    if not blocks:
+        raise DotSyntaxError("nenhum bloco digraph encontrado")
+    return _build(blocks[0].text)
+
+
+def _build(block: str) -> CDFG:
+    parser = _Parser(list(tokenize_dot(block)))
+    name = parser.graph()
+
+    nodes = list(parser.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    labels, shapes, annotations = [], [], []
+    for node in nodes:
+        attrs = parser.nodes[node]
+        labels.append(attrs.get("label"))
+        shapes.append(attrs.get("shape"))
+        # anotações no xlabel (formato do prompt) ou, na falta dele, no label
+        annotations.append(parse_annotations(attrs.get("xlabel") or attrs.get("label") or ""))
+    edges = [(index[src], index[dst], attrs.get("label")) for src, dst, attrs in parser.edges]
+    return CDFG(name, nodes, labels, shapes, edges, annotations)
+
+
+def parse_cdfg(text: Optional[str], function: Optional[str] = None) -> Optional[CDFG]:
+    """
+    CDFG contido na resposta da LLM, ou None se não houver um digraph válido.
+
+    Com vários blocos, prefere o que tem o nome da função (sem diferenciar
+    maiúsculas); senão usa o primeiro que puder ser interpretado e tiver nós.
+    """
+    if not text:
+        return None
+    blocks = find_digraphs(text)
+    if function:
+        wanted = function.lower()
+        blocks.sort(key=lambda b: (b.name or "").lower() != wanted)
+    empty = None
+    for block in blocks:
+        try:
+            graph = _build(block.text)
+        except DotSyntaxError as e:
+            logger.debug("Digraph %s inválido: %s", block.name, e)
+            continue
+        if len(graph):
+            return graph
+        # esqueleto vazio (ex.: "digraph FunctionName { }" copiado do enunciado)
+        empty = empty or graph
+    return empty
@@ -0,0 +1,239 @@
+"""
+Enumeração local de caminhos candidatos sobre um `CDFG` já interpretado.
+
+Em vez de pedir à LLM que liste todos os caminhos do grafo (lento, caro em
+tokens de saída e explosivo em funções de CCN alto), os caminhos são
+enumerados aqui e só a lista compacta vai para o prompt. Modos:
+
+- "paths": caminhos da entrada até um nó final, com cada nó visitado no
+  máximo `loop_bound + 1` vezes (cada laço é desenrolado até `loop_bound`
+  iterações);
+- "prime": caminhos primos (caminhos simples maximais e ciclos simples),
+  o critério de cobertura de caminhos primos;
+- "edge-pair": todos os pares de arestas consecutivas (caminhos de até 2 arestas).
+
+Todos os modos param em `max_paths` caminhos (lista marcada como truncada)
+e em um limite de passos da busca, para não travar em grafos enormes.
+"""
+
+import logging
+from array import array
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.cdfg import CDFG
+
+logger = logging.getLogger(__name__)
+
+PATH_MODES = ("paths", "prime", "edge-pair")
+
+DEFAULT_LOOP_BOUND = 1
+DEFAULT_MAX_PATHS = 100
+# Passos da busca em profundidade por função (extensões de caminho tentadas).
+MAX_SEARCH_STEPS = 200_000
+
+
+class PathSet(NamedTuple):
+    """Caminhos candidatos de uma função, como sequências de ids de nó do `CDFG`."""
+    mode: str
+    paths: List[Tuple[int, ...]]
+    truncated: bool
+    loop_bound: Optional[int] = None
+    # caminhos enumerados antes de um filtro (ex.: só os indecisos do pré-filtro); None = len(paths)
+    enumerated: Optional[int] = None
+
+    @property
+    def total(self) -> int:
+        """Quantos caminhos a enumeração produziu (o limite, se ela foi truncada)."""
+        return len(self.paths) if self.enumerated is None else self.enumerated
+
+
+def _unique_successors(graph: CDFG) -> List[Tuple[int, ...]]:
+    # arestas paralelas (True/False para o mesmo nó) geram a mesma sequência de nós
+    return [tuple(dict.fromkeys(graph.successors(v))) for v in range(len(graph))]
+
+
+def _unique_predecessors(graph: CDFG) -> List[Tuple[int, ...]]:
+    return [tuple(dict.fromkeys(graph.predecessors(v))) for v in range(len(graph))]
+
+
+def _reaching(graph: CDFG, targets: Sequence[int]) -> bytearray:
+    """Marca os nós a partir dos quais algum nó de `targets` é alcançável."""
+    seen = bytearray(len(graph))
+    stack = list(targets)
+    for v in stack:
+        seen[v] = 1
+    while stack:
+        v = stack.pop()
+        for u in graph.predecessors(v):
+            if not seen[u]:
+                seen[u] = 1
+                stack.append(u)
+    return seen
+
+
+def entry_exit_paths(
+    graph: CDFG,
+    loop_bound: int = DEFAULT_LOOP_BOUND,
+    max_paths: int = DEFAULT_MAX_PATHS,
+    max_steps: int = MAX_SEARCH_STEPS,
+) -> PathSet:
+    """Caminhos entrada -> nó final com cada nó repetido no máximo `loop_bound + 1` vezes."""
+    entry = graph.entry
+    exits = graph.exits
+    if entry is None or not exits:
+        return PathSet("paths", [], False, loop_bound)
+    is_exit = bytearray(len(graph))
+    for v in exits:
+        is_exit[v] = 1
+    alive = _reaching(graph, exits)
+    if not alive[entry]:
+        return PathSet("paths", [], False, loop_bound)
+    # só segue por nós que ainda podem chegar a um nó final
+    succ = [tuple(w for w in ws if alive[w]) for ws in _unique_successors(graph)]
+    limit = max(0, loop_bound) + 1
+
+    paths: List[Tuple[int, ...]] = []
+    if is_exit[entry]:
+        return PathSet("paths", [(entry,)], False, loop_bound)
+    visits = array("i", [0]) * len(graph)
+    visits[entry] = 1
+    path = [entry]
+    stack = [iter(succ[entry])]
+    steps = 0
+    while stack:
+        nxt = next(stack[-1], None)
+        if nxt is None:
+            stack.pop()
+            visits[path.pop()] -= 1
+            continue
+        steps += 1
+        if steps > max_steps:
+            return PathSet("paths", paths, True, loop_bound)
+        if visits[nxt] >= limit:
+            continue
+        if is_exit[nxt]:
+            if len(paths) == max_paths:
+                return PathSet("paths", paths, True, loop_bound)
+            paths.append(tuple(path) + (nxt,))
+            continue
+        path.append(nxt)
+        visits[nxt] += 1
+        stack.append(iter(succ[nxt]))
+    return PathSet("paths", paths, False, loop_bound)
+
+
+def prime_paths(
+    graph: CDFG,
+    max_paths: int = DEFAULT_MAX_PATHS,
+    max_steps: int = MAX_SEARCH_STEPS,
+) -> PathSet:
+    """
+    Caminhos primos: caminhos simples que não são subcaminho de outro caminho
+    simples, e ciclos simples. Cada ciclo é listado uma única vez, a partir do
+    seu nó de menor id (as rotações são equivalentes para a análise).
+    """
+    succ = _unique_successors(graph)
+    pred = _unique_predecessors(graph)
+    paths: List[Tuple[int, ...]] = []
+    steps = 0
+    on_path = bytearray(len(graph))
+
+    for start in range(len(graph)):
+        path = [start]
+        on_path[start] = 1
+        stack = [iter(succ[start])]
+        # o início do caminho não pode ser estendido para trás (senão não é maximal)
+        candidate = True
+        while stack:
+            last = path[-1]
+            if candidate:
+                candidate = False
+                forward_blocked = all(on_path[w] and w != start for w in succ[last])
+                backward_blocked = all(on_path[u] and u != last for u in pred[start])
+                if forward_blocked and backward_blocked:
+                    if len(paths) == max_paths:
+                        return PathSet("prime", paths, True)
+                    paths.append(tuple(path))
+            nxt = next(stack[-1], None)
+            if nxt is None:
+                stack.pop()
+                on_path[path.pop()] = 0
+                continue
+            steps += 1
+            if steps > max_steps:
+                return PathSet("prime", paths, True)
+            if nxt == start:
+                if min(path) == start:
+                    if len(paths) == max_paths:
+                        return PathSet("prime", paths, True)
+                    paths.append(tuple(path) + (start,))
+                continue
+            if on_path[nxt]:
+                continue
+            path.append(nxt)
+            on_path[nxt] = 1
+            stack.append(iter(succ[nxt]))
+            candidate = True
+    return PathSet("prime", paths, False)
+
+
+def edge_pairs(graph: CDFG, max_paths: int = DEFAULT_MAX_PATHS) -> PathSet:
+    """Requisitos da cobertura de pares de arestas: todos os caminhos de até 2 arestas."""
+    succ = _unique_successors(graph)
+    pred = _unique_predecessors(graph)
+    paths: List[Tuple[int, ...]] = []
+    for v in range(len(graph)):
+        if pred[v] and succ[v]:
+            candidates = [(u, v, w) for u in pred[v] for w in succ[v]]
+        elif not pred[v]:
+            # arestas que não fazem parte de nenhum par (e nós isolados)
+            candidates = [(v, w) for w in succ[v] if not succ[w]] or ([(v,)] if not succ[v] else [])
+        else:
+            candidates = []
+        for candidate in candidates:
+            if len(paths) == max_paths:
+                return PathSet("edge-pair", paths, True)
+            paths.append(candidate)
+    return PathSet("edge-pair", paths, False)
+
+
+def format_paths(graph: CDFG, path_set: PathSet) -> str:
+    """Lista compacta para o prompt: uma linha `P<n>: A → B → C` por caminho, com os nomes de nó do DOT."""
+    nodes = graph.nodes
+    return "\n".join(
+        f"P{number}: " + " → ".join(nodes[v] for v in path)
+        for number, path in enumerate(path_set.paths, start=1)
+    )
+
+
+def describe_paths(path_set: PathSet) -> str:
+    """Descrição (em inglês, como os prompts) do critério que gerou a lista."""
+    if path_set.mode == "prime":
+        text = "prime paths (maximal simple paths and simple cycles; each cycle listed once)"
+    elif path_set.mode == "edge-pair":
+        text = "edge pairs (every sub-path of up to two consecutive edges)"
+    else:
+        text = f"entry-to-exit paths, each loop unrolled at most {path_set.loop_bound} time(s)"
+    if path_set.total != len(path_set.paths):
+        text += f"; only {len(path_set.paths)} of the {path_set.total} enumerated paths are listed (the others were decided locally)"
+    if path_set.truncated:
+        text += f"; the enumeration was truncated at {path_set.total} paths, so it is not exhaustive"
+    return text
+
+
+class PathEnumerator:
+    """Configuração da enumeração de caminhos usada pelo pipeline (um modo de `PATH_MODES`)."""
+
+    def __init__(self, mode: str = "paths", loop_bound: int = DEFAULT_LOOP_BOUND, max_paths: int = DEFAULT_MAX_PATHS):
+        if mode not in PATH_MODES:
+            raise ValueError(f"Modo de caminhos inválido: {mode!r} (use um de {', '.join(PATH_MODES)})")
+        self.mode = mode
+        self.loop_bound = max(0, int(loop_bound))
+        self.max_paths = max(1, int(max_paths))
+
+    def enumerate(self, graph: CDFG) -> PathSet:
+        if self.mode == "prime":
+            return prime_paths(graph, self.max_paths)
+        if self.mode == "edge-pair":
+            return edge_pairs(graph, self.max_paths)
+        return entry_exit_paths(graph, self.loop_bound, self.max_paths)
@@ -1,12 +1,28 @@
+import argparse
+import hashlib
+import json
 import os
+import sys
 import unicodedata
 import subprocess
 import shutil
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from utils.file_utils import write_atomic
+except ImportError:  # executado como script de dentro de utils/
+    from file_utils import write_atomic
 
 # Logger do módulo
 logger = logging.getLogger(__name__)
 
+# Diretórios nunca percorridos por padrão: o repositório git e as saídas do pipeline.
+DEFAULT_EXCLUDES = (".git", "output", "__pycache__")
+# Índice (por raiz) com o hash de cada .dot cujo .svg já foi gerado.
+INDEX_FILE = ".convert_svg_index.json"
+
 
 def remover_acentos(texto: str) -> str:
     """
@@ -26,11 +42,138 @@ def remover_acentos(texto: str) -> str:
     # Filtra e remove todas as marcas de combinação (acentos).
     return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
 
-def processar_arquivos_dot():
+
+def _excluido(caminho: str, nome: str, excluir: Sequence[str]) -> bool:
+    """Um diretório é excluído pelo nome (ex.: "output") ou pelo caminho (ex.: "codes/antigos")."""
+    absoluto = os.path.abspath(caminho)
+    for item in excluir:
+        if os.sep in item or "/" in item:
+            if absoluto == os.path.abspath(item):
+                return True
+        elif nome == item:
+            return True
+    return False
+
+
+def encontrar_arquivos_dot(raiz: str, excluir: Sequence[str] = DEFAULT_EXCLUDES) -> Iterator[str]:
+    """Percorre `raiz` em busca de arquivos .dot, sem descer nos diretórios excluídos."""
+    for dirpath, dirnames, filenames in os.walk(raiz):
+        dirnames[:] = sorted(d for d in dirnames if not _excluido(os.path.join(dirpath, d), d, excluir))
+        for nome_arquivo in sorted(filenames):
+            if nome_arquivo.endswith('.dot'):
+                yield os.path.join(dirpath, nome_arquivo)
+
+
+def caminho_svg(caminho_arquivo_dot: str) -> str:
+    return os.path.splitext(caminho_arquivo_dot)[0] + ".svg"
+
+
+def preparar_dot(caminho_arquivo_dot: str) -> Tuple[str, Optional[str], bool]:
+    """
+    Remove os acentos de um .dot, regravando-o apenas se o conteúdo mudou.
+
+    Returns:
+        (caminho, sha256 do conteúdo sem acentos ou None em caso de erro, se o arquivo foi regravado)
+    """
+    try:
+        with open(caminho_arquivo_dot, 'r', encoding='utf-8') as f:
+            conteudo = f.read()
+        conteudo_sem_acentos = remover_acentos(conteudo)
+        alterado = conteudo_sem_acentos != conteudo
+        if alterado:
+            write_atomic(caminho_arquivo_dot, conteudo_sem_acentos)
+        return caminho_arquivo_dot, hashlib.sha256(conteudo_sem_acentos.encode('utf-8')).hexdigest(), alterado
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error("Falha ao ler/gravar %s: %s", caminho_arquivo_dot, e)
+        return caminho_arquivo_dot, None, False
+
+
+def renderizar_lote(caminhos: List[str]) -> List[Tuple[str, bool, str]]:
+    """
+    Gera os .svg de um lote de .dot numa única invocação do `dot` (`-O` grava
+    `<arquivo>.dot.svg` ao lado de cada entrada, renomeado para `<arquivo>.svg`).
+    Se o lote falhar, cada arquivo é renderizado sozinho para isolar o defeituoso;
+    erros ao executar o `dot` (OSError) viram falhas na lista, sem exceção.
+
+    Returns:
+        Lista de (caminho do .dot, sucesso, stderr).
+    """
+    if len(caminhos) > 1:
+        comando = ["dot", "-Tsvg", "-O", *caminhos]
+        try:
+            resultado = subprocess.run(comando, capture_output=True, text=True, encoding='utf-8')
+        except OSError as e:
+            logger.warning("Falha ao executar o dot para um lote de %d arquivos: %s", len(caminhos), e)
+            resultado = None
+        if resultado is not None and resultado.returncode == 0:
+            saidas = []
+            for caminho in caminhos:
+                try:
+                    os.replace(caminho + ".svg", caminho_svg(caminho))
+                    saidas.append((caminho, True, ""))
+                except OSError as e:
+                    saidas.append((caminho, False, str(e)))
+            return saidas
+        for caminho in caminhos:
+            # o lote pode ter gravado parte das saídas antes do erro
+            try:
+                os.remove(caminho + ".svg")
+            except OSError:
+                pass
+        return [saida for caminho in caminhos for saida in renderizar_lote([caminho])]
+
+    caminho = caminhos[0]
+    comando = ["dot", "-Tsvg", caminho, "-o", caminho_svg(caminho)]
+    try:
+        resultado = subprocess.run(comando, capture_output=True, text=True, encoding='utf-8')
+    except OSError as e:
+        return [(caminho, False, str(e))]
+    return [(caminho, resultado.returncode == 0, (resultado.stderr or '').strip())]
+
+
+def _carregar_indice(raiz: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(raiz, INDEX_FILE), 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+        return indice if isinstance(indice, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _atualizado(caminho_arquivo_dot: str, sha: str, entrada: Optional[dict]) -> bool:
+    """O .svg existe, foi gerado a partir deste mesmo conteúdo e não é mais antigo que o .dot."""
+    if not entrada or entrada.get("sha256") != sha:
+        return False
+    try:
+        mtime_svg = os.path.getmtime(caminho_svg(caminho_arquivo_dot))
+    except OSError:
+        return False
+    # um .dot apenas "tocado" (mesmo hash) não força nova renderização
+    return mtime_svg >= entrada.get("svg_mtime", float("inf"))
+
+
+def _lotes(itens: List[str], tamanho: int) -> Iterable[List[str]]:
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+def processar_arquivos_dot(
+    raizes: Sequence[str] = ('.',),
+    excluir: Sequence[str] = DEFAULT_EXCLUDES,
+    workers: Optional[int] = None,
+    lote: int = 1,
+    forcar: bool = False,
+):
     """
-    Varre o diretório atual e seus subdiretórios em busca de arquivos .dot.
+    Varre as `raizes` (exceto os diretórios em `excluir`) em busca de arquivos .dot.
     Para cada arquivo encontrado, remove os acentos de seu conteúdo e, em seguida,
     utiliza o Graphviz para gerar um arquivo SVG correspondente.
+
+    A remoção de acentos e a renderização rodam num pool de processos
+    (`workers`, padrão: um por núcleo). A renderização é incremental: um .dot
+    cujo conteúdo (sha256) não mudou desde a última geração do .svg é pulado,
+    a menos que `forcar` seja verdadeiro. Com `lote` > 1, vários grafos são
+    passados a uma única invocação do `dot`.
     """
     # 1. Verifica se o comando 'dot' do Graphviz está instalado e acessível no PATH.
     if not shutil.which("dot"):
@@ -40,64 +183,97 @@ def processar_arquivos_dot():
     else:
         gerar_svg = True
 
-    diretorio_atual = '.'
+    workers = max(1, workers or os.cpu_count() or 1)
+    lote = max(1, int(lote))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
     arquivos_processados = 0
+    svgs_gerados = 0
+    svgs_pulados = 0
 
-    # 2. Percorre todos os diretórios e arquivos a partir do local atual.
-    for raiz, _, arquivos in os.walk(diretorio_atual):
-        for nome_arquivo in arquivos:
-            # 3. Verifica se o arquivo tem a extensão .dot.
-            if nome_arquivo.endswith('.dot'):
-                caminho_arquivo_dot = os.path.join(raiz, nome_arquivo)
-                nome_base = os.path.splitext(nome_arquivo)[0]
-                caminho_arquivo_svg = os.path.join(raiz, f"{nome_base}.svg")
+    try:
+        for raiz in raizes:
+            if not os.path.isdir(raiz):
+                logger.error("Diretório não encontrado: %s", raiz)
+                continue
+            # 2. Percorre a raiz, sem descer nos diretórios excluídos.
+            arquivos = list(encontrar_arquivos_dot(raiz, excluir))
+            if not arquivos:
+                continue
+            logger.info("Processando %d arquivo(s) .dot em %s (%d processo(s))", len(arquivos), raiz, workers)
 
-                logger.info("Processing DOT file: %s", caminho_arquivo_dot)
-                
-                try:
-                    # Bloco de tratamento de erros para cada arquivo.
-                    
-                    # 4. Lê o conteúdo do arquivo, remove os acentos e salva no mesmo arquivo.
-                    with open(caminho_arquivo_dot, 'r', encoding='utf-8') as f:
-                        conteudo = f.read()
-
-                    conteudo_sem_acentos = remover_acentos(conteudo)
-
-                    with open(caminho_arquivo_dot, 'w', encoding='utf-8') as f:
-                        f.write(conteudo_sem_acentos)
-                    
-                    logger.info("Acentos removidos de: %s", nome_arquivo)
-
-                    # 5. Se o Graphviz estiver disponível, gera o arquivo SVG.
-                    if gerar_svg:
-                        comando = [
-                            "dot",
-                            "-Tsvg",
-                            caminho_arquivo_dot,
-                            "-o",
-                            caminho_arquivo_svg
-                        ]
-                        
-                        # Executa o comando 'dot' e verifica se há erros.
-                        resultado = subprocess.run(comando, check=True, capture_output=True, text=True, encoding='utf-8')
-                        logger.info("SVG gerado com sucesso em: %s", caminho_arquivo_svg)
-                    
-                    arquivos_processados += 1
-
-                except FileNotFoundError:
-                    logger.error("Arquivo não encontrado: %s", caminho_arquivo_dot)
-                except subprocess.CalledProcessError as e:
-                    # Captura erros específicos da execução do comando 'dot'.
-                    logger.exception("ERRO ao gerar SVG para %s; cmd=%s; stderr=%s", nome_arquivo, ' '.join(e.cmd), (e.stderr or '').strip())
-                except Exception as e:
-                    # Captura qualquer outro erro inesperado.
-                    logger.exception("ERRO inesperado ao processar o arquivo %s: %s", caminho_arquivo_dot, e)
+            # 3. Remove os acentos (regravando apenas os arquivos alterados) e calcula o hash.
+            preparados = {}
+            resultados_preparo = executor.map(preparar_dot, arquivos, chunksize=32) if executor else map(preparar_dot, arquivos)
+            for caminho, sha, alterado in resultados_preparo:
+                if sha is None:
+                    continue
+                if alterado:
+                    logger.info("Acentos removidos de: %s", caminho)
+                preparados[caminho] = sha
+            arquivos_processados += len(preparados)
+            if not gerar_svg:
+                continue
+
+            # 4. Seleciona os .dot cujo .svg está ausente ou desatualizado.
+            indice = {} if forcar else _carregar_indice(raiz)
+            pendentes = []
+            for caminho, sha in preparados.items():
+                if _atualizado(caminho, sha, indice.get(os.path.relpath(caminho, raiz))):
+                    svgs_pulados += 1
+                else:
+                    pendentes.append(caminho)
+
+            # 5. Gera os SVGs, em lotes, no pool de processos.
+            lotes = list(_lotes(pendentes, lote))
+            for resultados in executor.map(renderizar_lote, lotes) if executor else map(renderizar_lote, lotes):
+                for caminho, ok, stderr in resultados:
+                    chave = os.path.relpath(caminho, raiz)
+                    if ok:
+                        svgs_gerados += 1
+                        indice[chave] = {"sha256": preparados[caminho], "svg_mtime": os.path.getmtime(caminho_svg(caminho))}
+                        logger.info("SVG gerado com sucesso em: %s", caminho_svg(caminho))
+                    else:
+                        indice.pop(chave, None)
+                        logger.error("ERRO ao gerar SVG para %s; stderr=%s", caminho, stderr)
+
+            # só entram no índice os .dot que ainda existem
+            indice = {k: v for k, v in indice.items() if os.path.join(raiz, k) in preparados}
+            try:
+                write_atomic(os.path.join(raiz, INDEX_FILE), json.dumps(indice, indent=1, sort_keys=True))
+            except OSError as e:
+                logger.error("Falha ao gravar o índice de SVGs em %s: %s", raiz, e)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     if arquivos_processados > 0:
-        logger.info("Processo concluído. %d arquivo(s) .dot foram processados.", arquivos_processados)
+        logger.info(
+            "Processo concluído. %d arquivo(s) .dot foram processados; %d SVG(s) gerados, %d já atualizados.",
+            arquivos_processados, svgs_gerados, svgs_pulados,
+        )
     else:
         logger.info("Processo concluído. Nenhum arquivo .dot foi encontrado para processar.")
 
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Remove acentos de arquivos .dot e gera os .svg com o Graphviz.")
+    parser.add_argument("raizes", nargs="*", default=["."], help="Diretórios a percorrer (padrão: diretório atual)")
+    parser.add_argument(
+        "--exclude", action="append", default=None, metavar="DIR",
+        help="Nome ou caminho de diretório a ignorar (repetível; padrão: %s)" % ", ".join(DEFAULT_EXCLUDES),
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Processos em paralelo (padrão: um por núcleo)")
+    parser.add_argument("--batch", type=int, default=1, help="Grafos por invocação do dot (padrão: 1)")
+    parser.add_argument("--force", action="store_true", help="Regera todos os SVGs, ignorando o índice incremental")
+    args = parser.parse_args(argv)
+    processar_arquivos_dot(
+        args.raizes,
+        excluir=DEFAULT_EXCLUDES if args.exclude is None else args.exclude,
+        workers=args.workers,
+        lote=args.batch,
+        forcar=args.force,
+    )
+
+
 if __name__ == "__main__":
-    processar_arquivos_dot()
+    main(sys.argv[1:])
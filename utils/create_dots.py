@@ -1,14 +1,26 @@
+import argparse
+import hashlib
 import os
 import sys
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from utils.cdfg import find_digraphs, iter_digraphs, read_chunks
+    from utils.file_utils import write_atomic
+except ImportError:  # executado como script de dentro de utils/
+    from cdfg import find_digraphs, iter_digraphs, read_chunks
+    from file_utils import write_atomic
 
 logger = logging.getLogger(__name__)
 
 def extrair_todos_os_digraphs(conteudo):
     """
     Extrai todos os blocos 'digraph <nome> {...}' de uma string.
-    Esta função lida corretamente com chaves aninhadas e extrai o nome de cada digraph.
+    Usa o tokenizador DOT de utils.cdfg: chaves dentro de strings e comentários
+    não confundem a extração, e a palavra "digraph" em prosa é ignorada.
 
     Args:
         conteudo (str): O conteúdo do arquivo para pesquisar.
@@ -17,124 +29,118 @@ def extrair_todos_os_digraphs(conteudo):
         list: Uma lista de dicionários, onde cada dicionário contém o 'nome'
               e o 'conteúdo' de um digraph encontrado. Ex: [{'nome': 'ex1', 'conteudo': '...'}, ...]
     """
-    digraphs_encontrados = []
-    offset = 0 # Posição inicial para a busca no texto
-
-    while True:
-        try:
-            # Procura a próxima ocorrência de "digraph" a partir do offset atual
-            start_keyword_idx = conteudo.find('digraph', offset)
-            if start_keyword_idx == -1:
-                break # Se não encontrar mais, encerra o loop
-
-            # Encontra a primeira chave de abertura após a palavra "digraph"
-            open_brace_idx = conteudo.find('{', start_keyword_idx)
-            if open_brace_idx == -1:
-                # Se não encontrar a chave, avança o offset para evitar loop infinito
-                offset = start_keyword_idx + len('digraph')
-                continue
+    return [
+        {'nome': bloco.name, 'conteudo': bloco.text}
+        for bloco in find_digraphs(conteudo)
+        if _nome_valido(bloco.name)
+    ]
+
+
+def _nome_valido(nome: Optional[str]) -> bool:
+    # o nome vira nome de arquivo: digraphs anônimos ou com nomes fora de [A-Za-z0-9_] são ignorados
+    if not nome or not re.fullmatch(r'[a-zA-Z0-9_]+', nome):
+        logger.warning("Aviso: Encontrado um digraph sem nome ou malformado. Ignorando.")
+        return False
+    return True
+
+
+def gravar_se_alterado(caminho: str, conteudo: str) -> bool:
+    """Grava `conteudo` em `caminho` apenas se for diferente do que já está no disco; retorna se gravou."""
+    try:
+        with open(caminho, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == conteudo:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    write_atomic(caminho, conteudo)
+    return True
+
+
+def processar_arquivo_out(caminho_arquivo_out: str) -> Tuple[str, int, int, Optional[str]]:
+    """
+    Extrai, em fluxo, os digraphs nomeados de um arquivo .out e grava os .dot
+    no mesmo diretório (apenas os que mudaram).
 
-            # --- Extração do Nome do Digraph ---
-            header = conteudo[start_keyword_idx:open_brace_idx]
-            # Usa uma expressão regular para encontrar o nome (primeira palavra após 'digraph')
-            match = re.search(r'digraph\s+([a-zA-Z0-9_]+)', header)
-            if not match:
-                # Digraph anônimo ou malformado, pula para o próximo
-                offset = open_brace_idx + 1
-                logger.warning("Aviso: Encontrado um digraph sem nome ou malformado. Ignorando.")
+    Returns:
+        (caminho, digraphs encontrados, arquivos .dot gravados, mensagem de erro ou None)
+    """
+    dirpath = os.path.dirname(caminho_arquivo_out)
+    encontrados = gravados = 0
+    # hash do conteúdo já conferido/gravado por .dot: nomes repetidos na transcrição não relêem o disco
+    conferidos: Dict[str, bytes] = {}
+    try:
+        for bloco in iter_digraphs(read_chunks(caminho_arquivo_out)):
+            if not _nome_valido(bloco.name):
+                continue
+            encontrados += 1
+            caminho_arquivo_dot = os.path.join(dirpath, f"{bloco.name}.dot")
+            digest = hashlib.sha1(bloco.text.encode('utf-8')).digest()
+            if conferidos.get(caminho_arquivo_dot) == digest:
                 continue
-            
-            digraph_name = match.group(1)
-
-            # --- Encontrar a Chave de Fechamento Correspondente ---
-            brace_count = 1
-            search_idx = open_brace_idx + 1
-            
-            while search_idx < len(conteudo) and brace_count > 0:
-                if conteudo[search_idx] == '{':
-                    brace_count += 1
-                elif conteudo[search_idx] == '}':
-                    brace_count -= 1
-                search_idx += 1
-
-            if brace_count == 0:
-                # Bloco completo encontrado
-                bloco_conteudo = conteudo[start_keyword_idx : search_idx]
-                digraphs_encontrados.append({
-                    'nome': digraph_name,
-                    'conteudo': bloco_conteudo
-                })
-                # Atualiza o offset para continuar a busca APÓS o bloco encontrado
-                offset = search_idx
+            conferidos[caminho_arquivo_dot] = digest
+            if gravar_se_alterado(caminho_arquivo_dot, bloco.text):
+                gravados += 1
+                logger.info("Digraph '%s' extraído. Arquivo criado: %s", bloco.name, caminho_arquivo_dot)
             else:
-                # Bloco malformado (não fechou chaves), avança para não ficar preso
-                offset = open_brace_idx + 1
-
-        except Exception as e:
-            logger.exception("Ocorreu um erro inesperado durante a análise do conteúdo: %s", e)
-            break # Encerra em caso de erro grave
+                logger.debug("Digraph '%s' inalterado: %s", bloco.name, caminho_arquivo_dot)
+    except Exception as e:
+        logger.exception("Erro ao processar o arquivo %s: %s", caminho_arquivo_out, e)
+        return caminho_arquivo_out, encontrados, gravados, str(e)
+    return caminho_arquivo_out, encontrados, gravados, None
 
-    return digraphs_encontrados
 
-def processar_arquivos_out(diretorio_raiz):
+def processar_arquivos_out(diretorio_raiz, workers: Optional[int] = None):
     """
     Percorre um diretório, encontra arquivos .out, extrai todos os digraphs nomeados
     e cria os arquivos .dot correspondentes.
+
+    Cada .out é lido em pedaços (memória constante, mesmo para transcrições
+    de centenas de MB) e os arquivos são processados em paralelo num pool de
+    processos (`workers`, padrão: um por núcleo).
     """
     if not os.path.isdir(diretorio_raiz):
         logger.error("Erro: O diretório '%s' não foi encontrado.", diretorio_raiz)
         return
     logger.info("Iniciando a busca por arquivos *.out em '%s'...", diretorio_raiz)
-    
-    arquivos_out_encontrados = 0
-    total_dots_criados = 0
 
-    for dirpath, _, filenames in os.walk(diretorio_raiz):
-        for filename in filenames:
-            if filename.endswith('.out'):
-                arquivos_out_encontrados += 1
-                caminho_arquivo_out = os.path.join(dirpath, filename)
-                logger.info("Processando arquivo: %s", caminho_arquivo_out)
-
-                try:
-                    with open(caminho_arquivo_out, 'r', encoding='utf-8', errors='ignore') as f:
-                        conteudo = f.read()
-                    
-                    lista_de_digraphs = extrair_todos_os_digraphs(conteudo)
-
-                    if not lista_de_digraphs:
-                        logger.info("Nenhum digraph nomeado foi encontrado em: %s", caminho_arquivo_out)
-                        continue
-
-                    for digraph_info in lista_de_digraphs:
-                        nome_dot = f"{digraph_info['nome']}.dot"
-                        conteudo_dot = digraph_info['conteudo']
-                        caminho_arquivo_dot = os.path.join(dirpath, nome_dot)
-
-                        with open(caminho_arquivo_dot, 'w', encoding='utf-8') as f_out:
-                            f_out.write(conteudo_dot)
-                        
-                        logger.info("Digraph '%s' extraído. Arquivo criado: %s", digraph_info['nome'], caminho_arquivo_dot)
-                        total_dots_criados += 1
-                    
-                    logger.debug("") # separador visual (debug)
-
-                except Exception as e:
-                    logger.exception("Erro ao processar o arquivo %s: %s", caminho_arquivo_out, e)
+    arquivos_out: List[str] = [
+        os.path.join(dirpath, filename)
+        for dirpath, _, filenames in os.walk(diretorio_raiz)
+        for filename in sorted(filenames)
+        if filename.endswith('.out')
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(arquivos_out) or 1))
+
+    total_digraphs = 0
+    total_dots_criados = 0
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(processar_arquivo_out, arquivos_out))
+    else:
+        resultados = [processar_arquivo_out(caminho) for caminho in arquivos_out]
+    for caminho_arquivo_out, encontrados, gravados, erro in resultados:
+        if erro is None and not encontrados:
+            logger.info("Nenhum digraph nomeado foi encontrado em: %s", caminho_arquivo_out)
+        total_digraphs += encontrados
+        total_dots_criados += gravados
 
     logger.info("--------------------------------------------------")
     logger.info("Processo concluído.")
-    logger.info("Total de arquivos .out encontrados: %d", arquivos_out_encontrados)
-    logger.info("Total de arquivos .dot criados: %d", total_dots_criados)
+    logger.info("Total de arquivos .out encontrados: %d", len(arquivos_out))
+    logger.info("Total de digraphs encontrados: %d", total_digraphs)
+    logger.info("Total de arquivos .dot criados ou atualizados: %d", total_dots_criados)
     logger.info("--------------------------------------------------")
 
+
 # --- INÍCIO DA CONFIGURAÇÃO ---
 # IMPORTANTE: Altere esta variável para o caminho da pasta raiz do seu projeto.
 DIRETORIO_PROJETO = "." 
 # --- FIM DA CONFIGURAÇÃO ---
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        DIRETORIO_PROJETO = sys.argv[1]
-    
-    processar_arquivos_out(DIRETORIO_PROJETO)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extrai os digraphs de arquivos .out para arquivos .dot.")
+    parser.add_argument("diretorio", nargs="?", default=DIRETORIO_PROJETO, help="Pasta raiz a percorrer")
+    parser.add_argument("--workers", type=int, default=None, help="Processos em paralelo (padrão: um por núcleo)")
+    args = parser.parse_args(sys.argv[1:])
+
+    processar_arquivos_out(args.diretorio, workers=args.workers)
\ No newline at end of file
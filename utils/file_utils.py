@@ -1,49 +1,375 @@
+import codecs
+import gzip
 import logging
 import os
-from typing import List, Optional
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, IO, List, NamedTuple, Optional, Set, Tuple
+
+try:  # zstandard é opcional: sem ele, "zstd" recai em gzip
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+COMPRESSIONS = ("gzip", "zstd")
+_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# Diretórios cujos artefatos podem ser comprimidos: prompts (que repetem o
+# código inteiro) e reasonings. Respostas ficam em texto, pois o resume as relê.
+COMPRESSED_DIRS = ("prompts", "reasonings")
+DEFAULT_COMPRESS_MIN_CHARS = 4096
+DEFAULT_MAX_PENDING = 256
+
+# Ordem de tentativa quando o BOM não resolve (a de sempre de `safe_read_text`).
+DEFAULT_ENCODINGS = ("utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "latin-1")
+_SNIFF_BYTES = 4096
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+DEFAULT_READ_CACHE_ENTRIES = 256
+DEFAULT_READ_CACHE_CHARS = 64_000_000
+
+_known_dirs: Set[str] = set()
+_known_dirs_lock = threading.Lock()
+
+
+def ensure_dir(path: str) -> None:
+    """`os.makedirs` com cache: cada diretório é criado (ou verificado) uma vez por processo."""
+    if not path or path in _known_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    with _known_dirs_lock:
+        _known_dirs.add(path)
+
+
+def write_atomic(path: str, data, encoding: str = "utf-8") -> None:
+    """Grava via arquivo temporário + `os.replace`: uma interrupção nunca deixa o arquivo pela metade."""
+    directory = os.path.dirname(path)
+    ensure_dir(directory)
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory or ".")
+    except FileNotFoundError:
+        # o diretório foi removido depois de entrar no cache
+        with _known_dirs_lock:
+            _known_dirs.discard(directory)
+        ensure_dir(directory)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data if isinstance(data, bytes) else data.encode(encoding))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compressed_path(path: str, compression: str) -> str:
+    return path + _EXTENSIONS[compression]
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def read_artifact_text(path: str) -> str:
+    """Lê um artefato de texto, descomprimindo `.gz`/`.zst` gravados pelo BackgroundWriter."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(_EXTENSIONS["gzip"]):
+        data = gzip.decompress(data)
+    elif path.endswith(_EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise ValueError(f"Pacote zstandard não instalado; não é possível ler {path}")
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data.decode("utf-8")
+
+
+class _Job:
+    __slots__ = ("text", "callbacks")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.callbacks: List[Callable[[], None]] = []
+
+
+class BackgroundWriter:
+    """
+    Grava artefatos numa thread própria, fora do caminho das chamadas à LLM.
+
+    - Fila limitada a `max_pending` arquivos: quem grava espera se ela encher.
+    - Escritas no mesmo caminho ainda não gravado são fundidas (vale a última).
+    - Cada gravação é atômica (`write_atomic`) e os diretórios são criados uma vez.
+    - Com `compression` ("gzip" ou "zstd"), textos de pelo menos
+      `compress_min_chars` caracteres em `compress_dirs` são gravados comprimidos
+      em `<arquivo>.gz`/`<arquivo>.zst` (o arquivo sem extensão é removido).
+    """
+
+    def __init__(
+        self,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        compression: Optional[str] = None,
+        compress_min_chars: int = DEFAULT_COMPRESS_MIN_CHARS,
+        compress_dirs=COMPRESSED_DIRS,
+    ):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Compressão inválida: {compression!r}; use uma de {COMPRESSIONS}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("Pacote zstandard não instalado; comprimindo artefatos com gzip")
+            compression = "gzip"
+        self.max_pending = max(1, int(max_pending))
+        self.compression = compression
+        self.compress_min_chars = compress_min_chars
+        self.compress_dirs = frozenset(compress_dirs)
+        self.written = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._pending: Dict[str, _Job] = {}
+        self._in_flight: Dict[str, _Job] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str, text: str) -> None:
+        """Enfileira a gravação de `text` em `path` (bloqueia se a fila estiver cheia)."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BackgroundWriter já foi fechado")
+                # consultado de novo após cada espera: outra thread pode ter
+                # enfileirado o mesmo caminho enquanto a fila estava cheia
+                job = self._pending.get(path)
+                if job is not None:
+                    job.text = text
+                    self.coalesced += 1
+                    return
+                if len(self._pending) < self.max_pending:
+                    break
+                self._cond.wait()
+            self._pending[path] = _Job(text)
+            self._cond.notify_all()
+
+    def when_written(self, path: str, callback: Callable[[], None]) -> None:
+        """Executa `callback` depois que a gravação pendente de `path` terminar (na hora, se não houver)."""
+        with self._cond:
+            job = self._pending.get(path) or self._in_flight.get(path)
+            if job is not None:
+                job.callbacks.append(callback)
+                return
+        callback()
+
+    def flush(self) -> None:
+        """Espera até todas as gravações enfileiradas terminarem."""
+        with self._cond:
+            while self._pending or self._in_flight:
+                self._cond.wait()
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        logger.debug(
+            "BackgroundWriter: %d arquivos gravados, %d escritas fundidas, %d falhas",
+            self.written, self.coalesced, self.failed,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"written": self.written, "coalesced": self.coalesced, "failed": self.failed}
+
+    def _compression_for(self, path: str, text: str) -> Optional[str]:
+        if self.compression is None or len(text) < self.compress_min_chars:
+            return None
+        if os.path.basename(os.path.dirname(path)) not in self.compress_dirs:
+            return None
+        return self.compression
+
+    def _write(self, path: str, text: str) -> None:
+        compression = self._compression_for(path, text)
+        if compression is None:
+            write_atomic(path, text)
+            return
+        write_atomic(compressed_path(path, compression), _compress(text.encode("utf-8"), compression))
+        # o streaming pode ter deixado a versão sem compressão
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                self._cond.notify_all()
+            written = failed = 0
+            for path, job in batch.items():
+                try:
+                    self._write(path, job.text)
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    logger.exception("Erro ao salvar arquivo %s: %s", path, e)
+            with self._cond:
+                self._in_flight = {}
+                self.written += written
+                self.failed += failed
+                callbacks = [cb for job in batch.values() for cb in job.callbacks]
+                self._cond.notify_all()
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.exception("Erro após gravar arquivos: %s", e)
+
+
+class DecodedText(NamedTuple):
+    text: str
+    encoding: str
+
+
+def sniff_encodings(raw: bytes) -> Tuple[str, ...]:
+    """
+    Encodings a tentar para `raw`, em ordem: o do BOM, se houver; senão
+    UTF-8 e, só quando a amostra tem NULs alternados, UTF-16 sem BOM antes
+    de cp1252/latin-1 (UTF-16 "decodifica" quase qualquer sequência de
+    tamanho par, o que transformava fontes cp1252 em lixo).
+    """
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return (encoding,) + DEFAULT_ENCODINGS
+    head = raw[:_SNIFF_BYTES]
+    if len(raw) % 2 == 0 and head.count(0) * 4 > len(head):
+        utf16 = "utf-16-le" if head[1::2].count(0) >= head[0::2].count(0) else "utf-16-be"
+        return ("utf-8", utf16, "cp1252", "latin-1")
+    return ("utf-8", "cp1252", "latin-1")
+
+
+def decode_bytes(raw: bytes, encodings: Optional[List[str]] = None) -> Tuple[str, str]:
+    """Decodifica `raw` com o primeiro encoding que funcionar (farejado, sem lista explícita); retorna (texto, encoding)."""
+    if encodings is None:
+        encodings = sniff_encodings(raw)
+    for encoding in encodings:
+        try:
+            return raw.decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return raw.decode("utf-8", errors="replace"), "utf-8 (replace)"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Remove NULs, converte CRLF/CR em LF, tira os espaços do fim de cada
+    linha e as linhas em branco do início e do fim (mantendo um "\\n" final
+    se o texto terminava em quebra de linha).
+
+    Só o split/rstrip/join copia o texto sempre; as demais etapas copiam
+    apenas se houver o que mudar (NULs, CRs, quebras extras nas pontas).
+    """
+    if "\x00" in text:
+        text = text.replace("\x00", "")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join([ln.rstrip() for ln in text.split("\n")])
+    if text.startswith("\n") or text.endswith("\n\n"):
+        return text.strip("\n") + ("\n" if text.endswith("\n") else "")
+    return text
+
+
+class _ReadCache:
+    """LRU dos textos normalizados por (caminho, mtime, tamanho, encodings), limitada em entradas e caracteres."""
+
+    def __init__(self, max_entries: int = DEFAULT_READ_CACHE_ENTRIES, max_chars: int = DEFAULT_READ_CACHE_CHARS):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[tuple, DecodedText]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[DecodedText]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: DecodedText) -> None:
+        if len(value.text) > self.max_chars:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous.text)
+            self._entries[key] = value
+            self._chars += len(value.text)
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted.text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+_read_cache = _ReadCache()
+
 
 class FileUtils:
-    """Utilitários de I/O: leitura segura e escrita de arquivos."""
+    """Utilitários de I/O: leitura segura e escrita de arquivos.
+
+    Com um `writer` (`BackgroundWriter`), `write_text_file` só enfileira a
+    gravação; sem ele, grava na hora, de forma atômica.
+    """
+
+    MAX_CHARS = 500_000
+
+    def __init__(self, writer: Optional[BackgroundWriter] = None):
+        self.writer = writer
 
     @staticmethod
-    def safe_read_text(path: str, encodings: Optional[List[str]] = None) -> str:
-        if encodings is None:
-            encodings = [
-                "utf-8",
-                "utf-8-sig",
-                "utf-16",
-                "utf-16-le",
-                "utf-16-be",
-                "cp1252",
-                "latin-1",
-            ]
-        with open(path, "rb") as fh:
-            raw = fh.read()
-
-        text = None
-        for enc in encodings:
-            try:
-                text = raw.decode(enc)
-                break
-            except Exception:
-                continue
-
-        if text is None:
-            text = raw.decode("utf-8", errors="replace")
-
-        if "\x00" in text:
-            text = text.replace("\x00", "")
-        text = text.replace("\r\n", "\n").replace("\r", "\n")
-        lines = [ln.rstrip() for ln in text.split("\n")]
-        text = "\n".join(lines)
-        text = text.strip("\n") + ("\n" if text.endswith("\n") else "")
-        MAX_CHARS = 500_000
-        if len(text) > MAX_CHARS:
-            text = text[:MAX_CHARS]
-        return text
+    def safe_read_text(path: str, encodings: Optional[List[str]] = None, max_chars: Optional[int] = MAX_CHARS) -> str:
+        """
+        Lê um arquivo de texto tentando vários encodings e normaliza quebras de
+        linha e espaços no fim das linhas. Textos maiores que `max_chars` são
+        truncados com um aviso no log; `max_chars=None` lê o arquivo inteiro.
+        """
+        return FileUtils.read_text(path, encodings, max_chars).text
+
+    @staticmethod
+    def read_text(path: str, encodings: Optional[List[str]] = None, max_chars: Optional[int] = MAX_CHARS) -> "DecodedText":
+        """
+        Como `safe_read_text`, devolvendo também o encoding detectado.
+
+        O encoding é farejado uma vez (`sniff_encodings`: BOM, UTF-8, UTF-16
+        sem BOM só com NULs alternados, cp1252); com `encodings`, a lista é
+        tentada em ordem. O texto normalizado fica em cache por caminho +
+        mtime + tamanho, para arquivos lidos mais de uma vez.
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(encodings or ()))
+        cached = _read_cache.get(key)
+        if cached is None:
+            with open(path, "rb") as fh:
+                raw = fh.read()
+            text, encoding = decode_bytes(raw, encodings)
+            cached = DecodedText(normalize_text(text), encoding)
+            _read_cache.put(key, cached)
+        text = cached.text
+        if max_chars is not None and len(text) > max_chars:
+            logger.warning("Arquivo %s truncado: %d -> %d caracteres", path, len(text), max_chars)
+            return DecodedText(text[:max_chars], cached.encoding)
+        return cached
 
     @staticmethod
     def load_markdown_file(path: str) -> str:
@@ -62,11 +388,68 @@ class FileUtils:
             logger.info("Finalizado (com erro): load_markdown_file -> %s", path)
             return ""
 
-    @staticmethod
-    def write_text_file(path: str, text: str) -> None:
+    def write_text_file(self, path: str, text: str) -> None:
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(text)
+            if self.writer is not None:
+                self.writer.submit(path, text)
+            else:
+                write_atomic(path, text)
         except Exception as e:
             logger.exception("Erro ao salvar arquivo %s: %s", path, e)
+
+    def when_written(self, path: str, callback: Callable[[], None]) -> None:
+        """Executa `callback` quando `path` estiver gravado em disco (na hora, sem `writer`)."""
+        if self.writer is None:
+            callback()
+        else:
+            self.writer.when_written(path, callback)
+
+    def flush(self) -> None:
+        if self.writer is not None:
+            self.writer.flush()
+
+
+class ProgressiveWriter:
+    """
+    Grava trechos de texto em arquivos à medida que chegam (respostas em
+    streaming), para acompanhar uma chamada longa pelo disco. Os arquivos são
+    abertos na primeira escrita e o texto gravado fica disponível em `text()`.
+    Com `to_disk=False` o texto só é acumulado em memória.
+    """
+
+    def __init__(self, to_disk: bool = True):
+        self.to_disk = to_disk
+        self._files: Dict[str, IO[str]] = {}
+        self._parts: Dict[str, List[str]] = {}
+
+    def write(self, path: str, text: str) -> None:
+        if not self.to_disk:
+            self._parts.setdefault(path, []).append(text)
+            return
+        try:
+            f = self._files.get(path)
+            if f is None:
+                ensure_dir(os.path.dirname(path))
+                f = self._files[path] = open(path, "w", encoding="utf-8")
+                self._parts[path] = []
+            f.write(text)
+            f.flush()
+            self._parts[path].append(text)
+        except Exception as e:
+            logger.exception("Erro ao gravar parcialmente o arquivo %s: %s", path, e)
+
+    def reset(self) -> None:
+        """Apaga o que já foi gravado (nova tentativa da mesma chamada)."""
+        for f in self._files.values():
+            f.seek(0)
+            f.truncate()
+        for path in self._parts:
+            self._parts[path] = []
+
+    def text(self, path: str) -> str:
+        return "".join(self._parts.get(path, []))
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files = {}
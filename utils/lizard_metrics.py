@@ -0,0 +1,52 @@
+import logging
+import os
+import re
+from typing import Dict, List
+
+from utils.models import FunctionMetrics
+
+logger = logging.getLogger(__name__)
+
+# Linha de função do lizard: "NLOC CCN token PARAM length nome@inicio-fim@arquivo"
+_FUNCTION_LINE = re.compile(
+    r"^\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\S+)@(\d+)-(\d+)@(\S+)\s*$"
+)
+
+
+def load_lizard_metrics(path: str) -> Dict[str, List[FunctionMetrics]]:
+    """
+    Lê um relatório do lizard e agrupa as métricas por nome de arquivo (basename).
+
+    A seção de warnings repete funções já listadas; entradas duplicadas
+    (mesmo arquivo, função e intervalo de linhas) são ignoradas.
+    Retorna um dicionário vazio se o relatório não existir.
+    """
+    if not os.path.isfile(path):
+        logger.warning("Relatório de métricas não encontrado: %s", path)
+        return {}
+
+    metrics: Dict[str, List[FunctionMetrics]] = {}
+    seen = set()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _FUNCTION_LINE.match(line)
+            if not match:
+                continue
+            nloc, ccn, token, param, length, name, start, end, location = match.groups()
+            key = (location, name, start, end)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = FunctionMetrics(
+                name=name,
+                file=location,
+                start_line=int(start),
+                end_line=int(end),
+                nloc=int(nloc),
+                ccn=int(ccn),
+                token=int(token),
+                param=int(param),
+                length=int(length),
+            )
+            metrics.setdefault(os.path.basename(location), []).append(entry)
+    return metrics
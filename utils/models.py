@@ -1,5 +1,10 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from utils.cdfg import CDFG
+    from utils.cdfg_paths import PathSet
+    from utils.path_constraints import PathVerdict
 
 
 @dataclass
@@ -7,3 +12,33 @@ class FunctionResult:
     """Estrutura tipada para armazenar resultado por função."""
     cdfg: Optional[str]
     infeasible_paths: Optional[str]
+    # CDFG interpretado localmente a partir de `cdfg` (None se não houver digraph válido)
+    graph: Optional["CDFG"] = None
+    # caminhos candidatos enumerados sobre `graph` (só com a enumeração de caminhos ativa)
+    paths: Optional["PathSet"] = None
+    # veredito do pré-filtro local para cada caminho de `paths` (só com o pré-filtro ativo)
+    verdicts: Optional[List["PathVerdict"]] = None
+
+
+@dataclass(frozen=True)
+class FunctionMetrics:
+    """Métricas de uma função no formato do relatório do lizard (annotations/metricas.txt)."""
+    name: str
+    file: str
+    start_line: int
+    end_line: int
+    nloc: int
+    ccn: int
+    token: int
+    param: int
+    length: int
+
+
+@dataclass(frozen=True)
+class SourceFunction:
+    """Definição de função localizada no código-fonte (linhas 1-based, offsets 0-based)."""
+    name: str
+    start_line: int
+    end_line: int
+    start_offset: int
+    end_offset: int
@@ -0,0 +1,1521 @@
+"""
+Pré-filtro local de caminhos candidatos: propagação de constantes e intervalos.
+
+Cada caminho enumerado por `utils.cdfg_paths` é percorrido com um estado
+abstrato (um intervalo por variável). As atribuições dos nós atualizam o
+estado e cada ramo tomado refina as variáveis da condição. O veredito é:
+
+- "infeasible": algum ramo do caminho é impossível (ex.: `x > 10` seguido de
+  `x < 5`, condição constante, laço com limites fixos desenrolado k vezes);
+- "feasible": todo ramo do caminho é forçado pelo estado (ex.: caminho sem
+  decisões, ou decisões que só dependem de constantes);
+- "undecided": o resto, que segue para a LLM.
+
+O código de cada nó vem, nesta ordem, do `label` (quando não é só o número do
+nó), dos trechos entre crases da lista de correspondência código-nó que o
+prompt de CDFG pede, ou das linhas do arquivo citadas nessa lista. As
+condições também são lidas dos rótulos das arestas ("True\\n(cond)").
+
+A análise é conservadora: nó sem código conhecido apaga as variáveis do seu
+`Def:` e tudo que uma chamada ou escrita por ponteiro poderia alterar.
+Variáveis `volatile`, globais e locais com endereço tomado não sobrevivem a
+chamadas. Cada inteiro declarado guarda a largura e o sinal do seu tipo
+(`int` de 32 bits, `long` de 32 ou 64): um resultado que pode sair da faixa
+do tipo (volta de `unsigned`, conversão para `char`/`short`, overflow) vira a
+faixa inteira do tipo, e variáveis de tipo desconhecido não guardam valores
+atribuídos. Valores de ponto flutuante (literais, variáveis `float`/`double`
+e expressões com resultado flutuante) não são representados: o
+arredondamento de C tornaria qualquer intervalo real inseguro. Não é modelado
+aliasing entre ponteiros e arrays.
+"""
+
+import functools
+import logging
+import math
+import re
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from utils.c_functions import find_functions, function_source, mask_source, source_skeleton
+from utils.cdfg import CDFG
+from utils.cdfg_paths import PathSet, format_paths
+
+logger = logging.getLogger(__name__)
+
+FEASIBLE = "feasible"
+INFEASIBLE = "infeasible"
+UNDECIDED = "undecided"
+
+_INF = math.inf
+
+_TYPE_WORDS = frozenset({
+    "const", "static", "volatile", "register", "extern", "auto", "unsigned", "signed",
+    "short", "long", "int", "char", "float", "double", "void", "_Bool", "bool",
+    "size_t", "ssize_t", "struct", "union", "enum",
+})
+_INTEGER_WORDS = frozenset({"int", "char", "short", "long", "unsigned", "signed", "_Bool", "bool", "size_t", "ssize_t"})
+_FIXED_INT = re.compile(r"(u?)int(8|16|32|64)_t$")
+_FLOAT_WORDS = frozenset({"float", "double"})
+_QUALIFIERS = frozenset({"const", "static", "volatile", "register", "extern", "auto"})
+_STATEMENT_WORDS = frozenset({
+    "if", "else", "while", "for", "do", "switch", "case", "default", "return",
+    "break", "continue", "goto", "sizeof",
+})
+# Chamadas que não alteram variáveis do programa.
+_PURE_FUNCTIONS = frozenset({
+    "printf", "puts", "putchar", "fprintf", "assert", "abs", "labs", "fabs", "sqrt",
+    "sin", "cos", "tan", "atan", "exp", "log", "log10", "pow", "floor", "ceil",
+})
+
+_C_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<num>0[xX][0-9A-Fa-f]+[uUlL]*|(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?[fFlL]?|[0-9]+[eE][-+]?[0-9]+[fFlL]?|[0-9]+[uUlL]*)
+    |(?P<char>'(?:\\.|[^'\\])+')
+    |(?P<str>"(?:\\.|[^"\\])*")
+    |(?P<id>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op><<=|>>=|->|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^]=|[-+*/%<>=!~&|^?:,;()\[\].{}])
+    """,
+    re.X,
+)
+
+_BINARY = {
+    "*": 13, "/": 13, "%": 13, "+": 12, "-": 12, "<<": 11, ">>": 11,
+    "<": 10, "<=": 10, ">": 10, ">=": 10, "==": 9, "!=": 9,
+    "&": 8, "^": 7, "|": 6, "&&": 5, "||": 4,
+}
+_ASSIGN = frozenset({"=", "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=", "<<=", ">>="})
+_COMPARE = frozenset({"<", "<=", ">", ">=", "==", "!="})
+_NEGATED = {"<": ">=", "<=": ">", ">": "<=", ">=": "<", "==": "!=", "!=": "=="}
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+_CHAR_ESCAPES = {"n": 10, "t": 9, "r": 13, "0": 0, "\\": 92, "'": 39, '"': 34, "a": 7, "b": 8, "f": 12, "v": 11}
+
+
+class PathVerdict(NamedTuple):
+    """Resultado do pré-filtro para um caminho; `node` é a posição no caminho do ramo impossível."""
+    status: str
+    reason: Optional[str] = None
+    node: Optional[int] = None
+
+
+# ---------------------------------------------------------------- intervalos
+
+
+class Interval:
+    """Intervalo real com extremos abertos ou fechados (infinitos são abertos)."""
+
+    __slots__ = ("lo", "hi", "lo_open", "hi_open")
+
+    def __init__(self, lo=-_INF, hi=_INF, lo_open: bool = False, hi_open: bool = False):
+        self.lo = lo
+        self.hi = hi
+        self.lo_open = lo_open or lo == -_INF
+        self.hi_open = hi_open or hi == _INF
+
+    @classmethod
+    def const(cls, value) -> "Interval":
+        return cls(value, value)
+
+    def __repr__(self) -> str:
+        return "%s%s, %s%s" % ("(" if self.lo_open else "[", self.lo, self.hi, ")" if self.hi_open else "]")
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Interval) and (self.lo, self.hi, self.lo_open, self.hi_open) == (
+            other.lo, other.hi, other.lo_open, other.hi_open
+        )
+
+    @property
+    def empty(self) -> bool:
+        return self.lo > self.hi or (self.lo == self.hi and (self.lo_open or self.hi_open))
+
+    @property
+    def value(self):
+        """O valor, se o intervalo for um único ponto."""
+        if self.lo == self.hi and not self.lo_open and not self.hi_open:
+            return self.lo
+        return None
+
+    @property
+    def is_top(self) -> bool:
+        return self.lo == -_INF and self.hi == _INF
+
+    def intersect(self, other: "Interval") -> "Interval":
+        if self.lo > other.lo or (self.lo == other.lo and self.lo_open):
+            lo, lo_open = self.lo, self.lo_open
+        else:
+            lo, lo_open = other.lo, other.lo_open
+        if self.hi < other.hi or (self.hi == other.hi and self.hi_open):
+            hi, hi_open = self.hi, self.hi_open
+        else:
+            hi, hi_open = other.hi, other.hi_open
+        return Interval(lo, hi, lo_open, hi_open)
+
+    def hull(self, other: "Interval") -> "Interval":
+        if self.lo < other.lo or (self.lo == other.lo and not self.lo_open):
+            lo, lo_open = self.lo, self.lo_open
+        else:
+            lo, lo_open = other.lo, other.lo_open
+        if self.hi > other.hi or (self.hi == other.hi and not self.hi_open):
+            hi, hi_open = self.hi, self.hi_open
+        else:
+            hi, hi_open = other.hi, other.hi_open
+        return Interval(lo, hi, lo_open, hi_open)
+
+    def excludes(self, x) -> bool:
+        return not (self.lo < x < self.hi or (x == self.lo and not self.lo_open) or (x == self.hi and not self.hi_open))
+
+
+_TOP = Interval()
+_BOOL = Interval(0, 1)
+
+
+class _IntType(NamedTuple):
+    """Tipo inteiro C: largura em bits (mínima e máxima nas plataformas usuais) e sinal (None: `char` puro)."""
+    bits: int
+    max_bits: int
+    signed: Optional[bool]
+
+    @property
+    def exact(self) -> Tuple[int, int]:
+        """Valores que o tipo representa em qualquer plataforma (sem volta nem overflow)."""
+        if self.signed is False:
+            return 0, 2 ** self.bits - 1
+        return (-2 ** (self.bits - 1) if self.signed else 0), 2 ** (self.bits - 1) - 1
+
+    @property
+    def full(self) -> Tuple[int, int]:
+        """Todos os valores que uma variável do tipo pode ter."""
+        if self.signed:
+            return -2 ** (self.max_bits - 1), 2 ** (self.max_bits - 1) - 1
+        return (0 if self.signed is False else -2 ** (self.max_bits - 1)), 2 ** self.max_bits - 1
+
+    def promoted(self) -> "_IntType":
+        """Tipo em que a aritmética acontece (promoção dos tipos menores que `int`)."""
+        return _INT if self.max_bits < _INT.bits else self
+
+
+_INT = _IntType(32, 32, True)
+_UINT = _IntType(32, 32, False)
+_INT_MAX = _INT.exact[1]
+
+
+def _int_type(words: Sequence[str], typedefs: Optional[Dict[str, object]] = None) -> Optional[object]:
+    """
+    `_IntType` das palavras de um tipo, `float` para ponto flutuante ou None
+    se o tipo não for conhecido (struct, typedef não resolvido, ponteiro).
+    """
+    words = [w for w in words if w not in _QUALIFIERS]
+    if len(words) == 1 and typedefs and words[0] in typedefs:
+        return typedefs[words[0]]
+    if not words or "*" in words or any(w in ("struct", "union", "enum") for w in words):
+        return None
+    if any(w in _FLOAT_WORDS for w in words):
+        return float
+    if "_Bool" in words or "bool" in words:
+        return _IntType(1, 1, False)
+    if "size_t" in words or "ssize_t" in words:
+        return _IntType(32, 64, "ssize_t" in words)
+    for w in words:
+        m = _FIXED_INT.match(w)
+        if m:
+            return _IntType(int(m.group(2)), int(m.group(2)), not m.group(1))
+    if not any(w in _INTEGER_WORDS for w in words):
+        return None
+    signed = False if "unsigned" in words else True if "signed" in words else None
+    if "char" in words:
+        return _IntType(8, 8, signed)
+    signed = signed is not False
+    if "short" in words:
+        return _IntType(16, 16, signed)
+    longs = words.count("long")
+    if longs == 1:
+        return _IntType(32, 64, signed)
+    if longs > 1:
+        return _IntType(64, 64, signed)
+    return _IntType(32, 32, signed)
+
+
+def _as_bool(truth: Optional[bool]) -> Interval:
+    return _BOOL if truth is None else Interval.const(1 if truth else 0)
+
+
+def _add(a: Interval, b: Interval) -> Interval:
+    return Interval(a.lo + b.lo, a.hi + b.hi, a.lo_open or b.lo_open, a.hi_open or b.hi_open)
+
+
+def _neg(a: Interval) -> Interval:
+    return Interval(-a.hi, -a.lo, a.hi_open, a.lo_open)
+
+
+def _mul(a: Interval, b: Interval) -> Interval:
+    def times(x, y):
+        return 0 if x == 0 or y == 0 else x * y
+    products = [times(x, y) for x in (a.lo, a.hi) for y in (b.lo, b.hi)]
+    return Interval(min(products), max(products))
+
+
+def _is_int(x) -> bool:
+    return isinstance(x, int) and not isinstance(x, bool)
+
+
+def _c_div(a: int, b: int) -> int:
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def _arith(op: str, a: Interval, b: Interval) -> Interval:
+    if op == "+":
+        return _add(a, b)
+    if op == "-":
+        return _add(a, _neg(b))
+    if op == "*":
+        return _mul(a, b)
+    x, y = a.value, b.value
+    if op == "/":
+        if _is_int(x) and _is_int(y) and y != 0:
+            return Interval.const(_c_div(x, y))
+        return _TOP
+    if op == "%":
+        if _is_int(x) and _is_int(y) and y != 0:
+            return Interval.const(x - _c_div(x, y) * y)
+        if _is_int(y) and y > 0 and a.lo >= 0:
+            return Interval(0, y - 1)
+        return _TOP
+    if _is_int(x) and _is_int(y):
+        if op == "&":
+            return Interval.const(x & y)
+        if op == "|":
+            return Interval.const(x | y)
+        if op == "^":
+            return Interval.const(x ^ y)
+        if op == "<<" and 0 <= y < 64:
+            return Interval.const(x << y)
+        if op == ">>" and 0 <= y < 64:
+            return Interval.const(x >> y)
+    if op == "&" and _is_int(y) and y >= 0 and a.lo >= 0:
+        return Interval(0, y)
+    return _TOP
+
+
+def _compare(op: str, a: Interval, b: Interval) -> Optional[bool]:
+    """Valor de `a op b` para quaisquer valores dos intervalos, ou None se depender deles."""
+    if op == ">":
+        return _compare("<", b, a)
+    if op == ">=":
+        return _compare("<=", b, a)
+    if op == "<":
+        if a.hi < b.lo or (a.hi == b.lo and (a.hi_open or b.lo_open)):
+            return True
+        if a.lo >= b.hi:
+            return False
+        return None
+    if op == "<=":
+        if a.hi <= b.lo:
+            return True
+        if a.lo > b.hi or (a.lo == b.hi and (a.lo_open or b.hi_open)):
+            return False
+        return None
+    if op == "==":
+        if a.value is not None and a.value == b.value:
+            return True
+        if a.intersect(b).empty:
+            return False
+        return None
+    result = _compare("==", a, b)
+    return None if result is None else not result
+
+
+def _narrow(current: Interval, op: str, bound: Interval) -> Interval:
+    """Restringe `current` aos valores x com `x op y` para algum y em `bound`."""
+    if op == "<":
+        return current.intersect(Interval(-_INF, bound.hi, hi_open=True))
+    if op == "<=":
+        return current.intersect(Interval(-_INF, bound.hi, hi_open=bound.hi_open))
+    if op == ">":
+        return current.intersect(Interval(bound.lo, _INF, lo_open=True))
+    if op == ">=":
+        return current.intersect(Interval(bound.lo, _INF, lo_open=bound.lo_open))
+    if op == "==":
+        return current.intersect(bound)
+    value = bound.value
+    if value is None:
+        return current
+    if current.value == value:
+        return Interval(value, value, True, True)
+    result = Interval(current.lo, current.hi, current.lo_open, current.hi_open)
+    if result.lo == value:
+        result.lo_open = True
+    if result.hi == value:
+        result.hi_open = True
+    return result
+
+
+# ------------------------------------------------------------ expressões C
+
+
+class _ParseError(Exception):
+    pass
+
+
+def _c_tokens(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = _C_TOKEN.match(text, pos)
+        if m is None:
+            raise _ParseError(f"caractere inesperado {text[pos]!r}")
+        pos = m.end()
+        if m.lastgroup != "ws":
+            tokens.append((m.lastgroup, m.group()))
+    return tokens
+
+
+def _number(text: str):
+    body = text.rstrip("uUlL")
+    if body[:2] in ("0x", "0X"):
+        return int(body, 16)
+    if re.fullmatch(r"[0-9]+", body):
+        return int(body, 8) if len(body) > 1 and body[0] == "0" else int(body)
+    return float(text.rstrip("fFlL"))
+
+
+def _char_value(text: str) -> Optional[int]:
+    body = text[1:-1]
+    if len(body) == 1:
+        return ord(body)
+    if body[0] == "\\" and len(body) == 2 and body[1] in _CHAR_ESCAPES:
+        return _CHAR_ESCAPES[body[1]]
+    return None
+
+
+class _ExprParser:
+    """Parser de precedência para o subconjunto de expressões C usado pelo pré-filtro (árvore em tuplas)."""
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Optional[Tuple[str, str]]:
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def at(self, text: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token is not None and token[0] in ("op", "id") and token[1] == text
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise _ParseError("fim inesperado da expressão")
+        self.pos += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        if not self.at(text):
+            raise _ParseError(f"esperado {text!r}")
+        self.pos += 1
+
+    def parse(self):
+        tree = self.expression()
+        if self.peek() is not None:
+            raise _ParseError(f"sobra na expressão: {self.peek()[1]!r}")
+        return tree
+
+    def expression(self):
+        tree = self.assignment()
+        while self.at(","):
+            self.pos += 1
+            tree = ("comma", tree, self.assignment())
+        return tree
+
+    def assignment(self):
+        left = self.conditional()
+        token = self.peek()
+        if token is not None and token[0] == "op" and token[1] in _ASSIGN:
+            self.pos += 1
+            return ("assign", token[1], left, self.assignment())
+        return left
+
+    def conditional(self):
+        cond = self.binary(4)
+        if self.at("?"):
+            self.pos += 1
+            then = self.expression()
+            self.expect(":")
+            return ("cond", cond, then, self.conditional())
+        return cond
+
+    def binary(self, min_prec: int):
+        left = self.unary()
+        while True:
+            token = self.peek()
+            if token is None or token[0] != "op" or _BINARY.get(token[1], 0) < min_prec:
+                return left
+            self.pos += 1
+            left = ("bin", token[1], left, self.binary(_BINARY[token[1]] + 1))
+
+    def _cast_type(self) -> Optional[List[str]]:
+        """Palavras do tipo, se `(` abre um cast; nesse caso consome até `)`."""
+        words = []
+        i = 1
+        while True:
+            token = self.peek(i)
+            if token is None:
+                return None
+            kind, text = token
+            if kind == "id" and (text in _TYPE_WORDS or _FIXED_INT.match(text) or (words and words[-1] in ("struct", "union", "enum"))):
+                words.append(text)
+            elif kind == "op" and text == "*" and words:
+                words.append(text)
+            elif kind == "op" and text == ")" and words:
+                self.pos += i + 1
+                return words
+            else:
+                return None
+            i += 1
+
+    def unary(self):
+        token = self.peek()
+        if token is None:
+            raise _ParseError("fim inesperado da expressão")
+        kind, text = token
+        if kind == "op" and text in ("-", "+", "!", "~"):
+            self.pos += 1
+            return ("un", text, self.unary())
+        if kind == "op" and text in ("++", "--"):
+            self.pos += 1
+            return ("incdec", text, True, self.unary())
+        if kind == "op" and text == "*":
+            self.pos += 1
+            return ("deref", self.unary())
+        if kind == "op" and text == "&":
+            self.pos += 1
+            return ("addr", self.unary())
+        if kind == "id" and text == "sizeof":
+            self.pos += 1
+            if self.at("(") and self._cast_type() is not None:
+                return ("opaque",)
+            self.unary()
+            return ("opaque",)
+        if kind == "op" and text == "(":
+            words = self._cast_type()
+            if words is not None:
+                return ("cast", tuple(words), self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        tree = self.primary()
+        while True:
+            if self.at("("):
+                self.pos += 1
+                args = []
+                while not self.at(")"):
+                    args.append(self.assignment())
+                    if not self.at(")"):
+                        self.expect(",")
+                self.pos += 1
+                tree = ("call", tree[1] if tree[0] == "var" else None, tuple(args))
+            elif self.at("["):
+                self.pos += 1
+                index = self.expression()
+                self.expect("]")
+                tree = ("index", tree, index)
+            elif self.at(".") or self.at("->"):
+                self.pos += 1
+                self.take()
+                tree = ("member", tree)
+            elif self.at("++") or self.at("--"):
+                tree = ("incdec", self.take()[1], False, tree)
+            else:
+                return tree
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "num":
+            # ("num", valor, True) para literais unsigned (`10u`, `0xFFu`)
+            return ("num", _number(text), True) if "u" in text.lower() else ("num", _number(text))
+        if kind == "char":
+            value = _char_value(text)
+            return ("opaque",) if value is None else ("num", value)
+        if kind == "str":
+            return ("opaque",)
+        if kind == "id" and text not in _STATEMENT_WORDS and text not in _TYPE_WORDS:
+            return ("var", text)
+        if kind == "op" and text == "(":
+            tree = self.expression()
+            self.expect(")")
+            return tree
+        raise _ParseError(f"token inesperado {text!r}")
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_expression(text: str):
+    """Árvore da expressão C `text`, ou None se ela estiver fora do subconjunto suportado."""
+    try:
+        return _ExprParser(_c_tokens(text)).parse()
+    except (_ParseError, ValueError, RecursionError):
+        return None
+
+
+def _has_effects(tree) -> bool:
+    kind = tree[0]
+    if kind in ("assign", "incdec", "call"):
+        return True
+    return any(isinstance(child, tuple) and _has_effects(child) for child in tree[1:])
+
+
+_ASSIGNED = re.compile(r"\b([A-Za-z_]\w*)\s*(?:[-+*/%&|^]|<<|>>)?=(?!=)|(?:\+\+|--)\s*([A-Za-z_]\w*)|\b([A-Za-z_]\w*)\s*(?:\+\+|--)")
+
+
+def _assigned_names(text: str) -> Set[str]:
+    """Nomes que um trecho não interpretado pode alterar (atribuições e ++/--)."""
+    return {name for groups in _ASSIGNED.findall(text) for name in groups if name}
+
+
+# ---------------------------------------------------------- estado abstrato
+
+
+class _Context:
+    """O que se sabe da função: constantes de `#define`, tipos e quais variáveis sobrevivem a chamadas."""
+
+    __slots__ = ("constants", "types", "typedefs", "volatile", "safe", "arrays")
+
+    def __init__(self):
+        self.constants: Dict[str, object] = {}
+        # `_IntType` ou `float` de cada variável declarada com tipo conhecido
+        self.types: Dict[str, object] = {}
+        self.typedefs: Dict[str, object] = {}
+        self.volatile: Set[str] = set()
+        # locais não estáticas, não voláteis e sem endereço tomado: chamadas não as alteram
+        self.safe: Set[str] = set()
+        self.arrays: Set[str] = set()
+
+    def declare(self, words: Sequence[str], declarator: "_Declarator") -> None:
+        """Registra o tipo de uma variável declarada (ponteiros, arrays e tipos desconhecidos ficam sem tipo)."""
+        kind = None if declarator.pointer or declarator.array else _int_type(words, self.typedefs)
+        if kind is None:
+            self.types.pop(declarator.name, None)
+        else:
+            self.types[declarator.name] = kind
+
+    def int_type(self, name: str) -> Optional[_IntType]:
+        kind = self.types.get(name)
+        return kind if isinstance(kind, _IntType) else None
+
+
+class _State:
+    __slots__ = ("values", "ctx")
+
+    def __init__(self, ctx: _Context, values: Optional[Dict[str, Interval]] = None):
+        self.ctx = ctx
+        self.values: Dict[str, Interval] = {} if values is None else values
+
+    def copy(self) -> "_State":
+        return _State(self.ctx, dict(self.values))
+
+    def get(self, name: str) -> Interval:
+        if name in self.ctx.volatile or self.ctx.types.get(name) is float:
+            return _TOP
+        value = self.values.get(name)
+        if value is not None:
+            return value
+        if _is_int(self.ctx.constants.get(name)):
+            return Interval.const(self.ctx.constants[name])
+        kind = self.ctx.int_type(name)
+        if kind is not None and kind.signed is False:
+            return Interval(*kind.full)
+        return _TOP
+
+    def _integral(self, kind: Optional[_IntType], value: Interval) -> Interval:
+        """`value` arredondado para os inteiros e limitado à faixa completa do tipo."""
+        if kind is None or value.empty:
+            return value
+        lo, hi = value.lo, value.hi
+        if lo != -_INF:
+            lo = math.floor(lo) + 1 if value.lo_open else math.ceil(lo)
+        if hi != _INF:
+            hi = math.ceil(hi) - 1 if value.hi_open else math.floor(hi)
+        return Interval(lo, hi).intersect(Interval(*kind.full))
+
+    def set(self, name: str, value: Interval) -> None:
+        """Atribui `value` a `name`, com a conversão para o tipo da variável."""
+        if name in self.ctx.volatile:
+            return
+        kind = self.ctx.int_type(name)
+        if kind is None:
+            # tipo desconhecido (não dá para saber se o valor dá a volta) ou
+            # ponto flutuante (arredondamentos não são modelados)
+            self.values.pop(name, None)
+            return
+        if not value.empty:
+            lo, hi = kind.exact
+            if value.lo < lo or value.hi > hi:
+                # fora da faixa do tipo: volta (unsigned), conversão ou overflow
+                value = Interval(*kind.full)
+            else:
+                # conversão para inteiro: trunca em direção a zero
+                value = Interval(math.trunc(value.lo), math.trunc(value.hi))
+        self.values[name] = value.intersect(Interval(*kind.full))
+
+    def narrow(self, name: str, value: Interval) -> bool:
+        """Restringe `name` a `value`; False se o resultado for vazio."""
+        value = self._integral(self.ctx.int_type(name), value)
+        if value.empty:
+            return False
+        if name not in self.ctx.volatile and self.ctx.types.get(name) is not float:
+            self.values[name] = value
+        return True
+
+    def havoc(self, name: str) -> None:
+        self.values.pop(name, None)
+
+    def escape(self) -> None:
+        """Efeito de uma chamada desconhecida ou escrita por ponteiro."""
+        safe = self.ctx.safe
+        self.values = {k: v for k, v in self.values.items() if k in safe}
+
+    def join(self, other: "_State") -> "_State":
+        values = {k: v.hull(other.values[k]) for k, v in self.values.items() if k in other.values}
+        return _State(self.ctx, values)
+
+
+def _join(a: Optional[_State], b: Optional[_State]) -> Optional[_State]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a.join(b)
+
+
+def _evaluate(tree, state: _State) -> Interval:
+    """Intervalo da expressão; aplica em `state` as atribuições e chamadas que ela contém."""
+    kind = tree[0]
+    if kind == "num":
+        # valores de ponto flutuante não são representados (arredondamento)
+        return Interval.const(tree[1]) if _is_int(tree[1]) else _TOP
+    if kind == "var":
+        return state.get(tree[1])
+    if kind == "un":
+        value = _evaluate(tree[2], state)
+        if tree[1] == "-":
+            return _wrap(tree, _neg(value), state.ctx)
+        if tree[1] == "+":
+            return value
+        if tree[1] == "!":
+            if value.excludes(0):
+                return Interval.const(0)
+            return Interval.const(1) if value.value == 0 else _BOOL
+        return _wrap(tree, Interval.const(~value.value), state.ctx) if _is_int(value.value) else _TOP
+    if kind == "bin":
+        op = tree[1]
+        if op in ("&&", "||"):
+            left = _evaluate(tree[2], state)
+            if left.value == 0 or left.excludes(0):
+                decided = left.excludes(0)
+                if decided != (op == "&&"):
+                    return Interval.const(1 if decided else 0)
+                return _as_bool(_truth(_evaluate(tree[3], state)))
+            # o lado direito pode ou não executar
+            branch = state.copy()
+            right = _truth(_evaluate(tree[3], branch))
+            state.values = state.join(branch).values
+            return _BOOL if right is None or right == (op == "&&") else Interval.const(0 if op == "&&" else 1)
+        left = _evaluate(tree[2], state)
+        right = _evaluate(tree[3], state)
+        if op in _COMPARE:
+            if _unsigned_compare(tree, left, right, state.ctx):
+                return _BOOL
+            return _as_bool(_compare(op, left, right))
+        return _wrap(tree, _arith(op, left, right), state.ctx)
+    if kind == "cond":
+        truth = _truth(_evaluate(tree[1], state))
+        if truth is not None:
+            return _evaluate(tree[2] if truth else tree[3], state)
+        other = state.copy()
+        a = _evaluate(tree[2], state)
+        b = _evaluate(tree[3], other)
+        state.values = state.join(other).values
+        return a.hull(b)
+    if kind == "assign":
+        op, target, source = tree[1], tree[2], tree[3]
+        value = _evaluate(source, state)
+        if target[0] == "var":
+            if op != "=":
+                value = _arith(op[:-1], state.get(target[1]), value)
+            state.set(target[1], value)
+            return state.get(target[1])
+        _write_through(target, state)
+        return value if op == "=" else _TOP
+    if kind == "incdec":
+        target = tree[3]
+        if target[0] != "var":
+            _write_through(target, state)
+            return _TOP
+        old = state.get(target[1])
+        new = _add(old, Interval.const(1 if tree[1] == "++" else -1))
+        state.set(target[1], new)
+        return state.get(target[1]) if tree[2] else old
+    if kind == "call":
+        for arg in tree[2]:
+            if arg[0] == "addr" and arg[1][0] == "var":
+                state.havoc(arg[1][1])
+            _evaluate(arg, state)
+        if tree[1] not in _PURE_FUNCTIONS:
+            state.escape()
+        return _TOP
+    if kind == "cast":
+        value = _evaluate(tree[2], state)
+        target = _int_type(tree[1], state.ctx.typedefs)
+        if not isinstance(target, _IntType):
+            return _TOP
+        lo, hi = target.exact
+        x = value.value
+        if x is not None and lo <= int(x) <= hi:
+            return Interval.const(int(x))
+        return Interval(*target.full)
+    if kind == "comma":
+        _evaluate(tree[1], state)
+        return _evaluate(tree[2], state)
+    if kind in ("index", "member", "deref", "addr"):
+        for child in tree[1:]:
+            if isinstance(child, tuple):
+                _evaluate(child, state)
+        return _TOP
+    return _TOP
+
+
+def _write_through(target, state: _State) -> None:
+    """Escrita em `a[i]`, `*p` ou `s.f`: só um array local não atinge outras variáveis."""
+    for child in target[1:]:
+        if isinstance(child, tuple):
+            _evaluate(child, state)
+    base = target
+    while base[0] in ("index", "member") and isinstance(base[1], tuple):
+        base = base[1]
+    if not (target[0] == "index" and base[0] == "var" and base[1] in state.ctx.arrays):
+        state.escape()
+        if base[0] == "var":
+            state.havoc(base[1])
+
+
+def _leaf_types(tree, ctx: _Context) -> Tuple[Set[_IntType], bool, bool]:
+    """
+    (tipos inteiros promovidos, se há ponto flutuante, se há operando de tipo
+    desconhecido) das folhas de uma expressão aritmética.
+    """
+    kind = tree[0]
+    if kind == "num":
+        if not _is_int(tree[1]):
+            return set(), True, False
+        if len(tree) > 2:
+            return {_UINT if tree[1] <= _UINT.exact[1] else _IntType(64, 64, False)}, False, False
+        return ({_INT}, False, False) if tree[1] <= _INT_MAX else (set(), False, True)
+    if kind == "var":
+        declared = ctx.types.get(tree[1])
+        if declared is float:
+            return set(), True, False
+        if isinstance(declared, _IntType):
+            return {declared.promoted()}, False, False
+        value = ctx.constants.get(tree[1])
+        if value is not None and tree[1] not in ctx.types:
+            return _leaf_types(("num", value), ctx)
+        return set(), False, True
+    if kind == "cast":
+        target = _int_type(tree[1], ctx.typedefs)
+        if target is float:
+            return set(), True, False
+        return ({target.promoted()}, False, False) if isinstance(target, _IntType) else (set(), False, True)
+    if kind == "un" and tree[1] != "!":
+        return _leaf_types(tree[2], ctx)
+    if kind == "un" or (kind == "bin" and (tree[1] in _COMPARE or tree[1] in ("&&", "||"))):
+        return {_INT}, False, False
+    if kind in ("bin", "cond"):
+        types: Set[_IntType] = set()
+        floating = unknown = False
+        for child in tree[2:] if kind == "bin" else tree[2:4]:
+            t, f, u = _leaf_types(child, ctx)
+            types |= t
+            floating = floating or f
+            unknown = unknown or u
+        return types, floating, unknown
+    return set(), False, True
+
+
+def _wrap(tree, value: Interval, ctx: _Context) -> Interval:
+    """
+    Resultado de uma operação aritmética no tipo C do resultado: fora da faixa
+    dos tipos dos operandos (volta de unsigned, overflow), a faixa inteira deles.
+    """
+    if value.empty or (value.lo >= 0 and value.hi <= _INT_MAX):
+        return value
+    types, floating, unknown = _leaf_types(tree, ctx)
+    if floating:
+        return value
+    if unknown or not types:
+        return _TOP
+    lo = max(t.exact[0] for t in types)
+    hi = min(t.exact[1] for t in types)
+    if lo <= value.lo and value.hi <= hi:
+        return value
+    return Interval(min(t.full[0] for t in types), max(t.full[1] for t in types))
+
+
+def _unsigned_compare(tree, left: Interval, right: Interval, ctx: _Context) -> bool:
+    """Se a comparação pode ser feita em unsigned com um operando negativo (convertido para um valor enorme)."""
+    if left.lo >= 0 and right.lo >= 0:
+        return False
+    types, floating, unknown = _leaf_types(("bin", "+", tree[2], tree[3]), ctx)
+    return not floating and (unknown or any(t.signed is False for t in types))
+
+
+def _wraps(name: str, ctx: _Context) -> bool:
+    """Se `name + c` pode dar a volta sem comportamento indefinido (unsigned ou tipo desconhecido)."""
+    kind = ctx.types.get(name)
+    if kind is float:
+        return False
+    return not isinstance(kind, _IntType) or kind.promoted().signed is not True
+
+
+def _truth(value: Interval) -> Optional[bool]:
+    if value.excludes(0):
+        return True
+    if value.value == 0:
+        return False
+    return None
+
+
+def _linear(tree) -> Optional[Tuple[str, object]]:
+    """(variável, c) se a expressão for `v`, `v + c`, `v - c` ou `c + v` com c numérico."""
+    if tree[0] == "var":
+        return tree[1], 0
+    if tree[0] == "bin" and tree[1] in ("+", "-"):
+        left, right = tree[2], tree[3]
+        if left[0] == "var" and right[0] == "num":
+            return left[1], right[1] if tree[1] == "+" else -right[1]
+        if tree[1] == "+" and left[0] == "num" and right[0] == "var":
+            return right[1], left[1]
+    return None
+
+
+def refine(state: _State, tree, truth: bool) -> Optional[_State]:
+    """Novo estado em que `tree` tem o valor lógico `truth`, ou None se isso for impossível."""
+    kind = tree[0]
+    if _has_effects(tree):
+        result = state.copy()
+        value = _truth(_evaluate(tree, result))
+        if value is not None and value != truth:
+            return None
+        return result
+    if kind == "un" and tree[1] == "!":
+        return refine(state, tree[2], not truth)
+    if kind == "bin" and tree[1] in ("&&", "||"):
+        if (tree[1] == "&&") == truth:
+            first = refine(state, tree[2], truth)
+            return None if first is None else refine(first, tree[3], truth)
+        a = refine(state, tree[2], truth)
+        b = refine(state, tree[2], not truth)
+        b = None if b is None else refine(b, tree[3], truth)
+        return _join(a, b)
+    if kind == "bin" and tree[1] in _COMPARE:
+        op = tree[1] if truth else _NEGATED[tree[1]]
+        left, right = _evaluate(tree[2], state), _evaluate(tree[3], state)
+        if _unsigned_compare(tree, left, right, state.ctx):
+            return state
+        if _compare(op, left, right) is False:
+            return None
+        result = state.copy()
+        atom = _linear(tree[2])
+        if atom is not None and atom[1] != 0 and _wraps(atom[0], state.ctx):
+            atom = None
+        if atom is not None:
+            name, offset = atom
+            bound = _add(right, Interval.const(-offset))
+            if not result.narrow(name, _narrow(result.get(name), op, bound)):
+                return None
+            left = _evaluate(tree[2], result)
+        atom = _linear(tree[3])
+        if atom is not None and atom[1] != 0 and _wraps(atom[0], state.ctx):
+            atom = None
+        if atom is not None:
+            name, offset = atom
+            bound = _add(left, Interval.const(-offset))
+            if not result.narrow(name, _narrow(result.get(name), _FLIPPED[op], bound)):
+                return None
+        return result
+    value = _truth(_evaluate(tree, state.copy()))
+    if value is not None and value != truth:
+        return None
+    atom = _linear(tree)
+    if atom is not None and atom[1] == 0:
+        result = state.copy()
+        target = _narrow(result.get(atom[0]), "!=" if truth else "==", Interval.const(0))
+        return result if result.narrow(atom[0], target) else None
+    return state
+
+
+# ------------------------------------------------------- semântica dos nós
+
+
+def _strip_comments(text: str) -> str:
+    return re.sub(r"//[^\n]*|/\*.*?\*/", " ", text, flags=re.S)
+
+
+def _balanced(text: str, start: int) -> int:
+    """Índice logo após o `)` que fecha o `(` em `start` (-1 se não fechar)."""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _split_top(text: str, separators: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        if depth == 0 and ch in separators:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+class _Declarator(NamedTuple):
+    name: str
+    init: Optional[str]
+    pointer: bool
+    array: bool
+
+
+def _declaration(stmt: str) -> Optional[Tuple[List[str], List[_Declarator]]]:
+    """(palavras do tipo, declaradores) se `stmt` for uma declaração de variáveis."""
+    m = re.match(r"((?:[A-Za-z_]\w*\s+|\*\s*)+?)(\**\s*[A-Za-z_]\w*\s*(?:\[|=|,|$))", stmt)
+    if m is None:
+        return None
+    words = m.group(1).split()
+    if not words or words[0] in _STATEMENT_WORDS or words[-1] in _STATEMENT_WORDS:
+        return None
+    typed = [w for w in words if w != "*"]
+    if not any(w in _TYPE_WORDS or _FIXED_INT.match(w) for w in typed) and len(typed) != 1:
+        return None
+    pointer_type = "*" in m.group(1)
+    declarators = []
+    for part in _split_top(stmt[len(m.group(1)):], ","):
+        dm = re.match(r"(\**)\s*([A-Za-z_]\w*)\s*((?:\[[^\]]*\]\s*)*)(?:=(.*))?$", part, re.S)
+        if dm is None:
+            return None
+        declarators.append(_Declarator(dm.group(2), dm.group(4).strip() if dm.group(4) else None,
+                                       pointer_type or bool(dm.group(1)), bool(dm.group(3))))
+    return typed, declarators
+
+
+class _NodeCode:
+    """Semântica de um nó: efeitos em ordem, condição de decisão e partes de um `for`/`switch`."""
+
+    __slots__ = ("effects", "condition", "condition_text", "for_init", "for_step", "switch", "switch_text", "guarded")
+
+    def __init__(self):
+        # ("expr", árvore) | ("decl", declarador, árvore | None, palavras do tipo) | ("havoc", nomes, escapa)
+        self.effects: List[tuple] = []
+        self.condition = None
+        self.condition_text: Optional[str] = None
+        self.for_init: List[tuple] = []
+        self.for_step: List[tuple] = []
+        self.switch = None
+        self.switch_text: Optional[str] = None
+        # corpo na mesma linha da condição: aplicado (como havoc) depois do ramo
+        self.guarded: List[tuple] = []
+
+
+def _statement_effects(stmt: str) -> List[tuple]:
+    declaration = _declaration(stmt)
+    if declaration is not None:
+        effects = []
+        for d in declaration[1]:
+            tree = parse_expression(d.init) if d.init is not None and not d.pointer and not d.array else None
+            if d.init is not None and tree is None:
+                effects.append(("havoc", frozenset({d.name}), bool(re.search(r"\w\s*\(", d.init))))
+            else:
+                effects.append(("decl", d, tree, declaration[0]))
+        return effects
+    tree = parse_expression(stmt)
+    if tree is not None:
+        return [("expr", tree)]
+    escapes = bool(re.search(r"[A-Za-z_]\w*\s*\(|\*\s*[A-Za-z_(]\w*\s*[-+*/%&|^]?=(?!=)|->", stmt))
+    return [("havoc", frozenset(_assigned_names(stmt)), escapes)]
+
+
+def parse_node_code(text: str) -> _NodeCode:
+    """Interpreta o trecho de código associado a um nó do CDFG."""
+    code = _NodeCode()
+    text = _strip_comments(text)
+    pending = text
+    while pending.strip():
+        pending = pending.strip()
+        m = re.match(r"(?:else\b|do\b|case\s+[^:]+:(?!:)|default\s*:|[{}]|[A-Za-z_]\w*\s*:(?![:=]))\s*", pending)
+        if m and m.end() > 0:
+            pending = pending[m.end():]
+            continue
+        m = re.match(r"(if|while|switch|for)\s*\(", pending)
+        if m:
+            end = _balanced(pending, m.end() - 1)
+            if end == -1:
+                code.effects.append(("havoc", frozenset(_assigned_names(pending)), True))
+                break
+            inner = pending[m.end():end - 1]
+            if m.group(1) == "for":
+                parts = inner.split(";")
+                if len(parts) == 3:
+                    code.for_init = [e for s in _split_top(parts[0], "") for e in _statement_effects(s)]
+                    code.for_step = [e for s in _split_top(parts[2], "") for e in _statement_effects(s)]
+                    if parts[1].strip():
+                        code.condition_text = parts[1].strip()
+                        code.condition = parse_expression(code.condition_text)
+            elif m.group(1) == "switch":
+                code.switch_text = inner.strip()
+                code.switch = parse_expression(code.switch_text)
+            else:
+                code.condition_text = inner.strip()
+                code.condition = parse_expression(code.condition_text)
+            rest = pending[end:]
+            if rest.strip().strip("{};"):
+                code.guarded.append(("havoc", frozenset(_assigned_names(rest)),
+                                     bool(re.search(r"[A-Za-z_]\w*\s*\(|->|\*\s*\w+\s*=", rest))))
+            break
+        stmt_end = _split_top(pending, ";")
+        first = stmt_end[0] if stmt_end else ""
+        consumed = pending.find(first) + len(first)
+        pending = pending[consumed:].lstrip().lstrip(";")
+        stmt = first.strip().strip("{}").strip()
+        if not stmt:
+            continue
+        m = re.match(r"return\b(.*)", stmt, re.S)
+        if m:
+            if m.group(1).strip():
+                code.effects.extend(_statement_effects(m.group(1).strip()))
+            continue
+        if re.match(r"(?:break|continue|goto\b)", stmt):
+            continue
+        code.effects.extend(_statement_effects(stmt))
+    return code
+
+
+def _apply(effects: Sequence[tuple], state: _State) -> None:
+    for effect in effects:
+        kind = effect[0]
+        if kind == "expr":
+            _evaluate(effect[1], state)
+        elif kind == "decl":
+            declarator, tree = effect[1], effect[2]
+            if tree is not None:
+                state.set(declarator.name, _evaluate(tree, state))
+            else:
+                state.havoc(declarator.name)
+        else:
+            if effect[2]:
+                state.escape()
+            for name in effect[1]:
+                state.havoc(name)
+
+
+# ------------------------------------------------------- código dos nós
+
+
+_CORRESPONDENCE = re.compile(r"^[\s>*|#-]*(?:\*\*)?(?:node|nó|no|n)?\s*([A-Za-z0-9_]+)(?:\*\*)?\s*(?:\*\*)?\s*[:|=\-–→]", re.I)
+_BACKTICKS = re.compile(r"`([^`\n]+)`")
+_LINES = re.compile(r"\blines?\s+(\d+)(?:\s*(?:-|–|to|a|até)\s*(\d+))?", re.I)
+_LINE_DIRECTIVE = re.compile(r"\s*#\s*line\s+(\d+)")
+
+
+def _numbered_lines(source: str) -> Dict[int, str]:
+    """
+    Linhas de `source` pelo número no arquivo original. Num recorte do
+    `CodeSlicer`, a numeração segue as diretivas `#line`; as linhas antes da
+    primeira diretiva (cabeçalho do recorte) não têm número no original.
+    """
+    lines = source.splitlines()
+    if not any(_LINE_DIRECTIVE.match(line) for line in lines):
+        return dict(enumerate(lines, start=1))
+    numbered: Dict[int, str] = {}
+    number: Optional[int] = None
+    for line in lines:
+        m = _LINE_DIRECTIVE.match(line)
+        if m:
+            number = int(m.group(1))
+        elif number is not None:
+            numbered[number] = line
+            number += 1
+    return numbered
+
+
+def node_code_map(graph: CDFG, cdfg_text: Optional[str], source: Optional[str]) -> List[Optional[str]]:
+    """Trecho de código de cada nó (None se desconhecido), pelas fontes descritas no módulo."""
+    codes: List[Optional[str]] = [None] * len(graph)
+    for v, label in enumerate(graph.labels):
+        if not label:
+            continue
+        lines = [
+            line.strip() for line in re.split(r"\\[nlr]|\n", label)
+            if line.strip() and line.strip() != graph.nodes[v]
+            and not re.match(r"(?:defs?|c[-_ ]?uses?|p[-_ ]?uses?)\s*[:=]", line.strip(), re.I)
+            and not re.fullmatch(r"(?:node\s*)?\d+\s*[:.]?", line.strip(), re.I)
+        ]
+        if lines:
+            codes[v] = "\n".join(lines)
+    if not cdfg_text:
+        return codes
+
+    source_lines = _numbered_lines(source) if source else {}
+    in_dot = False
+    for raw in cdfg_text.splitlines():
+        # a lista de correspondência fica fora do bloco DOT
+        if re.match(r"\s*(?:strict\s+)?digraph\b", raw, re.I):
+            in_dot = True
+        if in_dot:
+            if raw.strip().startswith("}") and raw.count("}") >= raw.count("{"):
+                in_dot = False
+            continue
+        m = _CORRESPONDENCE.match(raw)
+        if m is None:
+            continue
+        v = graph.node_id(m.group(1))
+        if v is None or codes[v] is not None:
+            continue
+        rest = raw[m.end():]
+        snippets = _BACKTICKS.findall(rest)
+        if snippets:
+            codes[v] = "\n".join(snippets)
+            continue
+        lm = _LINES.search(rest)
+        if lm and source_lines:
+            first = int(lm.group(1))
+            last = int(lm.group(2) or first)
+            if first <= last and last - first < 20 and all(n in source_lines for n in range(first, last + 1)):
+                codes[v] = "\n".join(source_lines[n] for n in range(first, last + 1))
+    return codes
+
+
+# --------------------------------------------------- contexto da função
+
+
+_DEFINE = re.compile(r"^[ \t]*#[ \t]*define[ \t]+([A-Za-z_]\w*)[ \t]+([^\n]+)$", re.M)
+
+
+_TYPEDEF = re.compile(r"\btypedef\s+([A-Za-z_][\w\s]*?)\s+([A-Za-z_]\w*)\s*;")
+
+
+class _FileContext(NamedTuple):
+    constants: Dict[str, object]
+    volatile: FrozenSet[str]
+    # assinatura e corpo de cada função
+    functions: Dict[str, Tuple[str, str]]
+    typedefs: Dict[str, object]
+    # palavras do tipo e declarador de cada variável global
+    globals: List[Tuple[List[str], "_Declarator"]]
+
+
+@functools.lru_cache(maxsize=8)
+def _file_context(source: str) -> _FileContext:
+    """Constantes de #define, nomes voláteis, funções, typedefs e variáveis globais de um arquivo."""
+    constants: Dict[str, object] = {}
+    for name, body in _DEFINE.findall(source):
+        tree = parse_expression(_strip_comments(body).strip())
+        if tree is not None and not _has_effects(tree):
+            value = _evaluate(tree, _State(_Context())).value
+            if value is not None:
+                constants[name] = value
+    masked = mask_source(source)
+    volatile = set()
+    for m in re.finditer(r"\bvolatile\b[^;{}()]*", masked):
+        volatile.update(re.findall(r"([A-Za-z_]\w*)\s*(?:=[^,;]*)?(?:\[[^\]]*\])?\s*(?:,|$)", m.group()))
+    functions = {}
+    found = find_functions(source)
+    for fn in found:
+        text = function_source(source, fn)
+        brace = mask_source(text).find("{")
+        if brace != -1:
+            functions[fn.name] = (text[:brace], text[brace:])
+    typedefs: Dict[str, object] = {}
+    for words, name in _TYPEDEF.findall(masked):
+        kind = _int_type(words.split(), typedefs)
+        if kind is not None:
+            typedefs[name] = kind
+    skeleton = source_skeleton(masked, found)
+    globals_ = []
+    for stmt in re.split(r"[;{}]", skeleton):
+        stmt = stmt.strip()
+        declaration = _declaration(stmt) if stmt and not stmt.startswith(("#", "typedef")) else None
+        if declaration is not None:
+            globals_.extend((declaration[0], d) for d in declaration[1])
+    return _FileContext(constants, frozenset(volatile - _TYPE_WORDS), functions, typedefs, globals_)
+
+
+def _function_context(source: Optional[str], function: Optional[str]) -> _Context:
+    ctx = _Context()
+    if not source:
+        return ctx
+    try:
+        file_ctx = _file_context(source)
+    except Exception as e:
+        logger.debug("Contexto do arquivo indisponível: %s", e)
+        return ctx
+    ctx.constants = dict(file_ctx.constants)
+    ctx.volatile = set(file_ctx.volatile)
+    ctx.typedefs = dict(file_ctx.typedefs)
+    for words, d in file_ctx.globals:
+        ctx.declare(words, d)
+    if function not in file_ctx.functions:
+        return ctx
+    signature, body = file_ctx.functions[function]
+    locals_: Set[str] = set()
+    static: Set[str] = set()
+    declarations: List[Tuple[List[str], _Declarator]] = []
+    params = signature[signature.find("(") + 1:signature.rfind(")")] if "(" in signature else ""
+    for param in _split_top(params, ","):
+        declaration = _declaration(param)
+        if declaration is not None:
+            declarations.extend((declaration[0], d) for d in declaration[1])
+    masked_body = mask_source(body)
+    for stmt in re.split(r"[;{}]", masked_body):
+        stmt = stmt.strip()
+        declaration = _declaration(stmt) if stmt else None
+        if declaration is not None:
+            declarations.extend((declaration[0], d) for d in declaration[1])
+            if "static" in declaration[0]:
+                static.update(d.name for d in declaration[1])
+    for words, d in declarations:
+        locals_.add(d.name)
+        ctx.constants.pop(d.name, None)
+        if d.array:
+            ctx.arrays.add(d.name)
+        if "volatile" in words:
+            ctx.volatile.add(d.name)
+        ctx.declare(words, d)
+    address_taken = set(re.findall(r"(?<![&\w)\]])&\s*([A-Za-z_]\w*)", masked_body))
+    ctx.safe = locals_ - static - ctx.volatile - address_taken
+    return ctx
+
+
+# ------------------------------------------------------------ verificação
+
+
+def _edge_condition(label: Optional[str]) -> Optional[str]:
+    """Condição escrita no rótulo de uma aresta, sem o prefixo True/False (ex.: "True\\n(x > 0)")."""
+    if not label:
+        return None
+    text = re.sub(r"\\[nlr]", " ", label).strip()
+    text = re.sub(r"^(?:true|false|t|f|yes|no|sim|não|nao|verdadeiro|falso)\b\s*[:,-]?\s*", "", text, flags=re.I)
+    if text.startswith("(") and _balanced(text, 0) == len(text):
+        text = text[1:-1]
+    text = text.strip()
+    if not text or not any(op in text for op in ("<", ">", "=", "!", "&&", "||")):
+        return None
+    return text
+
+
+class PathPrefilter:
+    """Verifica caminhos de um `CDFG` com propagação de constantes e intervalos."""
+
+    def __init__(
+        self,
+        graph: CDFG,
+        cdfg_text: Optional[str] = None,
+        source: Optional[str] = None,
+        function: Optional[str] = None,
+    ):
+        self.graph = graph
+        self.ctx = _function_context(source, function)
+        self.code_text = node_code_map(graph, cdfg_text, source)
+        self.code = [None if text is None else parse_node_code(text) for text in self.code_text]
+        # declarações no código dos nós valem quando a função não foi localizada no arquivo
+        for code in self.code:
+            for effect in code.for_init + code.effects if code is not None else ():
+                if effect[0] == "decl" and effect[1].name not in self.ctx.types:
+                    self.ctx.declare(effect[3], effect[1])
+        self._succ = [tuple(dict.fromkeys(graph.successors(v))) for v in range(len(graph))]
+        self._retreating = self._retreating_edges()
+
+    def _retreating_edges(self) -> Set[Tuple[int, int]]:
+        """Arestas de retorno (para um ancestral na busca em profundidade a partir da entrada)."""
+        graph = self.graph
+        state = bytearray(len(graph))  # 0 = novo, 1 = na pilha, 2 = concluído
+        retreating: Set[Tuple[int, int]] = set()
+        roots = ([graph.entry] if graph.entry is not None else []) + list(range(len(graph)))
+        for root in roots:
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self._succ[root]))]
+            while stack:
+                v, it = stack[-1]
+                w = next(it, None)
+                if w is None:
+                    state[v] = 2
+                    stack.pop()
+                elif state[w] == 1:
+                    retreating.add((v, w))
+                elif state[w] == 0:
+                    state[w] = 1
+                    stack.append((w, iter(self._succ[w])))
+        return retreating
+
+    def _constraints(self, v: int, w: int) -> Optional[List[Tuple[object, bool, str]]]:
+        """Condições (árvore, valor, texto) impostas pela aresta v -> w; None se forem desconhecidas."""
+        graph = self.graph
+        edges = [e for e in graph.out_edges(v) if graph.edge_dst[e] == w]
+        branches = {graph.edge_branch(e) for e in edges}
+        code = self.code[v]
+
+        if code is not None and code.switch is not None:
+            labels = [(graph.edge_labels[e] or "").strip() for e in edges]
+            cases = []
+            for label in labels:
+                m = re.match(r"(?:case\s+)?(.+?)\s*:?$", label, re.I)
+                if not label or label.lower().startswith("default") or m is None:
+                    return None
+                cases.append(m.group(1))
+            if len(cases) != 1:
+                return None
+            tree = parse_expression(f"({code.switch_text}) == ({cases[0]})")
+            return None if tree is None else [(tree, True, f"{code.switch_text} == {cases[0]}")]
+
+        if len(branches) == 1 and None not in branches:
+            truth = branches.pop()
+            if code is not None and code.condition is not None:
+                return [(code.condition, truth, code.condition_text)]
+            texts = [_edge_condition(graph.edge_labels[e]) for e in edges]
+            if truth and texts[0]:
+                tree = parse_expression(texts[0])
+                return None if tree is None else [(tree, True, texts[0])]
+            if not truth:
+                # condição escrita só no ramo verdadeiro da mesma decisão
+                for e in graph.out_edges(v):
+                    text = _edge_condition(graph.edge_labels[e])
+                    if graph.edge_branch(e) is True and text:
+                        tree = parse_expression(text)
+                        return None if tree is None else [(tree, False, text)]
+            return None
+        if branches == {None}:
+            text = _edge_condition(graph.edge_labels[edges[0]])
+            tree = parse_expression(text) if text else None
+            if tree is not None and len(edges) == 1:
+                return [(tree, True, text)]
+        return None
+
+    def _enter(self, state: _State, path: Sequence[int], index: int) -> None:
+        v = path[index]
+        code = self.code[v]
+        if code is None:
+            # sem código: só se sabe o que o xlabel declara como definido
+            state.escape()
+            for name in self.graph.defs(v):
+                state.havoc(name)
+            return
+        if code.for_init or code.for_step:
+            if index > 0 and (path[index - 1], v) in self._retreating:
+                _apply(code.for_step, state)
+            elif index > 0 or self.graph.in_degree(v) == 0:
+                _apply(code.for_init, state)
+        _apply(code.effects, state)
+
+    def check(self, path: Sequence[int]) -> PathVerdict:
+        """Veredito de um caminho (sequência de ids de nó); erros na análise deixam o caminho indeciso."""
+        try:
+            return self._check(path)
+        except (ArithmeticError, RecursionError, ValueError) as e:
+            logger.debug("Pré-filtro não avaliou o caminho %s: %s", path, e)
+            return PathVerdict(UNDECIDED)
+
+    def _check(self, path: Sequence[int]) -> PathVerdict:
+        state = _State(self.ctx)
+        forced = True
+        for index, v in enumerate(path):
+            self._enter(state, path, index)
+            if index + 1 < len(path) and len(self._succ[v]) > 1:
+                constraints = self._constraints(v, path[index + 1])
+                if constraints is None:
+                    forced = False
+                    constraints = ()
+                for tree, truth, text in constraints:
+                    refined = refine(state, tree, truth)
+                    if refined is None:
+                        return PathVerdict(INFEASIBLE, self._reason(v, text, truth, state), index)
+                    if refine(state, tree, not truth) is not None:
+                        forced = False
+                    state = refined
+            if self.code[v] is not None:
+                _apply(self.code[v].guarded, state)
+        return PathVerdict(FEASIBLE) if forced else PathVerdict(UNDECIDED)
+
+    def _reason(self, v: int, text: str, truth: bool, state: _State) -> str:
+        names = sorted(set(re.findall(r"[A-Za-z_]\w*", text)) - _STATEMENT_WORDS)
+        known = [f"`{n}` ∈ {state.get(n)!r}" for n in names if not state.get(n).is_top]
+        facts = f" ({', '.join(known)} on this path)" if known else ""
+        outcome = "true" if truth else "false"
+        return (
+            f"Statically infeasible (local constant/interval analysis): the condition `{text}` "
+            f"at node {self.graph.nodes[v]} cannot be {outcome}{facts}."
+        )
+
+
+def prefilter_paths(
+    graph: CDFG,
+    path_set: PathSet,
+    cdfg_text: Optional[str] = None,
+    source: Optional[str] = None,
+    function: Optional[str] = None,
+) -> List[PathVerdict]:
+    """Veredito de cada caminho de `path_set` (mesma ordem)."""
+    checker = PathPrefilter(graph, cdfg_text, source, function)
+    return [checker.check(path) for path in path_set.paths]
+
+
+def undecided_paths(path_set: PathSet, verdicts: Sequence[PathVerdict]) -> PathSet:
+    """Os caminhos que o pré-filtro não decidiu, para o prompt da LLM."""
+    paths = [p for p, v in zip(path_set.paths, verdicts) if v.status == UNDECIDED]
+    return path_set._replace(paths=paths, enumerated=path_set.total)
+
+
+def format_local_report(
+    function: str,
+    graph: CDFG,
+    path_set: PathSet,
+    verdicts: Sequence[PathVerdict],
+    code_text: Optional[Sequence[Optional[str]]] = None,
+) -> str:
+    """Relatório no formato de saída do prompt por função, com os caminhos decididos localmente."""
+    infeasible = [(p, v) for p, v in zip(path_set.paths, verdicts) if v.status == INFEASIBLE]
+    feasible = sum(1 for v in verdicts if v.status == FEASIBLE)
+    if not infeasible:
+        lines = ["No infeasible paths were identified by the local pre-filter."]
+    else:
+        lines = ["# Infeasible Paths Identified (local pre-filter)", ""]
+        for number, (path, verdict) in enumerate(infeasible, start=1):
+            lines.append(f"{number}. **Infeasible Path [{function}]**")
+            segments = []
+            for v in dict.fromkeys(path[:verdict.node + 1] if verdict.node is not None else path):
+                text = code_text[v] if code_text else None
+                if text:
+                    segments.append(f"    - Node {graph.nodes[v]}: `{' '.join(text.split())}`")
+            if segments:
+                lines.append("  - **Code Segments**:")
+                lines.extend(segments)
+            description = format_paths(graph, path_set._replace(paths=[path])).split(": ", 1)[1]
+            lines.append(f"  - **Description**: {description}")
+            lines.append(f"  - **Reason**: {verdict.reason}")
+            lines.append("")
+    if feasible:
+        lines.append(f"{feasible} candidate path(s) were proven feasible locally.")
+    if path_set.truncated:
+        lines.append(
+            f"The candidate list was truncated at {path_set.total} paths: paths beyond it were not checked locally."
+        )
+    return "\n".join(lines).rstrip() + "\n"
@@ -0,0 +1,37 @@
+"""Estimativa local (sem rede) do número de tokens de um prompt."""
+
+import math
+import re
+
+# Palavras/identificadores, números ou símbolos (com um espaço inicial opcional,
+# que o BPE funde ao token seguinte), sequências de espaços em branco.
+_PIECES = re.compile(r" ?[A-Za-z]+| ?[0-9]+| ?[^\sA-Za-z0-9]|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Aproxima a contagem de um tokenizador BPE (família GPT/DeepSeek) sem
+    dependências externas:
+
+    - palavras: ~1 token a cada 4 letras (palavras curtas e comuns = 1 token);
+    - números: ~1 token a cada 3 dígitos;
+    - um espaço antes de palavra/símbolo é fundido a ele; demais sequências de
+      espaços/quebras de linha: 1 token;
+    - pontuação, operadores e caracteres não ASCII: 1 token cada.
+
+    É uma aproximação para dimensionar prompts antes do envio; a contagem
+    real de cada chamada vem do campo `usage` da resposta.
+    """
+    if not text:
+        return 0
+    total = 0
+    for piece in _PIECES.findall(text):
+        body = piece[1:] if piece[0] == " " and len(piece) > 1 else piece
+        first = body[0]
+        if first.isalpha() and first.isascii():
+            total += math.ceil(len(body) / 4)
+        elif first.isdigit():
+            total += math.ceil(len(body) / 3)
+        else:
+            total += 1
+    return total